@@ -7,8 +7,26 @@ except DistributionNotFound:
     pass
 
 
+from ausweather import core
 from ausweather.core import *
 from ausweather.database import *
 from ausweather.bom import *
 from ausweather.silo import *
 from ausweather.charts import *
+from ausweather.archive import *
+from ausweather.aio import *
+from ausweather.scheduler import *
+from ausweather.parallel import *
+from ausweather.backends import *
+from ausweather.metrics import *
+from ausweather.infill import *
+from ausweather.climate import *
+from ausweather.silo_grid import *
+from ausweather.trends import *
+from ausweather.catalogue import *
+
+
+def __getattr__(name):
+    if name == "SA_BOM_RAINFALL_LIST":
+        return core.SA_BOM_RAINFALL_LIST
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
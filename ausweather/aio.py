@@ -0,0 +1,359 @@
+"""Asyncio versions of the data fetching functions.
+
+Each coroutine here builds the same URL and uses the same parser as its
+blocking counterpart, but downloads with a shared :class:`AsyncClient`:
+
+.. code-block::
+
+    >>> async with AsyncClient(per_host_limit=4) as client:
+    ...     dfs = await asyncio.gather(
+    ...         *[async_silo_alldata(s, "your@email.com", client=client) for s in stations]
+    ...     )
+
+Requires the optional dependency ``aiohttp``.
+
+"""
+
+import asyncio
+import functools
+import logging
+from urllib.parse import urlsplit
+import weakref
+
+from ausweather import bom, core, metrics, silo
+from ausweather.backends import check_backend, to_backend
+from ausweather.scheduler import get_scheduler, is_throttled, retry_after
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "AsyncClient",
+    "get_async_client",
+    "async_silo_alldata",
+    "async_fetch_bom_station_list",
+    "async_fetch_bom_c_values",
+    "async_download_aquarius_rainfall",
+    "async_download_aquarius_rainfall_bulk",
+]
+
+
+class AsyncClient:
+    """Shared asynchronous HTTP client.
+
+    Args:
+        per_host_limit (int): maximum number of concurrent requests to any
+            one host. Further requests wait their turn. The scheduler's
+            adaptive concurrency limit applies within this.
+        timeout (float): timeout in seconds for each request, not counting
+            time spent waiting for a free slot.
+        parse_in_executor (bool): run the (pandas) parsing of responses in
+            the default executor, so the event loop is not blocked.
+        scheduler (RequestScheduler): supplies rate limits, retries and
+            adaptive concurrency. Default is :func:`ausweather.get_scheduler`.
+
+    Use as an async context manager, or call :meth:`close` when finished.
+    Cancelling a task cancels its in-flight request.
+
+    """
+
+    def __init__(
+        self, per_host_limit=8, timeout=120, parse_in_executor=True, scheduler=None
+    ):
+        if scheduler is None:
+            scheduler = get_scheduler()
+        self.scheduler = scheduler
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+        self.parse_in_executor = parse_in_executor
+        self._semaphores = {}
+        self._session = None
+        self.flights = AsyncSingleFlight()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    @property
+    def session(self):
+        if self._session is None or self._session.closed:
+            try:
+                import aiohttp
+            except ImportError:
+                raise ImportError("The asyncio API requires aiohttp to be installed")
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0),
+            )
+        return self._session
+
+    def _semaphore(self, host):
+        if not host in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._semaphores[host]
+
+    async def get(self, url, params=None, headers=None, verify=True):
+        """GET a URL.
+
+        Args:
+            url (str): URL
+            params (dict): query parameters
+            headers (dict): request headers
+            verify (bool): verify TLS certificates
+
+        Returns:
+            dict: with keys "status", "headers", "text" and "bytes" (the
+            length of the body).
+
+        Requests are rate limited, retried and counted by the scheduler just
+        like the blocking API. Raises aiohttp.ClientResponseError for error
+        statuses (other than 304 Not Modified) and asyncio.TimeoutError if
+        the last retry times out.
+
+        """
+        host = urlsplit(url).netloc
+        with metrics.stage("http.get", host=host) as s:
+            r = await self._get(url, host, params, headers, verify)
+            s.add(bytes=r["bytes"])
+        return r
+
+    async def _get(self, url, host, params, headers, verify):
+        import aiohttp
+
+        state = self.scheduler.host(host)
+        async with self._semaphore(host):
+            for attempt in range(self.scheduler.max_retries + 1):
+                await state.acquire_async()
+                outcome = "cancelled"
+                try:
+                    logger.debug(f"GET {host} {urlsplit(url).path}")
+                    async with self.session.get(
+                        url,
+                        params=params,
+                        headers=headers,
+                        ssl=None if verify else False,
+                        timeout=aiohttp.ClientTimeout(total=self.timeout),
+                    ) as resp:
+                        if not is_throttled(resp.status):
+                            outcome = "ok"
+                            if resp.status != 304:
+                                resp.raise_for_status()
+                            body = await resp.read()
+                            return {
+                                "status": resp.status,
+                                "headers": resp.headers,
+                                "text": body.decode(resp.charset or "latin-1"),
+                                "bytes": len(body),
+                            }
+                        outcome = "throttle"
+                        if attempt == self.scheduler.max_retries:
+                            resp.raise_for_status()
+                        delay = self.scheduler.backoff(
+                            attempt, retry_after(resp.headers)
+                        )
+                except (asyncio.TimeoutError, aiohttp.ClientConnectionError):
+                    outcome = "timeout"
+                    if attempt == self.scheduler.max_retries:
+                        raise
+                    delay = self.scheduler.backoff(attempt)
+                finally:
+                    state.release(outcome)
+                with state.condition:
+                    state.counters["retries"] += 1
+                logger.info(f"Retrying {host} in {delay:.1f} s")
+                await asyncio.sleep(delay)
+
+    async def parse(self, func, *args, **kwargs):
+        """Run a parser, in the default executor if *parse_in_executor* is set."""
+        if not self.parse_in_executor:
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(func, *args, **kwargs)
+        )
+
+    async def close(self):
+        """Close the underlying HTTP session."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class AsyncSingleFlight:
+    """Asyncio version of :class:`ausweather.scheduler.SingleFlight`.
+
+    The shared download is cancelled when every caller waiting for it
+    (including the one that started it) has been cancelled.
+
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def _wait(self, call):
+        """Await the call's future, cancelling it if no one else is waiting."""
+        call["awaiting"] += 1
+        try:
+            return await asyncio.shield(call["future"])
+        except asyncio.CancelledError:
+            if call["awaiting"] == 1:
+                call["future"].cancel()
+            raise
+        finally:
+            call["awaiting"] -= 1
+
+    async def do(self, key, start, finish, func, narrow=None):
+        """Await ``func()``, or share the result of an in-flight call.
+
+        Args: see :meth:`ausweather.scheduler.SingleFlight.do` - here *func*
+        returns an awaitable.
+
+        """
+        if narrow is None:
+            narrow = lambda result, start, finish: result
+        for call in self._calls.get(key, []):
+            if call["start"] <= start and call["finish"] >= finish:
+                call["waiters"] += 1
+                logger.debug(f"Sharing in-flight request for {key}")
+                metrics.record("singleflight", hits=1, key=str(key))
+                result = await self._wait(call)
+                return narrow(result, start, finish)
+
+        metrics.record("singleflight", misses=1, key=str(key))
+        call = {"start": start, "finish": finish, "waiters": 0, "awaiting": 0}
+        call["future"] = asyncio.ensure_future(func())
+        self._calls.setdefault(key, []).append(call)
+
+        def remove(future):
+            self._calls[key].remove(call)
+            if not self._calls[key]:
+                del self._calls[key]
+
+        # Registered before anyone awaits the future, so it runs first.
+        call["future"].add_done_callback(remove)
+        result = await self._wait(call)
+        if call["waiters"]:
+            return narrow(result, start, finish)
+        return result
+
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """Get the default :class:`AsyncClient` for the running event loop.
+
+    Close it with ``await get_async_client().close()`` before the loop ends.
+
+    """
+    loop = asyncio.get_running_loop()
+    if not loop in _clients:
+        _clients[loop] = AsyncClient()
+    return _clients[loop]
+
+
+async def async_silo_alldata(
+    station_code,
+    email,
+    start=None,
+    finish=None,
+    return_comments=False,
+    backend="pandas",
+    client=None,
+):
+    """Asyncio version of :func:`ausweather.silo_alldata`.
+
+    Args:
+        client (AsyncClient): default is :func:`get_async_client`
+
+    Other arguments and return value are the same as :func:`ausweather.silo_alldata`.
+
+    """
+    if client is None:
+        client = get_async_client()
+    check_backend(backend)
+    start, finish = silo.silo_date_range(start, finish)
+
+    async def download():
+        url = silo.silo_alldata_url(station_code, email, start, finish)
+        r = await client.get(url)
+        return await client.parse(
+            silo.parse_silo_alldata, r["text"], return_comments=True
+        )
+
+    data = await client.flights.do(
+        ("silo", str(int(station_code))),
+        int(start),
+        int(finish),
+        download,
+        narrow=silo.narrow_silo_alldata,
+    )
+    df = to_backend(data["df"], backend)
+    if return_comments:
+        return dict(data, df=df)
+    else:
+        return df
+
+
+async def async_fetch_bom_station_list(ncc_obs_code, client=None):
+    """Asyncio version of :func:`ausweather.fetch_bom_station_list`.
+
+    Args:
+        client (AsyncClient): default is :func:`get_async_client`
+
+    """
+    if client is None:
+        client = get_async_client()
+    ncc_obs_code = bom.resolve_ncc_obs_code(ncc_obs_code)["ncc_obs_code"]
+    r = await client.get(bom.bom_station_list_url(ncc_obs_code))
+    return await client.parse(bom.parse_bom_station_list, r["text"], ncc_obs_code)
+
+
+async def async_fetch_bom_c_values(
+    ncc_obs_code, station_code, radius_km=10, client=None
+):
+    """Asyncio version of :func:`ausweather.fetch_bom_c_values`.
+
+    Args:
+        client (AsyncClient): default is :func:`get_async_client`
+
+    """
+    if client is None:
+        client = get_async_client()
+    r = await client.get(bom.bom_c_values_url(ncc_obs_code, station_code, radius_km))
+    return await client.parse(bom.parse_bom_c_values, r["text"])
+
+
+async def async_download_aquarius_rainfall_bulk(
+    station_ids, data_start=None, data_end=None, clip_ends=True, client=None
+):
+    """Asyncio version of :func:`ausweather.download_aquarius_rainfall_bulk`.
+
+    Args:
+        client (AsyncClient): default is :func:`get_async_client`
+
+    """
+    if client is None:
+        client = get_async_client()
+    station_ids = [str(s) for s in station_ids]
+    params = core.aquarius_export_params(station_ids, data_start, data_end)
+    r = await client.get(core.aquarius_export_url(), params=params, verify=False)
+    return await client.parse(
+        core.parse_aquarius_export,
+        r["text"].splitlines(),
+        station_ids,
+        clip_ends=clip_ends,
+    )
+
+
+async def async_download_aquarius_rainfall(station_id, data_start=None, client=None):
+    """Asyncio version of :func:`ausweather.download_aquarius_rainfall`.
+
+    Args:
+        client (AsyncClient): default is :func:`get_async_client`
+
+    """
+    dfs = await async_download_aquarius_rainfall_bulk(
+        [station_id], data_start=data_start, clip_ends=False, client=client
+    )
+    return dfs[str(station_id)]
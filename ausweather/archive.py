@@ -0,0 +1,306 @@
+"""Partitioned Parquet archive of downloaded daily data.
+
+The archive is a directory of Parquet files laid out Hive-style, partitioned
+by state, station and decade:
+
+.. code-block::
+
+    ausweather_archive/
+        state=SA/
+            station_id=23090/
+                decade=1950/
+                    part-20250619T101500-3f2a....parquet
+                decade=1960/
+                    ...
+
+Appending never rewrites existing files - each call to :func:`write_archive`
+adds new part files, and :func:`compact_archive` merges them separately.
+Readers only open the partitions overlapping the requested date range, and
+only the requested columns, using memory-mapped reads.
+
+Requires the optional dependency ``pyarrow``.
+
+"""
+
+from datetime import datetime
+from functools import lru_cache
+import logging
+from pathlib import Path
+import uuid
+
+import pandas as pd
+
+from ausweather.metrics import instrumented
+from ausweather.silo import get_silo_station_list
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["write_archive", "read_archive", "compact_archive", "list_archive"]
+
+DEFAULT_ARCHIVE_DIR = "ausweather_archive"
+
+# SILO alldata columns are renamed to the RainfallStationData conventions.
+SILO_COLUMN_RENAMES = {"Rain": "rainfall", "Srn": "interpolated_code"}
+
+# Columns that are derived from the date and are recomputed on read.
+DERIVED_COLUMNS = [
+    "Date",
+    "Day",
+    "Date2",
+    "year",
+    "month",
+    "dayofyear",
+    "finyear",
+    "interpolated_desc",
+    "station_id",
+]
+
+
+def import_pyarrow(feature="The Parquet archive"):
+    """Import pyarrow and the submodules ausweather uses.
+
+    Args:
+        feature (str): what needs pyarrow, for the error message
+
+    Raises ImportError if pyarrow is not installed.
+
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(f"{feature} requires pyarrow to be installed")
+    return pa
+
+
+@lru_cache()
+def _station_states():
+    df = get_silo_station_list()
+    return dict(zip(df.station_id, df.state.str.strip()))
+
+
+def lookup_station_state(station_id):
+    """Look up the state of a BoM station from the bundled SILO station list.
+
+    Args:
+        station_id (int or str): BoM station ID
+
+    Returns:
+        str: state abbreviation e.g. "SA"
+
+    """
+    try:
+        return _station_states()[int(station_id)]
+    except (KeyError, ValueError):
+        raise KeyError(
+            f"Unknown state for station {station_id}; pass state= explicitly"
+        )
+
+
+def _normalise(df):
+    """Convert silo_alldata or download_bom_rainfall output to archive columns."""
+    df = df.copy()
+    if "date" not in df.columns:
+        df["date"] = pd.to_datetime(df["Date"])
+    df = df.rename(columns=SILO_COLUMN_RENAMES)
+    df = df.drop(columns=[c for c in DERIVED_COLUMNS if c in df.columns])
+    df["date"] = pd.to_datetime(df["date"]).astype("datetime64[ns]")
+    return df
+
+
+def archive_station_id(station_id):
+    """The station_id partition value for a station, e.g. "23090" for "023090"."""
+    return str(int(station_id))
+
+
+def _partition_dir(root, state, station_id, decade):
+    return (
+        Path(root) / f"state={state}" / f"station_id={station_id}" / f"decade={decade}"
+    )
+
+
+@instrumented
+def write_archive(df, station_id, archive_dir=None, state=None):
+    """Append daily data for one station to the archive.
+
+    Args:
+        df (pd.DataFrame): output of :func:`ausweather.silo_alldata` or
+            :func:`ausweather.download_bom_rainfall`
+        station_id (int or str): BoM station ID
+        archive_dir (str): root directory of the archive, default
+            "ausweather_archive"
+        state (str): state abbreviation. If None, it is looked up from the
+            bundled SILO station list.
+
+    Returns:
+        list: paths of the new Parquet files, one per decade.
+
+    """
+    pa = import_pyarrow()
+    if archive_dir is None:
+        archive_dir = DEFAULT_ARCHIVE_DIR
+    station_id = archive_station_id(station_id)
+    if state is None:
+        state = lookup_station_state(station_id)
+    df = _normalise(df)
+    decades = (df["date"].dt.year // 10 * 10).values
+    stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    paths = []
+    for decade in sorted(set(decades)):
+        part = df[decades == decade].sort_values("date")
+        path = _partition_dir(archive_dir, state, station_id, decade)
+        path.mkdir(parents=True, exist_ok=True)
+        filename = path / f"part-{stamp}-{uuid.uuid4().hex}.parquet"
+        table = pa.Table.from_pandas(part, preserve_index=False)
+        pa.parquet.write_table(table, filename)
+        logger.debug(f"Wrote {len(part)} rows to {filename}")
+        paths.append(filename)
+    return paths
+
+
+def _station_partitions(archive_dir, station_id, start=None, end=None):
+    """Yield (decade, path) for the partitions overlapping [start, end]."""
+    first = None if start is None else pd.Timestamp(start).year // 10 * 10
+    last = None if end is None else pd.Timestamp(end).year // 10 * 10
+    station_id = archive_station_id(station_id)
+    for station_dir in Path(archive_dir).glob(f"state=*/station_id={station_id}"):
+        for decade_dir in station_dir.glob("decade=*"):
+            decade = int(decade_dir.name.split("=")[1])
+            if first is not None and decade < first:
+                continue
+            if last is not None and decade > last:
+                continue
+            yield decade, decade_dir
+
+
+def _read_partition(decade_dir, columns=None, start=None, end=None):
+    pa = import_pyarrow()
+    tables = []
+    # Part filenames start with a timestamp, so sorting puts the newest last.
+    for filename in sorted(decade_dir.glob("part-*.parquet")):
+        if columns is None:
+            cols = None
+        else:
+            schema = pa.parquet.read_schema(filename, memory_map=True)
+            cols = [c for c in ["date"] + list(columns) if c in schema.names]
+            cols = list(dict.fromkeys(cols))
+        table = pa.parquet.read_table(filename, columns=cols, memory_map=True)
+        if start is not None:
+            table = table.filter(
+                pa.compute.greater_equal(
+                    table["date"], pa.scalar(start, pa.timestamp("ns"))
+                )
+            )
+        if end is not None:
+            table = table.filter(
+                pa.compute.less_equal(table["date"], pa.scalar(end, pa.timestamp("ns")))
+            )
+        tables.append(table)
+    return tables
+
+
+@instrumented
+def read_archive(station_id, start=None, end=None, columns=None, archive_dir=None):
+    """Read daily data for one station from the archive.
+
+    Args:
+        station_id (int or str): BoM station ID
+        start (pd.Timestamp or str): first date to return (optional)
+        end (pd.Timestamp or str): last date to return (optional)
+        columns (list): columns to read, default all. "date" is always
+            included, and columns not present in the archive are skipped.
+        archive_dir (str): root directory of the archive
+
+    Returns:
+        pd.DataFrame: sorted by date. Where appends overlap, the most
+        recently written value for each date is kept.
+
+    """
+    pa = import_pyarrow()
+    if archive_dir is None:
+        archive_dir = DEFAULT_ARCHIVE_DIR
+    start = None if start is None else pd.Timestamp(start)
+    end = None if end is None else pd.Timestamp(end)
+    tables = []
+    for decade, decade_dir in sorted(
+        _station_partitions(archive_dir, station_id, start, end)
+    ):
+        tables += _read_partition(decade_dir, columns=columns, start=start, end=end)
+    if not tables:
+        raise KeyError(f"Station {station_id} not found in archive {archive_dir}")
+    df = pa.concat_tables(tables, promote_options="default").to_pandas()
+    df = df.drop_duplicates(subset="date", keep="last")
+    df = df[["date"] + [c for c in df.columns if c != "date"]]
+    return df.sort_values("date").reset_index(drop=True)
+
+
+@instrumented
+def list_archive(archive_dir=None):
+    """List the partitions in the archive.
+
+    Args:
+        archive_dir (str): root directory of the archive
+
+    Returns:
+        pd.DataFrame: columns state, station_id, decade, n_files.
+
+    """
+    if archive_dir is None:
+        archive_dir = DEFAULT_ARCHIVE_DIR
+    records = []
+    for decade_dir in Path(archive_dir).glob("state=*/station_id=*/decade=*"):
+        state, station_id, decade = [
+            p.name.split("=")[1]
+            for p in (decade_dir.parent.parent, decade_dir.parent, decade_dir)
+        ]
+        records.append(
+            {
+                "state": state,
+                "station_id": station_id,
+                "decade": int(decade),
+                "n_files": len(list(decade_dir.glob("part-*.parquet"))),
+            }
+        )
+    return pd.DataFrame(records, columns=["state", "station_id", "decade", "n_files"])
+
+
+@instrumented
+def compact_archive(station_id=None, archive_dir=None):
+    """Merge the part files of each partition into a single file.
+
+    Args:
+        station_id (int or str): only compact this station, default all.
+        archive_dir (str): root directory of the archive
+
+    Returns:
+        int: number of partitions that were compacted.
+
+    The merged file is written before the old part files are removed, so
+    an interrupted compaction leaves duplicate rows (which readers resolve)
+    rather than lost ones.
+
+    """
+    pa = import_pyarrow()
+    if archive_dir is None:
+        archive_dir = DEFAULT_ARCHIVE_DIR
+    pattern = "state=*/station_id=*/decade=*"
+    if station_id is not None:
+        pattern = f"state=*/station_id={archive_station_id(station_id)}/decade=*"
+    n = 0
+    for decade_dir in Path(archive_dir).glob(pattern):
+        parts = sorted(decade_dir.glob("part-*.parquet"))
+        if len(parts) < 2:
+            continue
+        tables = _read_partition(decade_dir)
+        df = pa.concat_tables(tables, promote_options="default").to_pandas()
+        df = df.drop_duplicates(subset="date", keep="last").sort_values("date")
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        filename = decade_dir / f"part-{stamp}-{uuid.uuid4().hex}.parquet"
+        pa.parquet.write_table(pa.Table.from_pandas(df, preserve_index=False), filename)
+        for part in parts:
+            part.unlink()
+        logger.debug(f"Compacted {len(parts)} files in {decade_dir}")
+        n += 1
+    return n
@@ -0,0 +1,154 @@
+"""Arrow and Polars backends for station data.
+
+Functions that take a *backend* argument return pandas DataFrames by
+default. With ``backend="arrow"`` they return a :class:`pyarrow.Table`,
+and with ``backend="polars"`` a :class:`polars.DataFrame`. The Arrow table
+reuses the numeric buffers of the pandas DataFrame, and Polars and DuckDB
+can both use the Arrow buffers without copying them again.
+
+The heavier reductions in :mod:`ausweather.core` can also be calculated
+with Polars (e.g. ``RainfallStationData(..., backend="polars")``), which
+gives the same results as pandas.
+
+Requires the optional dependencies ``pyarrow`` and/or ``polars``.
+
+"""
+
+import logging
+
+import pandas as pd
+
+from ausweather.metrics import instrumented
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["to_backend"]
+
+BACKENDS = ("pandas", "arrow", "polars")
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("The arrow backend requires pyarrow to be installed")
+    return pa
+
+
+def _polars():
+    try:
+        import polars as pl
+    except ImportError:
+        raise ImportError("The polars backend requires polars to be installed")
+    return pl
+
+
+def check_backend(backend, allowed=BACKENDS):
+    """Raise KeyError if *backend* is not one of *allowed*."""
+    if not backend in allowed:
+        raise KeyError(f"backend must be one of {allowed}, not {backend!r}")
+    return backend
+
+
+@instrumented
+def to_backend(df, backend="pandas"):
+    """Convert a pandas DataFrame for a backend.
+
+    Args:
+        df (pd.DataFrame): data
+        backend (str): "pandas", "arrow" or "polars"
+
+    Returns:
+        *df* itself, a pyarrow.Table or a polars.DataFrame. Numeric and
+        datetime columns are not copied; NaN values become nulls.
+
+    """
+    check_backend(backend)
+    if backend == "pandas":
+        return df
+    table = _pyarrow().Table.from_pandas(df, preserve_index=False)
+    if backend == "arrow":
+        return table
+    return _polars().from_arrow(table)
+
+
+def _polars_frame(df, columns):
+    pl = _polars()
+    return pl.from_pandas(df[list(dict.fromkeys(columns))], nan_to_null=True)
+
+
+def _polars_finyear(dates):
+    """Polars expression for the financial year of a date expression."""
+    pl = _polars()
+    year = dates.dt.year() - (dates.dt.month() < 7).cast(pl.Int32)
+    return pl.format("{}-{}", year, (year + 1).cast(pl.String).str.slice(2))
+
+
+def polars_rainfall_groupby(df, grouping_column):
+    """Polars version of :meth:`ausweather.RainfallStationData.groupby`."""
+    pl = _polars()
+    keys = [grouping_column] if isinstance(grouping_column, str) else grouping_column
+    lf = _polars_frame(df, keys + ["rainfall", "interpolated_code", "quality"])
+    result = (
+        lf.group_by(keys)
+        .agg(
+            rainfall=pl.col("rainfall").sum(),
+            rainfall_count=pl.col("rainfall").count().cast(pl.Int64),
+            # A missing code counts as "not observed", as in the pandas path.
+            interpolated_count=(pl.col("interpolated_code") != 0)
+            .fill_null(True)
+            .sum()
+            .cast(pl.Int64),
+            quality_count=pl.col("quality").count().cast(pl.Int64),
+        )
+        .sort(keys)
+    )
+    return _to_pandas_like(result, df, keys)
+
+
+def polars_find_missing_days(df, all_days, dt_col, year_type, value_col):
+    """Polars version of :func:`ausweather.find_missing_days`."""
+    pl = _polars()
+    data = _polars_frame(df, [dt_col, value_col]).with_columns(
+        pl.col(dt_col).cast(pl.Datetime("ns"))
+    )
+    days = pl.DataFrame({dt_col: pl.Series(all_days.values).cast(pl.Datetime("ns"))})
+    if year_type == "calendar":
+        key, year = "year", pl.col(dt_col).dt.year()
+    else:
+        key, year = "finyear", _polars_finyear(pl.col(dt_col))
+    result = (
+        days.join(data, on=dt_col, how="left", maintain_order="left")
+        .group_by(year.alias(key))
+        .agg(pl.col(value_col).is_null().sum().cast(pl.Int64))
+        .sort(key)
+    )
+    index = result[key].to_pandas()
+    if key == "year":
+        index = index.astype(all_days.year.dtype)
+    return pd.Series(
+        result[value_col].to_numpy(), index=pd.Index(index, name=key), name=value_col
+    )
+
+
+def polars_reduce_daily_to_monthly(daily_df, dt_col, year_col, value_col):
+    """Polars version of :func:`ausweather.reduce_daily_to_monthly`."""
+    pl = _polars()
+    lf = _polars_frame(daily_df, [year_col, dt_col, value_col])
+    result = (
+        lf.group_by(pl.col(year_col), pl.col(dt_col).dt.month().alias("month"))
+        .agg(pl.col(value_col).sum())
+        .sort([year_col, "month"])
+    )
+    result = result.to_pandas()
+    result[year_col] = result[year_col].astype(daily_df[year_col].dtype)
+    result["month"] = result["month"].astype(daily_df[dt_col].dt.month.dtype)
+    return result
+
+
+def _to_pandas_like(result, df, keys):
+    """Convert a Polars result to pandas with the key dtypes of *df*."""
+    result = result.to_pandas()
+    for key in keys:
+        result[key] = result[key].astype(df[key].dtype)
+    return result
@@ -16,12 +16,24 @@ Note daily vs monthly for different reporting frequency ``nccObsCode``s.
 
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import io
 import logging
+import os
 from pathlib import Path
+import re
+import tempfile
+import threading
+import zipfile
 
-import requests
+import numpy as np
 import pandas as pd
+import requests
+from scipy import sparse, spatial
+
+from ausweather.silo import get_silo_station_list
+from ausweather.scheduler import get_scheduler
+from ausweather.metrics import instrumented, record
 
 
 logger = logging.getLogger(__name__)
@@ -32,21 +44,61 @@ NCC_OBS_CODES = [
         "ncc_obs_code": 136,
         "interval": "daily",
         "aliases": ["daily_rain"],
+        "value_col": "rainfall",
     },
     {
         "name": "Rainfall - monthly total",
         "ncc_obs_code": 139,
         "interval": "monthly",
         "aliases": ["monthly_rain"],
+        "value_col": "rainfall",
     },
     {
         "name": "Temperature - maximum daily",
         "ncc_obs_code": 122,
         "interval": "daily",
         "aliases": ["daily_max_temp"],
+        "value_col": "max_temp",
     },
 ]
 
+# Column layout of the "_Data" CSV member in BoM zipped data files.
+BOM_DATA_FILE_SCHEMAS = {
+    "daily": {
+        "names": [
+            "product_code",
+            "station",
+            "year",
+            "month",
+            "day",
+            "value",
+            "period",
+            "quality",
+        ],
+        "dtype": {
+            "product_code": "category",
+            "station": "int32",
+            "year": "int16",
+            "month": "int8",
+            "day": "int8",
+            "value": "float64",
+            "period": "float32",
+            "quality": "category",
+        },
+    },
+    "monthly": {
+        "names": ["product_code", "station", "year", "month", "value", "quality"],
+        "dtype": {
+            "product_code": "category",
+            "station": "int32",
+            "year": "int16",
+            "month": "int8",
+            "value": "float64",
+            "quality": "category",
+        },
+    },
+}
+
 
 def resolve_ncc_obs_code(ncc_obs_code):
     for var in NCC_OBS_CODES:
@@ -58,25 +110,95 @@ def resolve_ncc_obs_code(ncc_obs_code):
     raise KeyError(f"Unknown ncc_obs_code: {ncc_obs_code}")
 
 
-def fetch_bom_station_list(ncc_obs_code):
-    """Fetch the BoM station list for nccObsCode (for all Australia).
+# Base URL of the BoM website. Set $AUSWEATHER_BOM_URL (or this variable) to
+# use a mirror or a local stand-in server.
+BOM_BASE_URL = os.environ.get("AUSWEATHER_BOM_URL", "http://www.bom.gov.au")
+
+
+def bom_station_list_url(ncc_obs_code):
+    """URL of the national BoM station list for nccObsCode."""
+    ncc_obs_code = resolve_ncc_obs_code(ncc_obs_code)["ncc_obs_code"]
+    return f"{BOM_BASE_URL}/climate/data/lists_by_element/alphaAUS_{ncc_obs_code}.txt"
+
+
+def bom_c_values_url(ncc_obs_code, station_code, radius_km=10):
+    """URL of the BoM weather station directory listing around a station."""
+    ncc_obs_code = resolve_ncc_obs_code(ncc_obs_code)["ncc_obs_code"]
+    return (
+        f"{BOM_BASE_URL}/jsp/ncc/cdio/weatherStationDirectory"
+        f"/d?p_display_type=ajaxStnListing"
+        f"&p_nccObsCode={ncc_obs_code}&p_stnNum={station_code}&p_radius={radius_km}"
+    )
+
+
+def bom_weather_data_url(ncc_obs_code, station, p_c):
+    """URL of a BoM zipped daily/monthly data file."""
+    var = resolve_ncc_obs_code(ncc_obs_code)
+    return (
+        f"{BOM_BASE_URL}/jsp/ncc/cdio/weatherData/av?"
+        f"p_display_type={var['interval']}ZippedDataFile&"
+        f"p_stn_num={int(station):06.0f}&p_nccObsCode={var['ncc_obs_code']:.0f}"
+        f"&p_c={int(p_c):.0f}"
+    )
+
+
+@instrumented
+def download_bom_station_list(ncc_obs_code, etag=None, last_modified=None):
+    """Download the raw BoM station list for nccObsCode, conditionally.
+
+    Args:
+        ncc_obs_code (int): the nccObsCode, e.g. 122 for daily max temp.
+        etag (str): ETag from a previous download (optional)
+        last_modified (str): Last-Modified header from a previous download
+            (optional)
+
+    Returns:
+        dict: with keys "ncc_obs_code", "text" (None if the list has not
+        changed since *etag*/*last_modified*), "etag" and "last_modified".
+
+    """
+    ncc_obs_code = resolve_ncc_obs_code(ncc_obs_code)["ncc_obs_code"]
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+    r = get_scheduler().get(bom_station_list_url(ncc_obs_code), headers=headers)
+    if headers:
+        not_modified = int(r.status_code == 304)
+        record("bom.station_list_cache", hits=not_modified, misses=1 - not_modified)
+    if r.status_code == 304:
+        logger.debug(f"BoM station list for obsCode {ncc_obs_code} not modified")
+        return {
+            "ncc_obs_code": ncc_obs_code,
+            "text": None,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+    r.raise_for_status()
+    return {
+        "ncc_obs_code": ncc_obs_code,
+        "text": r.text,
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+    }
+
+
+@instrumented
+def parse_bom_station_list(text, ncc_obs_code):
+    """Parse a BoM station list for nccObsCode (for all Australia).
 
     Args:
+        text (str): contents of an alphaAUS_{ncc_obs_code}.txt file
         ncc_obs_code (int): the nccObsCode, e.g. 122 for daily max temp.
 
     Returns:
         pandas DataFrame
 
     """
-    logger.info(f"Fetching BoM station list for AUS obsCode {ncc_obs_code}")
     variable = resolve_ncc_obs_code(ncc_obs_code)
-    ncc_obs_code = variable["ncc_obs_code"]
-    logger.debug(f"Using resolved ncc_obs_code {ncc_obs_code}")
-    r = requests.get(
-        f"http://www.bom.gov.au/climate/data/lists_by_element/alphaAUS_{ncc_obs_code}.txt"
-    )
-    n = r.text.count("\n")
-    buffer = io.StringIO(r.text)
+    n = text.count("\n")
+    buffer = io.StringIO(text)
 
     # Skip the header and footer
     skiprows = [0, 1, 3] + [n - i for i in range(7)]
@@ -93,24 +215,271 @@ def fetch_bom_station_list(ncc_obs_code):
     ]
     df = pd.read_fwf(buffer, skiprows=skiprows, colspecs=colspecs)
     df["Name"] = df["Name"].astype(str)
-    df["ncc_obs_code"] = ncc_obs_code
+    df["ncc_obs_code"] = variable["ncc_obs_code"]
     df["ncc_obs_descr"] = variable["name"]
     return df
 
 
+@instrumented
+def fetch_bom_station_list(ncc_obs_code):
+    """Fetch the BoM station list for nccObsCode (for all Australia).
+
+    Args:
+        ncc_obs_code (int): the nccObsCode, e.g. 122 for daily max temp.
+
+    Returns:
+        pandas DataFrame
+
+    """
+    logger.info(f"Fetching BoM station list for AUS obsCode {ncc_obs_code}")
+    ncc_obs_code = resolve_ncc_obs_code(ncc_obs_code)["ncc_obs_code"]
+    logger.debug(f"Using resolved ncc_obs_code {ncc_obs_code}")
+    result = download_bom_station_list(ncc_obs_code)
+    return parse_bom_station_list(result["text"], ncc_obs_code)
+
+
+@instrumented
+def fetch_bom_station_lists(ncc_obs_codes=None, validators=None, max_workers=None):
+    """Fetch several BoM station lists in parallel, using conditional GETs.
+
+    Args:
+        ncc_obs_codes (sequence of ints): obs codes to fetch, default all of
+            :data:`NCC_OBS_CODES`
+        validators (dict): maps ncc_obs_code to a dict with "etag" and
+            "last_modified" keys from a previous fetch. Lists which have not
+            changed since are not downloaded again.
+        max_workers (int): number of threads, default one per obs code.
+
+    Returns:
+        dict: maps each ncc_obs_code to the dict returned by
+        :func:`download_bom_station_list`, with an extra key "df" - the
+        parsed DataFrame, or None if the list was not modified.
+
+    """
+    if ncc_obs_codes is None:
+        ncc_obs_codes = [var["ncc_obs_code"] for var in NCC_OBS_CODES]
+    ncc_obs_codes = [resolve_ncc_obs_code(oc)["ncc_obs_code"] for oc in ncc_obs_codes]
+    if validators is None:
+        validators = {}
+    if max_workers is None:
+        max_workers = max(len(ncc_obs_codes), 1)
+
+    def fetch(oc):
+        logger.info(f"Fetching BoM station list for AUS obsCode {oc}")
+        result = download_bom_station_list(oc, **validators.get(oc, {}))
+        if result["text"] is None:
+            result["df"] = None
+        else:
+            result["df"] = parse_bom_station_list(result["text"], oc)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(fetch, ncc_obs_codes))
+    return {result["ncc_obs_code"]: result for result in results}
+
+
+@instrumented
 def fetch_bom_c_values(ncc_obs_code, station_code, radius_km=10):
+    """Fetch the table of ``p_c`` values for stations near a station.
+
+    Args:
+        ncc_obs_code (int or str): the nccObsCode or an alias e.g. "daily_rain"
+        station_code (int or str): BoM station number
+        radius_km (float): include all stations within this distance
+
+    Returns:
+        pandas DataFrame, one row per station, with the ``p_c`` value in
+        column "c".
+
+    """
     ncc_obs_code = resolve_ncc_obs_code(ncc_obs_code)["ncc_obs_code"]
     logger.debug(f"Using resolved ncc_obs_code {ncc_obs_code}")
-    url = (
-        f"http://www.bom.gov.au/jsp/ncc/cdio/weatherStationDirectory"
-        f"/d?p_display_type=ajaxStnListing"
-        f"&p_nccObsCode={ncc_obs_code}&p_stnNum={station_code}&p_radius={radius_km}"
-    )
-    r = requests.get(url)
-    buffer = io.StringIO(r.text)
+    r = get_scheduler().get(bom_c_values_url(ncc_obs_code, station_code, radius_km))
+    r.raise_for_status()
+    return parse_bom_c_values(r.text)
+
+
+@instrumented
+def parse_bom_c_values(html):
+    """Parse the BoM weather station directory listing into a table.
+
+    Args:
+        html (str): the ajaxStnListing response
+
+    Returns:
+        pandas DataFrame, see :func:`fetch_bom_c_values`.
+
+    """
+    buffer = io.StringIO(html)
     return pd.read_html(buffer)[0].rename(columns={"Unnamed: 10": "c"})
 
 
+def bom_c_values_mapping(c_table):
+    """Convert a table of ``p_c`` values to a mapping.
+
+    Args:
+        c_table (pd.DataFrame): from :func:`fetch_bom_c_values`
+
+    Returns:
+        dict: maps station number (int) to ``p_c`` (int)
+
+    """
+    station_cols = [c for c in c_table.columns if "number" in str(c).lower()]
+    station_col = station_cols[0] if station_cols else c_table.columns[0]
+    table = c_table[[station_col, "c"]].dropna()
+    return {
+        int(station): int(p_c)
+        for station, p_c in zip(
+            pd.to_numeric(table[station_col], errors="coerce"), table["c"]
+        )
+        if not pd.isnull(station)
+    }
+
+
+def plan_bom_c_value_queries(stations, radius_km=50, station_list=None):
+    """Plan the fewest station directory queries that cover a set of stations.
+
+    Each query to the BoM weather station directory returns ``p_c`` values
+    for every station within *radius_km* of the centre station, so this
+    greedily picks centres that cover the most remaining stations.
+
+    Args:
+        stations (sequence of ints): BoM station numbers
+        radius_km (float): radius used for each query
+        station_list (pd.DataFrame): with columns station_id, lat and lon,
+            default :func:`ausweather.get_silo_station_list`
+
+    Returns:
+        list: of (centre station, list of stations expected to be covered)
+        tuples. Stations without known coordinates get a query each.
+
+    """
+    if station_list is None:
+        station_list = get_silo_station_list()
+    stations = list(dict.fromkeys(int(s) for s in stations))
+    coords = station_list.drop_duplicates("station_id").set_index("station_id")
+    located = [s for s in stations if s in coords.index]
+    plan = [(s, [s]) for s in stations if not s in coords.index]
+    if not located:
+        return plan
+
+    # Stations within radius_km of each other, found with a KD-tree of unit
+    # vectors (so memory grows with the number of neighbours, not stations
+    # squared). A great-circle distance d is a chord of 2 sin(d / 2R).
+    lat = np.radians(coords.loc[located, "lat"].values.astype(float))
+    lon = np.radians(coords.loc[located, "lon"].values.astype(float))
+    xyz = np.column_stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+    )
+    chord = 2 * np.sin(min(radius_km / (2 * 6371), np.pi / 2))
+    pairs = spatial.cKDTree(xyz).query_pairs(chord, output_type="ndarray")
+    n = len(located)
+    rows = np.concatenate([pairs[:, 0], pairs[:, 1], np.arange(n)])
+    cols = np.concatenate([pairs[:, 1], pairs[:, 0], np.arange(n)])
+    within = sparse.csr_matrix((np.ones(len(rows), dtype=bool), (rows, cols)), (n, n))
+
+    uncovered = np.ones(n, dtype=bool)
+    counts = np.diff(within.indptr)
+    while uncovered.any():
+        centre = int(np.argmax(np.where(uncovered, counts, -1)))
+        neighbours = within.indices[within.indptr[centre] : within.indptr[centre + 1]]
+        covered = np.sort(neighbours[uncovered[neighbours]])
+        plan.append((located[centre], [located[i] for i in covered]))
+        uncovered[covered] = False
+        # Covered stations no longer count towards their neighbours' totals.
+        counts = counts - np.bincount(within[covered].indices, minlength=n)
+    return plan
+
+
+@instrumented
+def fetch_bom_weather_data(ncc_obs_code, station, p_c=None, chunk_size=2**16):
+    """Fetch daily or monthly data for a station directly from the BoM.
+
+    Args:
+        ncc_obs_code (int or str): the nccObsCode or an alias e.g. "daily_rain"
+        station (int or str): BoM station number
+        p_c (int): the ``p_c`` value for this station and obs code. If None, it
+            is looked up with :meth:`ausweather.Database.resolve_bom_p_c` in
+            the default cache database (see :func:`ausweather.get_database`),
+            so only the first lookup for a station fetches and parses the
+            station listing.
+        chunk_size (int): bytes to read from the network at a time
+
+    Returns:
+        pandas DataFrame with the same columns as
+        :meth:`ausweather.RainfallStationData.daily` - date, the value
+        column (e.g. rainfall), interpolated_code, quality, year, dayofyear
+        and finyear - plus "period", the number of days the value was
+        accumulated over. Quality is 1 for quality-controlled values and 0
+        otherwise.
+
+    The zip file is streamed to a spooled temporary file and the "_Data"
+    CSV member is parsed straight out of the archive.
+
+    """
+    var = resolve_ncc_obs_code(ncc_obs_code)
+    if p_c is None:
+        from ausweather.database import get_database
+
+        p_c = get_database().resolve_bom_p_c(var["ncc_obs_code"], station)
+    url = bom_weather_data_url(var["ncc_obs_code"], station, p_c)
+    logger.debug(f"Fetching BoM data from {url}")
+    with tempfile.SpooledTemporaryFile(max_size=2**24) as buffer:
+        with get_scheduler().get(url, stream=True) as r:
+            r.raise_for_status()
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                buffer.write(chunk)
+        buffer.seek(0)
+        return parse_bom_weather_data(buffer, var["ncc_obs_code"])
+
+
+@instrumented
+def parse_bom_weather_data(file, ncc_obs_code):
+    """Parse a BoM zipped daily/monthly data file.
+
+    Args:
+        file (str or file-like): the zip file
+        ncc_obs_code (int or str): the nccObsCode or an alias e.g. "daily_rain"
+
+    Returns:
+        pandas DataFrame, see :func:`fetch_bom_weather_data`.
+
+    """
+    from ausweather.core import dates_to_finyear
+
+    var = resolve_ncc_obs_code(ncc_obs_code)
+    schema = BOM_DATA_FILE_SCHEMAS[var["interval"]]
+    with zipfile.ZipFile(file) as zfile:
+        member = [fn for fn in zfile.namelist() if "_Data" in fn][0]
+        with zfile.open(member) as f:
+            df = pd.read_csv(
+                f,
+                header=0,
+                names=schema["names"],
+                dtype=schema["dtype"],
+                encoding="latin-1",
+            )
+    day = df["day"] if "day" in df.columns else 1
+    dates = pd.to_datetime(
+        pd.DataFrame({"year": df.year, "month": df.month, "day": day})
+    )
+    result = pd.DataFrame(
+        {
+            "date": dates,
+            var["value_col"]: df["value"],
+            "interpolated_code": 0,
+            "quality": df["quality"].map({"Y": 1, "N": 0}).astype(float),
+            "year": dates.dt.year,
+            "dayofyear": dates.dt.dayofyear,
+            "finyear": dates_to_finyear(dates).values,
+        }
+    )
+    if "period" in df.columns:
+        result["period"] = df["period"]
+    return result
+
+
+@instrumented
 def parse_bom_rainfall_station_list(filename=None):
     """Parse BoM station directory without getting the web scraping error.
 
@@ -145,19 +514,9 @@ def parse_bom_rainfall_station_list(filename=None):
     """
     if filename is None:
         filename = Path(__file__).parent / "alphaSA_136.txt"
-    IDCJMC0014 = {
-        "colspecs": [
-            (2, 8),
-            (8, 49),
-            (49, 58),
-            (58, 68),
-            (68, 77),
-            (77, 86),
-            (86, 93),
-            (93, 98),
-            (98, 102),
-        ],
-        "columns": [
+    df = parse_bom_station_directory(filename)
+    return df[
+        [
             "station_id",
             "station_name",
             "lat",
@@ -167,21 +526,303 @@ def parse_bom_rainfall_station_list(filename=None):
             "years",
             "pct",
             "aws",
-        ],
-        "numeric": ["station_id", "lat", "lon", "years", "pct"],
-        "bool_yn": ["aws"],
-        "datetime": ["start", "end"],
-    }
-    spec = IDCJMC0014
-    df = pd.read_fwf(
-        filename,
-        colspecs=spec["colspecs"],
-    ).iloc[3:-3]
-    df.columns = spec["columns"]
-    for col in spec["numeric"]:
-        df[col] = pd.to_numeric(df[col])
-    for col in spec["bool_yn"]:
-        df[col] = df[col].map({"Y": True, "N": False})
-    for col in spec["datetime"]:
+        ]
+    ]
+
+
+# BoM station numbers start with a two-digit district number, which
+# determines the state.
+STATE_DISTRICTS = [
+    ("WA", 1, 13),
+    ("NT", 14, 15),
+    ("SA", 16, 26),
+    ("QLD", 27, 45),
+    ("NSW", 46, 75),
+    ("VIC", 76, 90),
+    ("TAS", 91, 99),
+]
+
+IDCJMC0014_PATTERN = (
+    r"^\s*(?P<station_id>\d+)\s+(?P<station_name>.+?)\s+"
+    r"(?P<lat>-?\d+\.\d+)\s+(?P<lon>-?\d+\.\d+)\s+(?:(?P<state>[A-Z]{2,3})\s+)?"
+    r"(?P<start>[A-Z][a-z]{2} \d{4})\s+(?P<end>[A-Z][a-z]{2} \d{4})\s+"
+    r"(?P<years>\d+(?:\.\d+)?)\s+(?P<pct>\d+)(?:\s+(?P<aws>[YN]))?\s*$"
+)
+
+
+def bom_station_state(station_ids):
+    """Work out the state of BoM stations from their station numbers.
+
+    Args:
+        station_ids (sequence of ints): BoM station numbers
+
+    Returns:
+        numpy array of state abbreviations ("" where unknown).
+
+    """
+    district = np.asarray(station_ids, dtype=int) // 1000 % 100
+    return np.select(
+        [(district >= lo) & (district <= hi) for _, lo, hi in STATE_DISTRICTS],
+        [state for state, _, _ in STATE_DISTRICTS],
+        default="",
+    )
+
+
+@instrumented
+def parse_bom_station_directory(file, state=None, ncc_obs_code=None):
+    """Parse any BoM IDCJMC0014 station list, for one state or all Australia.
+
+    Args:
+        file (str, Path or file-like): e.g. alphaSA_136.txt or
+            alphaAUS_122.txt from
+            http://www.bom.gov.au/climate/data/lists_by_element/
+        state (str): state abbreviation. If None, it is taken from the
+            filename, or from the station numbers for "AUS" lists.
+        ncc_obs_code (int): if None, it is taken from the filename.
+
+    Returns:
+        pandas DataFrame with columns station_id, station_name, lat, lon,
+        state, start, end, years, pct, aws and ncc_obs_code.
+
+    The rows are matched with a single vectorised regular expression rather
+    than fixed column positions, so state and national lists with slightly
+    different layouts are handled the same way.
+
+    """
+    if hasattr(file, "read"):
+        text = file.read()
+        name = getattr(file, "name", "")
+    else:
+        name = Path(file).name
+        with open(file, mode="r", encoding="latin-1") as f:
+            text = f.read()
+    if isinstance(text, bytes):
+        text = text.decode("latin-1")
+    m = re.match(r"alpha([A-Z]+)_(\d+)", str(name))
+    if m:
+        if state is None and m.group(1) != "AUS":
+            state = m.group(1)
+        if ncc_obs_code is None:
+            ncc_obs_code = int(m.group(2))
+
+    df = pd.Series(text.splitlines()).str.extract(IDCJMC0014_PATTERN)
+    df = df.dropna(subset=["station_id"]).reset_index(drop=True)
+    df["station_id"] = df["station_id"].astype(int)
+    df["station_name"] = df["station_name"].str.strip()
+    for col in ("lat", "lon", "years"):
+        df[col] = df[col].astype(float)
+    df["pct"] = df["pct"].astype(int)
+    df["aws"] = df["aws"].map({"Y": True, "N": False})
+    for col in ("start", "end"):
         df[col] = pd.to_datetime(df[col], format="%b %Y")
-    return df
+    if state is not None:
+        df["state"] = state
+    else:
+        derived = bom_station_state(df["station_id"].values)
+        df["state"] = df["state"].fillna(pd.Series(derived, index=df.index))
+    df["ncc_obs_code"] = ncc_obs_code
+    return df[
+        [
+            "station_id",
+            "station_name",
+            "lat",
+            "lon",
+            "state",
+            "start",
+            "end",
+            "years",
+            "pct",
+            "aws",
+            "ncc_obs_code",
+        ]
+    ]
+
+
+class BomStationDirectory:
+    """National directory of BoM stations, indexed by station and obs code.
+
+    Args:
+        df (pd.DataFrame): rows from :func:`parse_bom_station_directory`
+
+    Attributes:
+        df (pd.DataFrame)
+
+    Use :func:`get_bom_station_directory` to get the default directory, or
+    :meth:`from_files` or :meth:`download` to build one from station lists.
+
+    The default directory is BoM's national daily rainfall station list,
+    downloaded once and cached (see :func:`get_bom_station_directory`).
+
+    """
+
+    def __init__(self, df):
+        self.df = df.reset_index(drop=True)
+        self._index = None
+
+    @classmethod
+    def from_files(cls, filenames):
+        """Build from IDCJMC0014 station list files for any states.
+
+        Args:
+            filenames (sequence): paths to alpha{STATE}_{code}.txt or
+                alphaAUS_{code}.txt files
+
+        Returns:
+            :class:`ausweather.bom.BomStationDirectory`
+
+        Where a station appears in more than one file for the same obs code
+        (e.g. in a state list and the national list) the last one is kept.
+
+        """
+        df = pd.concat([parse_bom_station_directory(fn) for fn in filenames])
+        df = df.drop_duplicates(subset=["station_id", "ncc_obs_code"], keep="last")
+        return cls(df)
+
+    @classmethod
+    @instrumented
+    def download(cls, ncc_obs_codes=(136,)):
+        """Build from BoM's national station lists.
+
+        Args:
+            ncc_obs_codes (sequence): nccObsCodes or aliases, default daily
+                rainfall only
+
+        Returns:
+            :class:`ausweather.bom.BomStationDirectory`
+
+        """
+        dfs = []
+        for ncc_obs_code in ncc_obs_codes:
+            result = download_bom_station_list(ncc_obs_code)
+            dfs.append(
+                parse_bom_station_directory(
+                    io.StringIO(result["text"]), ncc_obs_code=result["ncc_obs_code"]
+                )
+            )
+        return cls(pd.concat(dfs))
+
+    @classmethod
+    def load(cls, filename):
+        """Load a directory saved with :meth:`save`.
+
+        The file is unpickled, so only load files you (or ausweather) wrote.
+
+        """
+        return cls(pd.read_pickle(filename))
+
+    def save(self, filename):
+        """Save the directory in a binary (pickle) format."""
+        self.df.to_pickle(filename)
+
+    def _build_index(self):
+        records = zip(
+            self.df.station_id.values,
+            self.df.ncc_obs_code.values,
+            self.df.start,
+            self.df.end,
+        )
+        self._index = {(int(s), oc): (start, end) for s, oc, start, end in records}
+
+    def span(self, station_id, ncc_obs_code=136):
+        """Look up the start and end of a station's record.
+
+        Args:
+            station_id (int or str): BoM station number
+            ncc_obs_code (int or str): the nccObsCode or an alias
+
+        Returns:
+            tuple: (start, end) as pd.Timestamps, or None if the station is
+            not in the directory.
+
+        """
+        if self._index is None:
+            self._build_index()
+        oc = resolve_ncc_obs_code(ncc_obs_code)["ncc_obs_code"]
+        return self._index.get((int(station_id), oc))
+
+
+# Filename of the cached national directory, in ausweather.user_cache_dir().
+STATION_DIRECTORY_CACHE = "bom_station_directory.pkl"
+
+_station_directory = None
+_station_directory_lock = threading.Lock()
+
+
+def _bundled_station_directory():
+    return BomStationDirectory.from_files(
+        sorted(Path(__file__).parent.glob("alpha*_*.txt"))
+    )
+
+
+def _national_station_directory(refresh=False):
+    """The cached national directory, downloading it if necessary.
+
+    Falls back to the bundled (SA only) lists if it can't be downloaded.
+
+    """
+    from ausweather.database import user_cache_dir
+
+    path = user_cache_dir() / STATION_DIRECTORY_CACHE
+    if path.is_file() and not refresh:
+        return BomStationDirectory.load(path)
+    try:
+        directory = BomStationDirectory.download()
+    except (requests.RequestException, OSError) as e:
+        logger.warning(
+            f"Could not download the national BoM station list ({e}); "
+            "using the bundled list, which only covers SA"
+        )
+        return _bundled_station_directory()
+    directory.save(path)
+    logger.debug(f"Cached the national BoM station directory in {path}")
+    return directory
+
+
+def get_bom_station_directory(filename=None, refresh=False):
+    """Get the BoM station directory, loading it on first use.
+
+    Args:
+        filename (str): a directory saved with
+            :meth:`BomStationDirectory.save` (a pickle file, so only load
+            files you trust).
+        refresh (bool): download the national list again, replacing the
+            cached copy
+
+    Returns:
+        :class:`ausweather.bom.BomStationDirectory`
+
+    By default this is the directory set with :func:`set_bom_station_directory`,
+    or else BoM's national daily rainfall station list. That is downloaded
+    on first use and cached as "bom_station_directory.pkl" (a pickle
+    written by ausweather) in :func:`ausweather.user_cache_dir`. If it
+    can't be downloaded, the station lists bundled with ausweather are used
+    instead for this session; they only cover South Australia.
+
+    """
+    global _station_directory
+    if filename is not None:
+        return BomStationDirectory.load(filename)
+    with _station_directory_lock:
+        if _station_directory is None or refresh:
+            _station_directory = _national_station_directory(refresh)
+        return _station_directory
+
+
+def set_bom_station_directory(directory):
+    """Replace the default :class:`BomStationDirectory`.
+
+    Args:
+        directory (BomStationDirectory or str): a directory, or the filename
+            of one saved with :meth:`BomStationDirectory.save`
+
+    e.g. to look up other obs codes as well as daily rainfall:
+
+    .. code-block::
+
+        >>> set_bom_station_directory(BomStationDirectory.download([136, 122]))
+
+    """
+    global _station_directory
+    if not isinstance(directory, BomStationDirectory):
+        directory = BomStationDirectory.load(directory)
+    _station_directory = directory
@@ -0,0 +1,357 @@
+"""Catalogue of the stations available via SILO, for fast filtered queries.
+
+The catalogue joins the SILO station list with the BoM station directory
+once, and keeps the result sorted by station number with the record span
+(total_span_yrs) already calculated, so queries are just vectorised masks:
+
+.. code-block::
+
+    >>> catalogue = get_station_catalogue()
+    >>> catalogue.query(state="SA", current=True, min_span=30)
+    >>> catalogue.query(bbox=(138.4, -35.2, 138.8, -34.6), aws=True)
+    >>> catalogue.get(23090)
+
+The default catalogue is built from the default BoM station directory,
+which is BoM's national list, cached locally (or only South Australia's,
+if that couldn't be downloaded - see
+:func:`ausweather.get_bom_station_directory`).
+:meth:`StationCatalogue.refresh` downloads the national station list again
+only if it has changed (using conditional GETs), and then updates only the
+stations that were added, removed or changed.
+
+"""
+
+from datetime import datetime
+import io
+import logging
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ausweather.bom import (
+    download_bom_station_list,
+    get_bom_station_directory,
+    parse_bom_station_directory,
+    resolve_ncc_obs_code,
+)
+from ausweather.metrics import instrumented
+from ausweather.silo import get_silo_station_list
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["StationCatalogue", "get_station_catalogue"]
+
+# Columns taken from the BoM station directory; the rest come from the
+# SILO station list.
+BOM_COLUMNS = ["start", "end", "years", "pct", "aws"]
+
+# A station is "current" if its record ends within this long of the
+# catalogue's as_of time (or of the time of the query).
+CURRENT_WITHIN = pd.Timedelta(days=120)
+
+
+class StationCatalogue:
+    """Stations available via SILO, with their BoM record spans.
+
+    Args:
+        df (pd.DataFrame): the columns of :func:`ausweather.get_silo_station_list`
+            plus those of :data:`BOM_COLUMNS`, one row per station
+        ncc_obs_code (int): the obs code the record spans are for
+        as_of (pd.Timestamp): time at which stations are "current" if
+            their records end within :data:`CURRENT_WITHIN` of it. Default
+            is the time of each query.
+        validators (dict): ETag and Last-Modified headers of the BoM station
+            list the catalogue was last refreshed from
+        silo_list (pd.DataFrame): the SILO station list, used for stations
+            added by :meth:`update`. Default
+            :func:`ausweather.get_silo_station_list`, loaded when needed.
+
+    Attributes:
+        df (pd.DataFrame): sorted by station_id, with columns station_id,
+            station_name, lat, lon, state, start, end, years (as reported by
+            BoM), pct (percent complete), aws and total_span_yrs. Treat it
+            as read-only.
+
+    Use :func:`get_station_catalogue` to get the default catalogue, or
+    :meth:`build` to make one.
+
+    """
+
+    def __init__(
+        self, df, ncc_obs_code=136, as_of=None, validators=None, silo_list=None
+    ):
+        self.ncc_obs_code = resolve_ncc_obs_code(ncc_obs_code)["ncc_obs_code"]
+        self.validators = validators or {}
+        self.silo_list = silo_list
+        self.set_as_of(as_of)
+        self._set_df(df)
+
+    def _set_df(self, df):
+        df = df.drop(columns=["current"], errors="ignore")
+        df = df.sort_values("station_id").reset_index(drop=True)
+        df["state"] = df.state.astype(str).str.strip().astype("category")
+        df["aws"] = df.aws.fillna(False).astype(bool)
+        df["total_span_yrs"] = (df.end - df.start).dt.days / 365.25
+        self.df = df
+
+    @classmethod
+    @instrumented
+    def build(cls, directory=None, silo_list=None, ncc_obs_code=136):
+        """Build a catalogue from the SILO station list and BoM directory.
+
+        Args:
+            directory (str or BomStationDirectory): default
+                :func:`ausweather.get_bom_station_directory`
+            silo_list (pd.DataFrame): default
+                :func:`ausweather.get_silo_station_list`
+            ncc_obs_code (int or str): obs code for the record spans,
+                default 136 (daily rainfall)
+
+        Returns:
+            :class:`ausweather.StationCatalogue`
+
+        """
+        if directory is None or isinstance(directory, (str, Path)):
+            directory = get_bom_station_directory(directory)
+        if silo_list is None:
+            silo_list = get_silo_station_list()
+        oc = resolve_ncc_obs_code(ncc_obs_code)["ncc_obs_code"]
+        spans = directory.df[directory.df.ncc_obs_code == oc]
+        df = pd.merge(
+            silo_list, spans[["station_id"] + BOM_COLUMNS], on="station_id", how="inner"
+        )
+        return cls(df, oc, silo_list=silo_list)
+
+    @classmethod
+    def load(cls, filename):
+        """Load a catalogue saved with :meth:`save`."""
+        return cls(**pd.read_pickle(filename))
+
+    def save(self, filename):
+        """Save the catalogue in a binary (pickle) format."""
+        pd.to_pickle(
+            {
+                "df": self.df,
+                "ncc_obs_code": self.ncc_obs_code,
+                "as_of": self.as_of,
+                "validators": self.validators,
+                "silo_list": self.silo_list,
+            },
+            filename,
+        )
+
+    def set_as_of(self, as_of=None):
+        """Set the time "current" is judged at, or None for the time of each query."""
+        self.as_of = None if as_of is None else pd.Timestamp(as_of)
+
+    def _as_of(self):
+        return pd.Timestamp(datetime.now()) if self.as_of is None else self.as_of
+
+    def current(self):
+        """Boolean array of which rows of :attr:`df` are current.
+
+        This is calculated when called, for :attr:`as_of` or else now.
+
+        """
+        return ((self._as_of() - self.df.end) < CURRENT_WITHIN).values
+
+    def __len__(self):
+        return len(self.df)
+
+    def __contains__(self, station_id):
+        return self._position(station_id) is not None
+
+    def _position(self, station_id):
+        ids = self.df.station_id.values
+        i = np.searchsorted(ids, int(station_id))
+        if i < len(ids) and ids[i] == int(station_id):
+            return i
+        return None
+
+    def get(self, station_id):
+        """Look up one station.
+
+        Returns:
+            pd.Series: the station's row of :attr:`df`, plus "current"
+
+        """
+        i = self._position(station_id)
+        if i is None:
+            raise KeyError(f"Station {station_id} is not in the catalogue")
+        row = self.df.iloc[i].copy()
+        row["current"] = (self._as_of() - row.end) < CURRENT_WITHIN
+        return row
+
+    def mask(
+        self,
+        state=None,
+        current=None,
+        aws=None,
+        min_span=None,
+        min_pct=None,
+        bbox=None,
+        station_ids=None,
+    ):
+        """Boolean array selecting the rows of :attr:`df` matching a query.
+
+        Args: see :meth:`query`.
+
+        """
+        df = self.df
+        mask = np.ones(len(df), dtype=bool)
+        if state is not None:
+            states = [state] if isinstance(state, str) else state
+            mask &= df.state.isin([s.upper() for s in states]).values
+        if current is not None:
+            mask &= self.current() == current
+        if aws is not None:
+            mask &= df.aws.values == aws
+        if min_span is not None:
+            mask &= df.total_span_yrs.values >= min_span
+        if min_pct is not None:
+            mask &= df.pct.values >= min_pct
+        if bbox is not None:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            lon, lat = df.lon.values, df.lat.values
+            mask &= (lon >= min_lon) & (lon <= max_lon)
+            mask &= (lat >= min_lat) & (lat <= max_lat)
+        if station_ids is not None:
+            mask &= np.isin(df.station_id.values, np.asarray(station_ids, dtype=int))
+        return mask
+
+    @instrumented
+    def query(
+        self,
+        state=None,
+        current=None,
+        aws=None,
+        min_span=None,
+        min_pct=None,
+        bbox=None,
+        station_ids=None,
+    ):
+        """Select stations.
+
+        Args:
+            state (str or sequence): state abbreviation(s) e.g. "SA"
+            current (bool): True for stations still open (see
+                :meth:`current`), False for closed ones
+            aws (bool): True for automatic weather stations, False for others
+            min_span (float): minimum years from the start to the end of
+                the record
+            min_pct (float): minimum percent complete, as reported by BoM
+            bbox (tuple): (min_lon, min_lat, max_lon, max_lat)
+            station_ids (sequence): only these station numbers
+
+        Returns:
+            pd.DataFrame: the matching rows of :attr:`df`, sorted by
+            station_id, with a "current" column calculated for the query.
+
+        """
+        mask = self.mask(state, current, aws, min_span, min_pct, bbox, station_ids)
+        return self.df[mask].assign(current=self.current()[mask]).reset_index(drop=True)
+
+    @instrumented
+    def update(self, spans):
+        """Apply a new BoM station list, changing only the rows that differ.
+
+        Args:
+            spans (pd.DataFrame): from :func:`ausweather.parse_bom_station_directory`
+                for this catalogue's obs code. Stations of the states in it
+                that are missing from it are removed.
+
+        Returns:
+            dict: the station numbers "added", "removed" and "updated".
+
+        """
+        spans = spans[spans.ncc_obs_code == self.ncc_obs_code]
+        spans = spans.drop_duplicates("station_id", keep="last").set_index("station_id")
+        covered = set(spans.state.dropna().astype(str).str.strip())
+        spans = spans[BOM_COLUMNS].assign(aws=spans.aws.fillna(False).astype(bool))
+        if self.silo_list is None:
+            self.silo_list = get_silo_station_list()
+        spans = spans[spans.index.isin(self.silo_list.station_id.values)]
+
+        old = self.df.set_index("station_id")
+        in_scope = old.state.isin(covered).values
+        removed = old.index[in_scope & ~old.index.isin(spans.index)]
+        added = spans.index[~spans.index.isin(old.index)]
+        common = spans.index[spans.index.isin(old.index)]
+        before = old.loc[common, BOM_COLUMNS]
+        after = spans.loc[common, BOM_COLUMNS]
+        differs = ~(
+            (before.values == after.values)
+            | (pd.isnull(before).values & pd.isnull(after).values)
+        ).all(axis=1)
+        updated = common[differs]
+
+        if len(removed) or len(added) or len(updated):
+            df = old.drop(index=removed)
+            for col in BOM_COLUMNS:
+                df.loc[updated, col] = spans.loc[updated, col].values
+            new = pd.merge(
+                self.silo_list[self.silo_list.station_id.isin(added)],
+                spans.loc[added].reset_index(),
+                on="station_id",
+            )
+            df = pd.concat([df.reset_index(), new], ignore_index=True)
+            self._set_df(df.assign(state=df.state.astype(str)))
+        logger.debug(
+            f"Station catalogue: {len(added)} added, {len(removed)} removed, "
+            f"{len(updated)} updated"
+        )
+        return {
+            "added": list(added),
+            "removed": list(removed),
+            "updated": list(updated),
+        }
+
+    @instrumented
+    def refresh(self):
+        """Update from BoM's national station list, if it has changed.
+
+        The list is downloaded with the ETag/Last-Modified headers from the
+        previous refresh, so an unchanged list is not downloaded again. The
+        first refresh of a catalogue built from the bundled (SA only)
+        station lists adds the stations of the other states.
+
+        Returns:
+            dict: as for :meth:`update`, with an extra key "modified" - False
+            if the list had not changed.
+
+        """
+        result = download_bom_station_list(self.ncc_obs_code, **self.validators)
+        self.validators = {
+            "etag": result["etag"],
+            "last_modified": result["last_modified"],
+        }
+        if result["text"] is None:
+            return {"modified": False, "added": [], "removed": [], "updated": []}
+        spans = parse_bom_station_directory(
+            io.StringIO(result["text"]), ncc_obs_code=self.ncc_obs_code
+        )
+        return dict(modified=True, **self.update(spans))
+
+
+_station_catalogue = None
+
+
+def get_station_catalogue(filename=None):
+    """Get the catalogue of stations available via SILO, building it on first use.
+
+    Args:
+        filename (str): a catalogue saved with :meth:`StationCatalogue.save`.
+            Default is to build it with :meth:`StationCatalogue.build` (once
+            per session).
+
+    Returns:
+        :class:`ausweather.StationCatalogue`
+
+    """
+    global _station_catalogue
+    if filename is not None:
+        return StationCatalogue.load(filename)
+    if _station_catalogue is None:
+        _station_catalogue = StationCatalogue.build()
+    return _station_catalogue
@@ -1,9 +1,14 @@
 import colorsys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date, datetime, timedelta
 import io
+import logging
+import os
+from pathlib import Path
 import re
 
 import matplotlib.pyplot as plt
+from matplotlib import collections as mcollections
 from matplotlib import lines as mlines
 from matplotlib import gridspec
 from matplotlib import dates as mdates
@@ -11,10 +16,72 @@ from matplotlib import ticker as mticker
 import pandas as pd
 import numpy as np
 
-__all__ = ["plot_silo_station"]
+logger = logging.getLogger(__name__)
 
+__all__ = [
+    "plot_silo_station",
+    "render_silo_stations",
+    "SiloStationTemplate",
+    "plot_cumulative_rainfall",
+    "cumulative_rainfall_by_day",
+    "plot_daily_series",
+    "downsample_indices",
+    "DownsampledLine",
+]
 
-def plot_silo_station(rf_annual, rf_mean, rf_annual_srn, title=""):
+
+# Size of the figures drawn by plot_silo_station.
+SILO_STATION_FIGSIZE = (7.2, 3)
+
+
+def _silo_station_axes(fig):
+    gs = gridspec.GridSpec(2, 1, height_ratios=(4, 1), figure=fig)
+    ax_rf = fig.add_subplot(gs[0])
+    ax_interp = fig.add_subplot(gs[1], sharex=ax_rf)
+    return ax_rf, ax_interp
+
+
+def _bars(ax, x, heights, bottom=0, width=0.8, **kwargs):
+    """Like ``ax.bar``, but draws all the bars as one PolyCollection.
+
+    Adding and drawing hundreds of separate Rectangle patches is most of the
+    cost of a chart with one bar per year.
+
+    """
+    x = np.asarray(x, dtype=float)
+    bottom = np.broadcast_to(np.asarray(bottom, dtype=float), x.shape)
+    top = bottom + np.asarray(heights, dtype=float)
+    left = x - width / 2
+    right = x + width / 2
+    verts = np.stack(
+        [
+            np.column_stack([left, bottom]),
+            np.column_stack([left, top]),
+            np.column_stack([right, top]),
+            np.column_stack([right, bottom]),
+        ],
+        axis=1,
+    )
+    bars = mcollections.PolyCollection(verts, edgecolor="none", **kwargs)
+    # Autoscale to zero without a margin, as ax.bar does.
+    bars.sticky_edges.y.append(0)
+    ax.add_collection(bars, autolim=True)
+    ax.autoscale_view()
+    return bars
+
+
+def _draw_silo_station(
+    ax_rf, ax_interp, rf_annual, rf_mean, rf_annual_srn, title="", bar=None
+):
+    """Draw the chart of :func:`plot_silo_station` on a pair of axes.
+
+    *bar* draws the bars, with the signature of ``ax.bar`` but taking the
+    axes first. The default uses ``ax.bar``; :class:`SiloStationTemplate`
+    passes :func:`_bars`, which looks the same but is faster to draw.
+
+    """
+    if bar is None:
+        bar = lambda ax, x, heights, **kwargs: ax.bar(x, heights, **kwargs)
     colour = {"rainfall": (0 / 255, 176 / 255, 240 / 255, 1), "mean": "#bebebe"}
     rf_srn_colours = {
         "Interpolated": "tan",
@@ -22,13 +89,12 @@ def plot_silo_station(rf_annual, rf_mean, rf_annual_srn, title=""):
         #     "Observations": "snow"
     }
 
-    fig = plt.figure(figsize=(7.2, 3))
-    gs = gridspec.GridSpec(2, 1, height_ratios=(4, 1))
-    ax_rf = fig.add_subplot(gs[0])
-    ax_interp = fig.add_subplot(gs[1], sharex=ax_rf)
-
-    ax_rf.bar(
-        rf_annual.index, rf_annual, color=colour["rainfall"], label="Annual rainfall"
+    bar(
+        ax_rf,
+        rf_annual.index,
+        rf_annual.values,
+        facecolor=colour["rainfall"],
+        label="Annual rainfall",
     )
     ax_rf.plot(
         [rf_annual.index[0] - 0.5, rf_annual.index[-1] + 0.5],
@@ -45,12 +111,13 @@ def plot_silo_station(rf_annual, rf_mean, rf_annual_srn, title=""):
     for column in srn_cols:
         rf_srn = rf_annual_srn[column]
         heights = rf_srn.values
-        ax_interp.bar(
+        bar(
+            ax_interp,
             rf_srn.index.values,
             heights,
-            bottom=bottom,
+            bottom=bottom.copy(),
             label=column,
-            color=rf_srn_colours.get(column, "gray"),
+            facecolor=rf_srn_colours.get(column, "gray"),
         )
         bottom += heights
 
@@ -60,16 +127,553 @@ def plot_silo_station(rf_annual, rf_mean, rf_annual_srn, title=""):
 
     ax_rf.set_ylabel("Annual rainfall (mm)", fontsize="medium")
     ax_interp.set_ylabel("% of year", fontsize="medium")
-    _ = plt.setp(ax_rf.get_xticklabels(), visible=False, fontsize="medium")
-    _ = plt.setp(ax_interp.get_xticklabels(), fontsize="medium")
+    # tick_params rather than setp, so that it applies to ticks created later.
+    ax_rf.tick_params(axis="x", labelbottom=False, labelsize="medium")
+    ax_interp.tick_params(axis="x", labelsize="medium", labelrotation=90)
     ax_rf.set_title(title, fontsize="medium")
-    ax_rf.legend(loc="best", frameon=False, fontsize="x-small", ncol=2)
+    # The mean line comes first in the legend, whichever way the bars are drawn.
+    handles, labels = ax_rf.get_legend_handles_labels()
+    order = sorted(
+        range(len(labels)), key=lambda i: labels[i] != "Mean annual rainfall"
+    )
+    ax_rf.legend(
+        [handles[i] for i in order],
+        [labels[i] for i in order],
+        loc="best",
+        frameon=False,
+        fontsize="x-small",
+        ncol=2,
+    )
     interp_leg = ax_interp.legend(
         loc="best", frameon=True, fontsize="x-small", framealpha=0.8, ncol=2
     )
     interp_leg.get_frame().set_linewidth(0)
     ax_interp.set_ylim(0, 100)
     ax_interp.xaxis.set_major_locator(mticker.MultipleLocator(5))
+
+
+def plot_silo_station(rf_annual, rf_mean, rf_annual_srn, title=""):
+    fig = plt.figure(figsize=SILO_STATION_FIGSIZE)
+    ax_rf, ax_interp = _silo_station_axes(fig)
+    _draw_silo_station(ax_rf, ax_interp, rf_annual, rf_mean, rf_annual_srn, title)
     fig.tight_layout()
-    plt.setp(ax_interp.get_xticklabels(), rotation=90, ha="center")
     return {"fig": fig, "ax_rf": ax_rf, "ax_interp": ax_interp}
+
+
+class SiloStationTemplate:
+    """A reusable figure for rendering :func:`plot_silo_station` charts to files.
+
+    Args:
+        figsize (tuple): figure size in inches
+        dpi (int): resolution for raster formats
+
+    The figure uses the Agg canvas directly and is never registered with
+    pyplot, so nothing accumulates across a batch. The figure and axes are
+    built once; each :meth:`render` only clears and redraws the axes, and
+    the layout is only recalculated when something it depends on (the
+    number of title lines, or the length of the tick labels) changes.
+
+    """
+
+    def __init__(self, figsize=SILO_STATION_FIGSIZE, dpi=100):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        self.fig = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.fig)
+        self.ax_rf, self.ax_interp = _silo_station_axes(self.fig)
+        self._layout = None
+
+    def _layout_key(self):
+        title = self.ax_rf.get_title()
+        key = [title.count("\n") + 1 if title else 0]
+        for axis in (self.ax_rf.yaxis, self.ax_interp.yaxis, self.ax_interp.xaxis):
+            labels = axis.get_major_formatter().format_ticks(axis.get_majorticklocs())
+            key.append(max((len(label) for label in labels), default=0))
+        return tuple(key)
+
+    def draw(self, rf_annual, rf_mean, rf_annual_srn, title=""):
+        """Clear the axes and draw a chart - see :func:`plot_silo_station`."""
+        self.ax_rf.cla()
+        self.ax_interp.cla()
+        _draw_silo_station(
+            self.ax_rf,
+            self.ax_interp,
+            rf_annual,
+            rf_mean,
+            rf_annual_srn,
+            title,
+            bar=_bars,
+        )
+        key = self._layout_key()
+        if key != self._layout:
+            self.fig.tight_layout()
+            # Keep the subplot positions without re-running the layout on save.
+            self.fig.set_layout_engine(None)
+            self._layout = key
+
+    def render(self, filenames, rf_annual, rf_mean, rf_annual_srn, title=""):
+        """Draw a chart and save it to each of *filenames*."""
+        self.draw(rf_annual, rf_mean, rf_annual_srn, title)
+        for filename in filenames:
+            self.fig.savefig(filename)
+
+
+_template = None
+
+
+def _init_render_worker(figsize, dpi):
+    global _template
+    import matplotlib
+
+    matplotlib.use("Agg", force=True)
+    _template = SiloStationTemplate(figsize=figsize, dpi=dpi)
+
+
+def _render_jobs(jobs, template=None):
+    """Render (station, filenames, *plot args) jobs, returning the stations done."""
+    if template is None:
+        template = _template
+    rendered = []
+    for station, *args in jobs:
+        try:
+            template.render(*args)
+            rendered.append(station)
+        except Exception as e:
+            logger.warning(f"Failed to render station {station}: {e}")
+    return rendered
+
+
+def render_silo_stations(
+    stations,
+    output_dir=".",
+    formats=("png",),
+    processes=None,
+    figsize=SILO_STATION_FIGSIZE,
+    dpi=100,
+    chunk_size=8,
+):
+    """Render :func:`plot_silo_station` charts for many stations to files.
+
+    Args:
+        stations (iterable of dict): results of
+            :func:`ausweather.summarise_bom_station_from_silo` or
+            :func:`ausweather.fetch_bom_station_from_silo`
+        output_dir (str): directory for the files, which are named after the
+            station number e.g. "23090.png"
+        formats (sequence of str): file formats e.g. ("png", "svg")
+        processes (int): size of the process pool, default the number of
+            CPUs. With 1, the charts are rendered in this process.
+        figsize (tuple): figure size in inches
+        dpi (int): resolution for raster formats
+        chunk_size (int): number of stations sent to a worker at a time
+
+    Returns:
+        dict: maps station number to the list of files written. Stations
+        that failed to render are logged and left out.
+
+    Each worker process uses the Agg backend and one
+    :class:`SiloStationTemplate`, which is laid out once.
+
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    jobs = []
+    files = {}
+    for data in stations:
+        station = data["station_no"]
+        files[station] = [output_dir / f"{station}.{fmt}" for fmt in formats]
+        annual = data["annual"]
+        jobs.append(
+            (station, files[station], annual, annual.mean(), data["srn"], data["title"])
+        )
+
+    if processes == 1:
+        template = SiloStationTemplate(figsize=figsize, dpi=dpi)
+        rendered = _render_jobs(jobs, template)
+    else:
+        chunks = [jobs[i : i + chunk_size] for i in range(0, len(jobs), chunk_size)]
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_render_worker,
+            initargs=(figsize, dpi),
+        ) as executor:
+            rendered = [s for done in executor.map(_render_jobs, chunks) for s in done]
+    return {station: files[station] for station in rendered}
+
+
+# Day of year on which each month starts (in a leap year), for the x axis.
+MONTH_START_DAYS = {
+    pd.Timestamp(f"2000-{m:02d}-01")
+    .strftime("%b"): pd.Timestamp(f"2000-{m:02d}-01")
+    .dayofyear
+    for m in range(1, 13)
+}
+
+CUMULATIVE_BAND_COLOURS = ["azure", "lavender", "thistle"]
+
+
+def cumulative_rainfall_by_day(df, dt_col="date", value_col="rainfall"):
+    """Cumulative rainfall through each calendar year, as a 2D array.
+
+    Args:
+        df (pd.DataFrame): daily data e.g. ``RainfallStationData.df``
+        dt_col (str): column with the dates
+        value_col (str): column with the daily rainfall
+
+    Returns:
+        tuple: (years, values) where *years* is an array of the years in
+        *df* and *values* is an array of shape (len(years), 366), with the
+        cumulative rainfall on each day of the year and NaN where there is
+        no data. Days are aligned by month and day, as in a leap year: in
+        other years, 29 February (column 59) repeats the value for 28
+        February.
+
+    """
+    dates = pd.to_datetime(df[dt_col])
+    years, year_idx = np.unique(dates.dt.year.values, return_inverse=True)
+    leap = (years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0))
+    day_idx = dates.dt.dayofyear.values - 1
+    day_idx = day_idx + ((~leap[year_idx]) & (dates.dt.month.values > 2))
+    daily = np.full((len(years), 366), np.nan)
+    daily[year_idx, day_idx] = df[value_col].values
+    values = np.nancumsum(daily, axis=1)
+    values[np.isnan(daily)] = np.nan
+    values[~leap, 59] = values[~leap, 58]
+    return years, values
+
+
+def _ordinal(n):
+    n = int(n)
+    if 10 <= n % 100 <= 20:
+        return f"{n}th"
+    return f"{n}{ {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th') }"
+
+
+def plot_cumulative_rainfall(
+    rf,
+    highlight_years=None,
+    bands=((3, 97), (10, 90), (30, 70)),
+    ax=None,
+    title=None,
+):
+    """Chart cumulative rainfall through each calendar year.
+
+    Args:
+        rf (:class:`ausweather.RainfallStationData`): station data
+        highlight_years (sequence of int): years to draw in colour and
+            label, default the most recent year
+        bands (sequence of tuple): pairs of percentiles to shade between
+        ax (matplotlib Axes): axes to draw on, default a new figure
+        title (str): chart title, default the station ID and period
+
+    Returns:
+        dict: with keys "fig", "ax" and "background" (the LineCollection
+        of the other years).
+
+    All the years that are not highlighted are drawn as one LineCollection,
+    and the percentile bands are calculated from one array, so the time
+    taken does not grow with the length of the record.
+
+    """
+    years, values = cumulative_rainfall_by_day(rf.df)
+    if highlight_years is None:
+        highlight_years = [years[-1]]
+    highlight = np.isin(years, highlight_years)
+    days = np.arange(1, 367)
+
+    if ax is None:
+        fig = plt.figure()
+        ax = fig.add_subplot(111)
+        # Leave room for the labels to the right of the axes.
+        fig.subplots_adjust(right=0.82)
+    fig = ax.figure
+
+    segments = np.stack([np.broadcast_to(days, values.shape), values], axis=-1)[
+        ~highlight
+    ]
+    background = mcollections.LineCollection(
+        segments, linewidths=0.5, colors="k", alpha=0.1
+    )
+    ax.add_collection(background)
+
+    qs = sorted(set(q for band in bands for q in band))
+    pcts = dict(zip(qs, np.nanpercentile(values, qs, axis=0)))
+    for (lower, upper), colour in zip(bands, CUMULATIVE_BAND_COLOURS):
+        ax.fill_between(
+            days,
+            pcts[lower],
+            pcts[upper],
+            color=colour,
+            lw=1,
+            label=f"{_ordinal(lower)} to {_ordinal(upper)} pctle years",
+        )
+    mean = np.nanmean(values, axis=0)
+    ax.plot(days, mean, color="k", lw=1, label="Mean year")
+    ax.text(
+        366,
+        mean[-1],
+        f" Mean ({mean[-1]:.0f} mm)",
+        ha="left",
+        va="center",
+        fontsize=6,
+    )
+
+    for year in highlight_years:
+        row = values[years == year]
+        if not len(row):
+            logger.warning(f"No data for {year}")
+            continue
+        (line,) = ax.plot(days, row[0], lw=1.5, alpha=0.85, label=str(year))
+        last = np.flatnonzero(~np.isnan(row[0]))
+        if len(last):
+            day = last[-1]
+            ax.text(
+                day + 1,
+                row[0][day],
+                f" {year} ({row[0][day]:.0f} mm)",
+                ha="left",
+                va="center",
+                fontsize=6,
+                color=line.get_color(),
+            )
+
+    ax.set_xlim(0, 366)
+    ax.set_ylim(0, np.nanmax(values) * 1.05)
+    ax.legend(loc="upper left", fontsize="x-small", frameon=False, ncol=2)
+    ax.set_ylabel("Cumulative rainfall during calendar year (mm)", size="small")
+    if title is None:
+        title = f"{rf.station_id} ({years[0]} to {years[-1]})"
+    ax.set_title(title, size="medium")
+    ax.set_xticks(list(MONTH_START_DAYS.values()))
+    ax.set_xticklabels([f" {m}" for m in MONTH_START_DAYS.keys()], ha="left")
+    return {"fig": fig, "ax": ax, "background": background}
+
+
+DOWNSAMPLE_METHODS = ("minmax", "lttb")
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("int64")
+    return x.astype(float)
+
+
+def _minmax_indices(x, y, n_buckets):
+    """Indices of the minimum and maximum of *y* in each of *n_buckets*
+    equal-width buckets of *x*, plus the first and last points."""
+    n = len(y)
+    inner_edges = np.linspace(x[0], x[-1], n_buckets + 1)[1:-1]
+    bucket = np.searchsorted(inner_edges, x, side="right")
+    missing = np.isnan(y)
+    # Sorted by bucket, then by value with NaNs last.
+    order = np.lexsort((y, missing, bucket))
+    counts = np.bincount(bucket, minlength=n_buckets)
+    valid = np.bincount(bucket, weights=~missing, minlength=n_buckets).astype(int)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    nonempty = counts > 0
+    # A bucket with only NaNs gives one NaN point, leaving a gap in the line.
+    lowest = order[starts[nonempty]]
+    highest = order[(starts + np.maximum(valid, 1) - 1)[nonempty]]
+    return np.unique(np.concatenate([[0, n - 1], lowest, highest]))
+
+
+def _lttb_indices(x, y, n_out):
+    """Largest-Triangle-Three-Buckets selection of *n_out* points.
+
+    NaN values are treated as zero.
+
+    """
+    n = len(y)
+    y = np.nan_to_num(y)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    counts = np.diff(edges)
+    # The mean point of each bucket, and then of the last point.
+    mean_x = np.append(np.add.reduceat(x[: n - 1], edges[:-1]) / counts, x[-1])
+    mean_y = np.append(np.add.reduceat(y[: n - 1], edges[:-1]) / counts, y[-1])
+    indices = np.empty(n_out, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        bx = x[start:end]
+        by = y[start:end]
+        cx = mean_x[i + 1]
+        cy = mean_y[i + 1]
+        area = np.abs((x[a] - cx) * (by - y[a]) - (x[a] - bx) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        indices[i + 1] = a
+    return indices
+
+
+def downsample_indices(x, y, n_out, method="minmax"):
+    """Choose the points of a long series to draw at a given resolution.
+
+    Args:
+        x (array): sorted x values, numeric or datetime64
+        y (array): y values (may contain NaN)
+        n_out (int): about how many points to keep, e.g. twice the width of
+            the plot in pixels
+        method (str): "minmax" keeps the lowest and highest value in each of
+            ``n_out / 2`` equal-width x intervals, so that no visible peak is
+            lost. "lttb" (Largest-Triangle-Three-Buckets) keeps the points
+            that best preserve the shape of the line, which suits smooth
+            series better.
+
+    Returns:
+        numpy array: sorted indices into *x* and *y*. If there are no more
+        than *n_out* points, all the indices.
+
+    Both methods are vectorised with numpy (LTTB loops over the output
+    points only). For long series, LTTB first reduces the series to
+    ``4 * n_out`` points by minmax, which barely changes its output.
+
+    """
+    if not method in DOWNSAMPLE_METHODS:
+        raise KeyError(f"method must be one of {DOWNSAMPLE_METHODS}, not {method!r}")
+    x = _as_float(x)
+    y = np.asarray(y, dtype=float)
+    n_out = max(int(n_out), 3)
+    if len(y) <= n_out:
+        return np.arange(len(y))
+    if method == "minmax":
+        return _minmax_indices(x, y, n_out // 2)
+    if len(y) > 4 * n_out:
+        pre = _minmax_indices(x, y, 2 * n_out)
+        return pre[_lttb_indices(x[pre], y[pre], n_out)]
+    return _lttb_indices(x, y, n_out)
+
+
+class DownsampledLine:
+    """A line showing a long series, downsampled to the width of the axes.
+
+    Only the visible part of the series is downsampled, to
+    *points_per_pixel* points per pixel of axes width. It is resampled
+    whenever the x limits change (when zooming or panning) or the figure is
+    resized, so zooming in reveals the full detail.
+
+    Args:
+        ax (matplotlib Axes): axes to draw on
+        x (array): sorted x values, numeric or datetime64
+        y (array): y values
+        method (str): see :func:`downsample_indices`
+        points_per_pixel (float): resolution
+        kwargs: passed to ``ax.plot``
+
+    Attributes:
+        line (matplotlib Line2D): the line
+
+    """
+
+    def __init__(self, ax, x, y, method="minmax", points_per_pixel=2, **kwargs):
+        if not method in DOWNSAMPLE_METHODS:
+            raise KeyError(
+                f"method must be one of {DOWNSAMPLE_METHODS}, not {method!r}"
+            )
+        self.ax = ax
+        x = np.asarray(x)
+        if np.issubdtype(x.dtype, np.datetime64):
+            x = mdates.date2num(x)
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        self.method = method
+        self.points_per_pixel = points_per_pixel
+        (self.line,) = ax.plot([], [], **kwargs)
+        if len(self.x):
+            ax.update_datalim(
+                [[self.x[0], np.nanmin(self.y)], [self.x[-1], np.nanmax(self.y)]]
+            )
+            ax.autoscale_view()
+        self.update()
+        self._cids = [ax.callbacks.connect("xlim_changed", self.update)]
+        self._canvas_cids = [
+            ax.figure.canvas.mpl_connect("resize_event", self._on_resize)
+        ]
+
+    def visible_slice(self):
+        """The slice of the series within the x limits, plus a point each side."""
+        lo, hi = sorted(self.ax.get_xlim())
+        start = max(np.searchsorted(self.x, lo, side="left") - 1, 0)
+        end = min(np.searchsorted(self.x, hi, side="right") + 1, len(self.x))
+        return slice(start, end)
+
+    def update(self, ax=None):
+        """Resample the visible part of the series."""
+        window = self.visible_slice()
+        n_out = int(self.ax.bbox.width * self.points_per_pixel)
+        indices = window.start + downsample_indices(
+            self.x[window], self.y[window], n_out, method=self.method
+        )
+        self.line.set_data(self.x[indices], self.y[indices])
+
+    def _on_resize(self, event):
+        self.update()
+        self.ax.figure.canvas.draw_idle()
+
+    def disconnect(self):
+        """Stop resampling."""
+        for cid in self._cids:
+            self.ax.callbacks.disconnect(cid)
+        for cid in self._canvas_cids:
+            self.ax.figure.canvas.mpl_disconnect(cid)
+
+
+def plot_daily_series(
+    df,
+    value_col="rainfall",
+    dt_col="date",
+    ax=None,
+    method="minmax",
+    points_per_pixel=2,
+    **kwargs,
+):
+    """Chart a long daily series, downsampled to the resolution of the plot.
+
+    Args:
+        df (pd.DataFrame or :class:`ausweather.RainfallStationData`): daily
+            data e.g. ``RainfallStationData.daily``
+        value_col (str): column to plot
+        dt_col (str): column with the dates
+        ax (matplotlib Axes): axes to draw on, default a new figure
+        method (str): "minmax" (default) or "lttb", see
+            :func:`downsample_indices`
+        points_per_pixel (float): resolution
+        kwargs: passed to ``ax.plot`` e.g. color, lw
+
+    Returns:
+        dict: with keys "fig", "ax", "line" (matplotlib Line2D) and
+        "downsampler" (:class:`DownsampledLine`).
+
+    A record of 45,000 days is drawn as a couple of thousand points, and is
+    resampled from the full data as you zoom in.
+
+    """
+    if hasattr(df, "df"):
+        df = df.df
+    df = df.sort_values(dt_col)
+    if ax is None:
+        fig = plt.figure()
+        ax = fig.add_subplot(111)
+    fig = ax.figure
+    kwargs.setdefault("lw", 0.5)
+    downsampler = DownsampledLine(
+        ax,
+        pd.to_datetime(df[dt_col]).values,
+        df[value_col].values,
+        method=method,
+        points_per_pixel=points_per_pixel,
+        **kwargs,
+    )
+    ax.xaxis_date()
+    ax.set_ylabel(value_col)
+    return {
+        "fig": fig,
+        "ax": ax,
+        "line": downsampler.line,
+        "downsampler": downsampler,
+    }
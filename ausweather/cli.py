@@ -0,0 +1,390 @@
+"""Command-line interface.
+
+.. code-block::
+
+    $ ausweather sync --email your@email.com --state SA --current --min-span 30
+    $ ausweather sync --email your@email.com --stations 23090 18017 --dry-run
+    $ ausweather sync --email your@email.com --state VIC --refresh
+
+``ausweather sync`` downloads daily SILO data for a set of stations into the
+local Parquet archive (see :mod:`ausweather.archive`), fetching only the days
+after those already archived. Progress is recorded in a journal in the
+archive directory, so an interrupted sync resumes where it stopped when the
+same command is run again.
+
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+from pathlib import Path
+import sys
+import time
+
+import pandas as pd
+
+from ausweather.archive import DEFAULT_ARCHIVE_DIR, archive_station_id, list_archive
+from ausweather.archive import read_archive
+from ausweather.archive import write_archive
+from ausweather.catalogue import StationCatalogue, get_station_catalogue
+from ausweather.core import silo_query_range
+from ausweather.scheduler import RequestScheduler, set_scheduler
+from ausweather.silo import silo_alldata
+
+logger = logging.getLogger(__name__)
+
+# Rough sizes of a SILO alldata response, for dry runs.
+SILO_HEADER_BYTES = 4000
+SILO_BYTES_PER_DAY = 150
+
+JOURNAL_FILENAME = "sync-journal.jsonl"
+
+
+def station_table(directory=None):
+    """The station catalogue used by ``ausweather sync``.
+
+    Args:
+        directory (str): a saved :class:`ausweather.bom.BomStationDirectory`
+            to build it from, default :func:`ausweather.get_station_catalogue`
+
+    Returns:
+        :class:`ausweather.StationCatalogue`
+
+    """
+    if directory is None:
+        return get_station_catalogue()
+    return StationCatalogue.build(directory)
+
+
+def select_stations(args):
+    """Apply the station arguments of ``ausweather sync`` to :func:`station_table`."""
+    catalogue = station_table(args.directory)
+    if args.refresh:
+        changes = catalogue.refresh()
+        logger.info(
+            f"Station catalogue: {len(changes['added'])} added, "
+            f"{len(changes['removed'])} removed, {len(changes['updated'])} updated"
+        )
+    if args.state:
+        covered = set(catalogue.df.state.astype(str))
+        uncovered = sorted(s.upper() for s in args.state if not s.upper() in covered)
+        if uncovered:
+            logger.warning(
+                f"No stations for {' '.join(uncovered)} in the station catalogue; "
+                "use --refresh to fetch BoM's national station list"
+            )
+    station_ids = list(args.stations or [])
+    if args.station_file:
+        with open(args.station_file, "r") as f:
+            station_ids += [line.strip() for line in f if line.strip()]
+    wanted = None
+    if station_ids:
+        wanted = [int(s) for s in station_ids]
+        missing = sorted(s for s in set(wanted) if not s in catalogue)
+        if missing:
+            logger.warning(f"Not in the station directory: {missing}")
+    return catalogue.query(
+        state=args.state,
+        current=True if args.current else None,
+        min_span=args.min_span,
+        station_ids=wanted,
+    )
+
+
+def last_archived_date(station_id, archive_dir, partitions=None):
+    """The last date archived for a station, or None.
+
+    *partitions* is the output of :func:`ausweather.list_archive`, if you
+    already have it.
+
+    """
+    if partitions is None:
+        partitions = list_archive(archive_dir)
+    partitions = partitions[partitions.station_id == archive_station_id(station_id)]
+    if not len(partitions):
+        return None
+    decade = partitions.decade.max()
+    df = read_archive(
+        station_id, start=f"{decade}-01-01", columns=[], archive_dir=archive_dir
+    )
+    return df.date.max()
+
+
+def plan_sync(stations, archive_dir, finish=None):
+    """Work out what needs downloading for each station.
+
+    Args:
+        stations (pd.DataFrame): from :func:`select_stations`
+        archive_dir (str): archive directory
+        finish (str): last date to download, default the end of each
+            station's record
+
+    Returns:
+        list: of dicts with keys station_id, state, start and finish (as
+        YYYYMMDD strings), days and bytes (estimated). Stations that are
+        already up to date are left out.
+
+    """
+    partitions = list_archive(archive_dir)
+    archived = set(partitions.station_id)
+    plan = []
+    for row in stations.itertuples():
+        start, end = silo_query_range(
+            row.station_id, query_to=finish, span=(row.start, row.end)
+        )
+        start = pd.Timestamp(str(start))
+        end = pd.Timestamp(end) if end is not None else pd.Timestamp(datetime.now())
+        if archive_station_id(row.station_id) in archived:
+            last = last_archived_date(row.station_id, archive_dir, partitions)
+            if last is not None:
+                start = max(start, last + pd.Timedelta(days=1))
+        days = (end - start).days + 1
+        if days <= 0:
+            continue
+        plan.append(
+            {
+                "station_id": str(row.station_id),
+                "state": row.state,
+                "start": start.strftime("%Y%m%d"),
+                "finish": end.strftime("%Y%m%d"),
+                "days": days,
+                "bytes": SILO_HEADER_BYTES + days * SILO_BYTES_PER_DAY,
+            }
+        )
+    return plan
+
+
+class SyncJournal:
+    """Checkpoint journal for a sync.
+
+    The first line records the selected stations; each later line records a
+    station that finished. When a sync is run again for the same stations,
+    those already recorded are skipped. The journal is deleted when a
+    sync completes.
+
+    Args:
+        path (str): journal file
+
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.done = set()
+
+    def read(self):
+        """Read the journal, returning (planned stations, stations done)."""
+        if not self.path.is_file():
+            return None, set()
+        lines = []
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    lines.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # e.g. the last line, if the sync was killed mid-write
+                    pass
+        if not lines:
+            return None, set()
+        done = {l["station_id"] for l in lines[1:] if "station_id" in l}
+        return lines[0].get("stations"), done
+
+    def pending(self, station_ids):
+        """The stations in *station_ids* not yet done, without opening for writing."""
+        planned, done = self.read()
+        if planned != station_ids:
+            done = set()
+        return [s for s in station_ids if not s in done]
+
+    def resume(self, station_ids):
+        """Open the journal, returning the stations already done."""
+        planned, done = self.read()
+        if planned == station_ids:
+            self.done = done
+            logger.info(f"Resuming: {len(self.done)} stations already synced")
+            return self.done
+        if planned is not None:
+            logger.info("Journal is for a different set of stations; starting afresh")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"stations": station_ids}) + "\n")
+        self.done = set()
+        return self.done
+
+    def record(self, station_id, **info):
+        """Record that a station finished."""
+        with open(self.path, "a") as f:
+            f.write(json.dumps(dict(info, station_id=station_id)) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.add(station_id)
+
+    def remove(self):
+        self.path.unlink()
+
+
+class Progress:
+    """Print throughput and ETA to stderr as stations finish."""
+
+    def __init__(self, n_stations, n_days, stream=None):
+        self.n_stations = n_stations
+        self.n_days = n_days
+        self.stations = 0
+        self.days = 0
+        self.started = time.monotonic()
+        self.stream = sys.stderr if stream is None else stream
+
+    def update(self, station_id, days, rows):
+        self.stations += 1
+        self.days += days
+        elapsed = time.monotonic() - self.started
+        rate = self.days / elapsed if elapsed else 0
+        remaining = self.n_days - self.days
+        eta = timedelta(seconds=round(remaining / rate)) if rate else "?"
+        print(
+            f"[{self.stations}/{self.n_stations}] {station_id}: {rows} rows  "
+            f"{self.stations / elapsed * 60:.1f} stations/min  "
+            f"{rate:.0f} days/s  ETA {eta}",
+            file=self.stream,
+        )
+
+
+def sync_station(item, email, archive_dir):
+    """Download one planned station from SILO and append it to the archive."""
+    df = silo_alldata(
+        item["station_id"], email, start=item["start"], finish=item["finish"]
+    )
+    if len(df):
+        write_archive(
+            df, item["station_id"], archive_dir=archive_dir, state=item["state"]
+        )
+    return len(df)
+
+
+def sync(args):
+    archive_dir = args.archive_dir
+    stations = select_stations(args)
+    selected = [str(s) for s in stations.station_id]
+    journal = SyncJournal(args.journal or Path(archive_dir) / JOURNAL_FILENAME)
+    if args.restart and journal.path.is_file():
+        journal.remove()
+
+    if args.dry_run:
+        todo = journal.pending(selected)
+    else:
+        done = journal.resume(selected)
+        todo = [s for s in selected if not s in done]
+    plan = plan_sync(
+        stations[stations.station_id.astype(str).isin(todo)],
+        archive_dir,
+        finish=args.finish,
+    )
+    n_days = sum(p["days"] for p in plan)
+    print(
+        f"{len(selected)} stations selected, {len(plan)} to sync: "
+        f"{len(plan)} requests, {n_days} days, "
+        f"about {sum(p['bytes'] for p in plan) / 1e6:.1f} MB",
+        file=sys.stderr,
+    )
+    if args.dry_run:
+        return 0
+
+    if args.rate:
+        set_scheduler(RequestScheduler(rate=args.rate, burst=args.rate))
+    progress = Progress(len(plan), n_days)
+    failed = []
+    executor = ThreadPoolExecutor(max_workers=args.workers)
+    try:
+        futures = {
+            executor.submit(sync_station, item, args.email, archive_dir): item
+            for item in plan
+        }
+        for future in as_completed(futures):
+            item = futures[future]
+            try:
+                rows = future.result()
+            except Exception as e:
+                logger.error(f"Station {item['station_id']} failed: {e}")
+                failed.append(item["station_id"])
+                continue
+            journal.record(item["station_id"], rows=rows, finish=item["finish"])
+            progress.update(item["station_id"], item["days"], rows)
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume", file=sys.stderr)
+        executor.shutdown(wait=True, cancel_futures=True)
+        return 130
+    executor.shutdown()
+
+    if failed:
+        print(f"{len(failed)} stations failed: {' '.join(failed)}", file=sys.stderr)
+        return 1
+    journal.remove()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="ausweather", description="Australian weather data tools"
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser(
+        "sync", help="download SILO data for many stations into the local archive"
+    )
+    p.add_argument(
+        "--email",
+        default=os.environ.get("AUSWEATHER_EMAIL"),
+        help="email address for SILO (default $AUSWEATHER_EMAIL)",
+    )
+    p.add_argument("--stations", nargs="+", metavar="ID", help="BoM station IDs")
+    p.add_argument("--station-file", help="file with one station ID per line")
+    p.add_argument("--state", nargs="+", help="only stations in these states")
+    p.add_argument(
+        "--current", action="store_true", help="only stations that are still open"
+    )
+    p.add_argument(
+        "--min-span", type=float, help="only stations with records this many years long"
+    )
+    p.add_argument(
+        "--directory", help="saved BoM station directory (see BomStationDirectory)"
+    )
+    p.add_argument(
+        "--refresh",
+        action="store_true",
+        help="update the station catalogue from BoM's national station list",
+    )
+    p.add_argument("--archive-dir", default=DEFAULT_ARCHIVE_DIR)
+    p.add_argument("--finish", help="last date to download (YYYYMMDD)")
+    p.add_argument("-j", "--workers", type=int, default=4, help="concurrent downloads")
+    p.add_argument("--rate", type=float, help="maximum requests per second")
+    p.add_argument("--journal", help=f"default ARCHIVE_DIR/{JOURNAL_FILENAME}")
+    p.add_argument(
+        "--restart", action="store_true", help="ignore the journal of an earlier run"
+    )
+    p.add_argument(
+        "-n",
+        "--dry-run",
+        action="store_true",
+        help="report the pending requests and bytes, without downloading",
+    )
+    p.set_defaults(func=sync)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(levelname)s %(name)s: %(message)s",
+    )
+    if args.command == "sync" and not args.email and not args.dry_run:
+        parser.error("--email is required (or set $AUSWEATHER_EMAIL)")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
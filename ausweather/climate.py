@@ -0,0 +1,361 @@
+"""All the daily variables from a SILO alldata query, for one station.
+
+:class:`ClimateStationData` is the multi-variable counterpart of
+:class:`ausweather.RainfallStationData`. It keeps every variable SILO
+returns, from a single fetch, with its source flag:
+
+.. code-block::
+
+    >>> climate = ClimateStationData.from_bom_via_silo("18017", "your@email.com")
+    >>> climate.calendar[["year", "rainfall", "evap_pan", "max_temp", "min_temp"]]
+    >>> rf = climate.to_rainfall()  # a RainfallStationData, without refetching
+
+The values are stored as float32 and the flags as int8, which is about a
+third of the memory of the DataFrame returned by
+:func:`ausweather.silo_alldata`.
+
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from ausweather.archive import read_archive
+from ausweather.backends import to_backend
+from ausweather.core import (
+    RainfallStationData,
+    dates_to_finyear,
+    read_station_file,
+    silo_query_range,
+    silo_station_title,
+    write_station_file,
+)
+from ausweather.metrics import instrumented
+from ausweather.silo import silo_alldata
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["ClimateStationData", "SILO_VARIABLES"]
+
+#: Decimal places of the SILO values; float32 storage is rounded back to
+#: this when the values are widened to float64.
+SILO_DECIMALS = 1
+
+# SILO alldata column -> (variable name, source flag column, reducer). The
+# names are those of SILO's gridded data, except "rainfall" ("daily_rain").
+# The reducer is how daily values are aggregated over a month or year.
+SILO_VARIABLES = {
+    "T.Max": ("max_temp", "Smx", "mean"),
+    "T.Min": ("min_temp", "Smn", "mean"),
+    "Rain": ("rainfall", "Srn", "sum"),
+    "Evap": ("evap_pan", "Sev", "sum"),
+    "Radn": ("radiation", "Ssl", "mean"),
+    "VP": ("vp", "Svp", "mean"),
+    "RHmaxT": ("rh_tmax", None, "mean"),
+    "RHminT": ("rh_tmin", None, "mean"),
+    "FAO56": ("et_short_crop", None, "sum"),
+    "Mlake": ("evap_morton_lake", None, "sum"),
+    "Mpot": ("et_morton_potential", None, "sum"),
+    "Mact": ("et_morton_actual", None, "sum"),
+    "Mwet": ("et_morton_wet", None, "sum"),
+    "Span": ("evap_syn", "Ssp", "sum"),
+    "EvSp": ("evap_comb", "Ses", "sum"),
+    "MSLPres": ("mslp", "Sp", "mean"),
+}
+
+# Columns renamed by ausweather.write_archive.
+ARCHIVE_RENAMES = {"rainfall": "Rain", "interpolated_code": "Srn"}
+
+PERIOD_KEYS = {
+    "calendar": ["year"],
+    "financial": ["finyear"],
+    "month": ["year", "month"],
+}
+
+
+class ClimateStationData:
+    """All daily SILO variables for a station.
+
+    Create it with :meth:`from_bom_via_silo`, :meth:`from_silo_alldata`,
+    :meth:`from_archive` or :meth:`from_file`.
+
+    Args:
+        station_id (str): station ID
+        exclude_incomplete_years (bool): only show complete years in
+            :attr:`calendar` and :attr:`financial`
+        source (str): where the data came from (set by the class methods)
+        title (str): station title from the SILO response, if known
+
+    Attributes:
+        df (pd.DataFrame): date, then a float32 column per variable (see
+            :data:`SILO_VARIABLES` for the names) and an int8 column per
+            source flag (with the SILO names e.g. "Smx", "Srn").
+        reducers (dict): how each variable is aggregated, e.g. "sum" for
+            rainfall and evaporation and "mean" for temperature. Change it to
+            aggregate differently.
+
+    """
+
+    def __init__(
+        self, station_id, exclude_incomplete_years=False, source=None, title=None
+    ):
+        self.station_id = str(station_id)
+        self.exclude_incomplete_years = exclude_incomplete_years
+        self.source = source
+        self.title = title
+        self.reducers = {name: reducer for name, _, reducer in SILO_VARIABLES.values()}
+        self._keys = None
+
+    @classmethod
+    @instrumented
+    def from_bom_via_silo(
+        cls, station_id, email, data_start=None, data_end=None, **kwargs
+    ):
+        """Download every variable for a BoM station from SILO.
+
+        Args:
+            station_id (str): BoM station ID
+            email (str): email address, required by SILO API
+            data_start (pd.Timestamp): date to download data from, default
+                the first month of the station's record
+            data_end (pd.Timestamp): date to download data to, default the
+                end of the station's record
+            exclude_incomplete_years (bool): only show complete years
+
+        Returns:
+            :class:`ausweather.ClimateStationData`
+
+        """
+        start, finish = silo_query_range(int(station_id), data_start, data_end)
+        data = silo_alldata(station_id, email, start, finish, return_comments=True)
+        title, name = silo_station_title(data["comments"], station_id)
+        return cls.from_silo_alldata(
+            station_id, data["df"], source="silo", title=title, **kwargs
+        )
+
+    @classmethod
+    def from_silo_alldata(cls, station_id, df, **kwargs):
+        """Create from the DataFrame returned by :func:`ausweather.silo_alldata`.
+
+        Columns that are not SILO variables or flags are dropped.
+
+        """
+        self = cls(station_id, **kwargs)
+        dates = df["Date"] if "Date" in df.columns else df["date"]
+        data = {"date": pd.to_datetime(dates).values.astype("datetime64[ns]")}
+        for col, (name, flag, reducer) in SILO_VARIABLES.items():
+            if col in df.columns:
+                data[name] = df[col].values.astype("float32")
+            if flag is not None and flag in df.columns:
+                data[flag] = df[flag].values.astype("int8")
+        self.df = pd.DataFrame(data)
+        return self
+
+    @classmethod
+    @instrumented
+    def from_archive(cls, station_id, start=None, end=None, archive_dir=None, **kwargs):
+        """Create from the local Parquet archive (see :func:`ausweather.read_archive`)."""
+        df = read_archive(station_id, start=start, end=end, archive_dir=archive_dir)
+        df = df.rename(columns=ARCHIVE_RENAMES)
+        return cls.from_silo_alldata(station_id, df, source="archive", **kwargs)
+
+    @classmethod
+    @instrumented
+    def from_file(cls, filename, memory_map=True):
+        """Load from a file written by :meth:`to_file`.
+
+        See :meth:`ausweather.RainfallStationData.from_file`.
+
+        """
+        df, meta = read_station_file(
+            filename, memory_map, feature="ClimateStationData.from_file"
+        )
+        self = cls(
+            meta["station_id"],
+            exclude_incomplete_years=meta["exclude_incomplete_years"],
+            source=meta["source"],
+            title=meta.get("title"),
+        )
+        self.reducers.update(meta.get("reducers", {}))
+        self.df = df
+        return self
+
+    @instrumented
+    def to_file(self, filename):
+        """Save to a binary (Arrow IPC) file, keeping the compact dtypes.
+
+        Requires the optional dependency ``pyarrow``.
+
+        """
+        meta = {
+            "station_id": self.station_id,
+            "source": self.source,
+            "title": self.title,
+            "exclude_incomplete_years": self.exclude_incomplete_years,
+            "reducers": self.reducers,
+        }
+        write_station_file(
+            filename, self.df, meta, feature="ClimateStationData.to_file"
+        )
+
+    @property
+    def variables(self):
+        """Names of the variables present."""
+        return [c for c in self.df.columns if c in self.reducers]
+
+    @property
+    def flags(self):
+        """Map of variable name to its source flag column, where it has one."""
+        return {
+            name: flag
+            for name, flag, reducer in SILO_VARIABLES.values()
+            if flag is not None and name in self.df.columns and flag in self.df.columns
+        }
+
+    def _period_keys(self):
+        """Year, month and financial year of each day (calculated once)."""
+        if self._keys is None or len(self._keys) != len(self.df):
+            dates = self.df["date"]
+            self._keys = pd.DataFrame(
+                {
+                    "year": dates.dt.year.astype("int16").values,
+                    "month": dates.dt.month.astype("int8").values,
+                    "finyear": dates_to_finyear(dates).astype("category").values,
+                }
+            )
+        return self._keys
+
+    @property
+    def daily(self):
+        """Daily data, with year, month, dayofyear, finyear and station_id."""
+        keys = self._period_keys()
+        df = self.df.assign(
+            year=keys.year.values,
+            month=keys.month.values,
+            dayofyear=self.df.date.dt.dayofyear.values,
+            finyear=keys.finyear.values,
+            station_id=self.station_id,
+        )
+        return df
+
+    def get_daily(self, backend="pandas"):
+        """:attr:`daily` as a pandas, Arrow or Polars table (see :func:`ausweather.to_backend`)."""
+        return to_backend(self.daily, backend)
+
+    @instrumented
+    def aggregate(self, period="calendar", variables=None, reducers=None):
+        """Aggregate the daily values by calendar or financial year or month.
+
+        Args:
+            period (str): "calendar", "financial" or "month"
+            variables (list): variables to include, default all
+            reducers (dict): override :attr:`reducers` for some variables,
+                e.g. ``{"max_temp": "max"}``. Any pandas groupby reduction
+                name can be used.
+
+        Returns:
+            pd.DataFrame: one row per period, with the period key column(s)
+            (year, finyear or year and month), start_date, days (the number
+            of days in the data), a column per variable and, for each
+            variable with a source flag, ``<variable>_interpolated``: the
+            number of days its flag is not 0 (not observed).
+
+        """
+        if not period in PERIOD_KEYS:
+            raise KeyError(
+                f"period must be one of {tuple(PERIOD_KEYS)}, not {period!r}"
+            )
+        keys = PERIOD_KEYS[period]
+        if variables is None:
+            variables = self.variables
+        how = dict(self.reducers, **(reducers or {}))
+        flags = self.flags
+        period_keys = self._period_keys()
+        frame = {k: period_keys[k].values for k in keys}
+        for name in variables:
+            # Aggregated in float64, so that long sums do not lose precision.
+            frame[name] = self._float64(name)
+            if name in flags:
+                frame[f"{name}_interpolated"] = self.df[flags[name]].values != 0
+        frame["days"] = np.ones(len(self.df), dtype="int16")
+        grouped = pd.DataFrame(frame).groupby(keys, observed=True, sort=True)
+        result = grouped.agg(
+            {
+                **{name: how[name] for name in variables},
+                **{c: "sum" for c in frame if c.endswith("_interpolated")},
+                "days": "sum",
+            }
+        ).reset_index()
+        # Float64 sums of one decimal values can still be a tiny amount off.
+        sums = [name for name in variables if how[name] == "sum"]
+        result[sums] = result[sums].round(SILO_DECIMALS)
+        if period == "calendar":
+            start = pd.to_datetime(result.year.astype(str) + "-01-01")
+        elif period == "financial":
+            start = pd.to_datetime(result.finyear.astype(str).str[:4] + "-07-01")
+        else:
+            start = pd.to_datetime(
+                pd.DataFrame({"year": result.year, "month": result.month, "day": 1})
+            )
+        result.insert(len(keys), "start_date", start)
+        result["station_id"] = self.station_id
+        if self.exclude_incomplete_years and period != "month":
+            result = self._complete_years(result, period)
+        return result
+
+    def _complete_years(self, result, period):
+        start = result.start_date
+        end = start + pd.DateOffset(years=1)
+        expected = (end - start).dt.days
+        return result[result.days.values == expected.values].reset_index(drop=True)
+
+    @property
+    def calendar(self):
+        """Calendar year aggregates, see :meth:`aggregate`."""
+        return self.aggregate("calendar")
+
+    @property
+    def financial(self):
+        """Financial year aggregates, see :meth:`aggregate`."""
+        return self.aggregate("financial")
+
+    @property
+    def month(self):
+        """Monthly aggregates, see :meth:`aggregate`."""
+        return self.aggregate("month")
+
+    def _float64(self, name):
+        # float32 2.4 is 2.4000000953674316 as float64; round it back to the
+        # value SILO returned.
+        return np.round(self.df[name].values.astype(float), SILO_DECIMALS)
+
+    def to_rainfall(self, clip_ends=True, **kwargs):
+        """The rainfall as a :class:`ausweather.RainfallStationData`.
+
+        Args:
+            clip_ends (bool): drop the days before the first and after the
+                last observed rainfall (Srn == 0), as
+                :func:`ausweather.download_bom_rainfall` does
+            kwargs: passed to :class:`ausweather.RainfallStationData`
+
+        """
+        df = pd.DataFrame(
+            {
+                "date": self.df["date"].values,
+                "rainfall": self._float64("rainfall"),
+                "interpolated_code": self.df["Srn"].values.astype(int),
+                "quality": 1,
+            }
+        )
+        keys = self._period_keys()
+        df["year"] = keys.year.values.astype(int)
+        df["dayofyear"] = df["date"].dt.dayofyear
+        df["finyear"] = keys.finyear.values.astype(str)
+        if clip_ends:
+            observed = np.flatnonzero(df.interpolated_code.values == 0)
+            if len(observed):
+                df = df.iloc[observed[0] : observed[-1] + 1].reset_index(drop=True)
+        kwargs.setdefault("source", self.source)
+        kwargs.setdefault("exclude_incomplete_years", self.exclude_incomplete_years)
+        return RainfallStationData.from_data(self.station_id, df, **kwargs)
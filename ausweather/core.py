@@ -1,20 +1,55 @@
+from array import array
+import csv
+import json
 import logging
+import os
 from datetime import datetime
+from functools import lru_cache
 import re
 import io
 
+import numpy as np
 import pandas as pd
-import requests
 from scipy import stats
 
-from ausweather.silo import silo_alldata, get_silo_station_list
-from ausweather.bom import parse_bom_rainfall_station_list
-
-SA_BOM_RAINFALL_LIST = parse_bom_rainfall_station_list()
+from ausweather.silo import (
+    silo_alldata,
+    get_silo_station_list,
+    summarise_silo_alldata,
+)
+from ausweather.archive import import_pyarrow, read_archive
+from ausweather.catalogue import get_station_catalogue
+from ausweather.scheduler import get_scheduler
+from ausweather.metrics import instrumented
+from ausweather.backends import (
+    check_backend,
+    to_backend,
+    polars_rainfall_groupby,
+    polars_find_missing_days,
+    polars_reduce_daily_to_monthly,
+)
+from ausweather.bom import (
+    parse_bom_rainfall_station_list,
+    fetch_bom_weather_data,
+    resolve_ncc_obs_code,
+    get_bom_station_directory,
+)
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache()
+def _sa_bom_rainfall_list():
+    return parse_bom_rainfall_station_list()
+
+
+def __getattr__(name):
+    # SA_BOM_RAINFALL_LIST is parsed on first access rather than on import.
+    if name == "SA_BOM_RAINFALL_LIST":
+        return _sa_bom_rainfall_list()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 INTERPOLATION_CODES = {
     0: "observed",
     15: "deaccumulated",
@@ -23,34 +58,98 @@ INTERPOLATION_CODES = {
     35: "interpolated_by_anomaly",
     42: "satellite_estimate",
     75: "interpolated_by_long_term_averages",
+    91: "infilled_from_neighbours",
+    99: "missing",
 }
 
 
+# Columns of RainfallStationData.to_file, and the metadata key of the files
+# written by write_station_file.
+RAINFALL_FILE_COLUMNS = ["date", "rainfall", "interpolated_code", "quality"]
+RAINFALL_FILE_METADATA_KEY = "ausweather"
+
+
+@instrumented
 def get_sa_rainfall_site_list():
     """Get a list of SA rainfall stations available via SILO.
 
-    Uses :func:`get_silo_station_list` and :func:`parse_bom_rainfall_station_list`.
+    Returns:
+        pandas DataFrame: the SA rows of :func:`get_silo_station_list`, in
+        the same order, with columns start, end, aws (bool), current and
+        total_span_yrs from :func:`ausweather.get_station_catalogue`. Use
+        the catalogue directly for other states and filters.
 
     """
-    silo_list = get_silo_station_list()
-    sa_bom_list = parse_bom_rainfall_station_list()
-    df = pd.merge(
-        silo_list,
-        sa_bom_list[["station_id", "start", "end", "aws"]],
-        on="station_id",
-        how="inner",
-    )
+    catalogue = get_station_catalogue()
+    silo_list = catalogue.silo_list
+    if silo_list is None:
+        silo_list = get_silo_station_list()
+    spans = catalogue.query(state="SA")[
+        ["station_id", "start", "end", "aws", "current", "total_span_yrs"]
+    ]
+    df = pd.merge(silo_list, spans, on="station_id", how="inner")
     df["station_id"] = df.station_id.astype(str)
-    df["current"] = df["end"].apply(
-        lambda end: (pd.Timestamp(datetime.now()) - pd.Timestamp(end))
-        < pd.Timedelta(days=120)
-    )
-    df["total_span_yrs"] = df.apply(
-        lambda row: (row.end - row.start).days / 365.25, axis=1
-    )
     return df
 
 
+def write_station_file(filename, df, meta, feature="write_station_file"):
+    """Write daily station data to an uncompressed Arrow IPC file.
+
+    Args:
+        filename (str): path to the file
+        df (pd.DataFrame): columns to store, with their dtypes, including
+            "date"
+        meta (dict): JSON-serialisable metadata to store with the data
+        feature (str): used in the error if pyarrow is not installed
+
+    NaN values stay NaN (rather than becoming nulls) so that
+    :func:`read_station_file` can memory-map the columns without copying.
+
+    """
+    pa = import_pyarrow(feature)
+    arrays = {}
+    for col in df.columns:
+        values = df[col].values
+        if col == "date":
+            values = values.astype("datetime64[ns]")
+        arrays[col] = pa.array(np.asarray(values))
+    table = pa.table(arrays)
+    table = table.replace_schema_metadata(
+        {RAINFALL_FILE_METADATA_KEY: json.dumps(meta)}
+    )
+    with pa.OSFile(str(filename), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def read_station_file(filename, memory_map=True, feature="read_station_file"):
+    """Read a file written by :func:`write_station_file`.
+
+    Args:
+        filename (str): path to the file
+        memory_map (bool): if True, the columns are read-only views of the
+            memory-mapped file rather than copies
+        feature (str): used in the error if pyarrow is not installed
+
+    Returns:
+        tuple: (pd.DataFrame, metadata dict)
+
+    """
+    pa = import_pyarrow(feature)
+    if memory_map:
+        f = pa.memory_map(str(filename), "r")
+    else:
+        f = pa.OSFile(str(filename), "rb")
+    with f:
+        table = pa.ipc.open_file(f).read_all()
+    meta = json.loads(table.schema.metadata[RAINFALL_FILE_METADATA_KEY.encode()])
+    if memory_map:
+        df = table.to_pandas(split_blocks=True)
+    else:
+        df = table.to_pandas().copy()
+    return df, meta
+
+
 class RainfallStationData:
     """Rainfall station data.
 
@@ -58,6 +157,7 @@ class RainfallStationData:
 
     - :meth:`ausweather.RainfallStationData.from_bom_via_silo`
     - :meth:`ausweather.RainfallStationData.from_aquarius`
+    - :meth:`ausweather.RainfallStationData.from_file`
 
     e.g.
 
@@ -71,12 +171,20 @@ class RainfallStationData:
     Args:
         station_id (str): station ID
         exclude_incomplete_years (bool): only show complete years
+        source (str): where the data came from e.g. "silo", "bom",
+            "aquarius" or "archive" (set by the class methods)
+        backend (str): calculate the calendar, financial and monthly totals
+            with "pandas" (default) or "polars". The results are the same.
 
     """
 
-    def __init__(self, station_id, exclude_incomplete_years=False):
+    def __init__(
+        self, station_id, exclude_incomplete_years=False, source=None, backend="pandas"
+    ):
         self.station_id = str(station_id)
         self.exclude_incomplete_years = exclude_incomplete_years
+        self.source = source
+        self.backend = check_backend(backend, ("pandas", "polars"))
 
     @property
     def exclude_incomplete_years(self):
@@ -90,6 +198,7 @@ class RainfallStationData:
             self.__exclude_incomplete_years = False
 
     @classmethod
+    @instrumented
     def from_bom_via_silo(
         cls, station_id, email, data_start=None, clip_ends=True, data_end=None, **kwargs
     ):
@@ -108,7 +217,7 @@ class RainfallStationData:
         Note that this will download the data afresh from the SILO website.
 
         """
-        self = cls(station_id, **kwargs)
+        self = cls(station_id, source="silo", **kwargs)
         self.df = download_bom_rainfall(
             station_id,
             email,
@@ -120,12 +229,42 @@ class RainfallStationData:
         return self
 
     @classmethod
+    @instrumented
+    def from_bom(cls, station_id, ncc_obs_code="daily_rain", p_c=None, **kwargs):
+        """Create from BoM data (directly from the BoM's zipped data files).
+
+        Args:
+            station_id (str): BoM Station ID
+            ncc_obs_code (int or str): a rainfall nccObsCode, either 136 or
+                "daily_rain" (default), or 139 or "monthly_rain".
+            p_c (int): the ``p_c`` value for this station, optional - see
+                :func:`ausweather.fetch_bom_weather_data`
+            exclude_incomplete_years (bool): only show complete years
+
+        Returns:
+            :class:`ausweather.RainfallStationData`
+
+        Note that this will download the data afresh from the BoM website.
+
+        """
+        var = resolve_ncc_obs_code(ncc_obs_code)
+        if var["value_col"] != "rainfall":
+            raise KeyError(f"{var['name']} is not a rainfall obs code")
+        self = cls(station_id, source="bom", **kwargs)
+        df = fetch_bom_weather_data(var["ncc_obs_code"], station_id, p_c=p_c)
+        self.df = df.drop(columns=["period"], errors="ignore")
+        self.df["month"] = self.df.date.dt.month
+        return self
+
+    @classmethod
+    @instrumented
     def from_aquarius(cls, station_id, data_start=None, **kwargs):
         """Create from Aquarius TS data (for South Australia only)
 
         Args:
             station_id (str): AQTS LocationIdentifier.
-            data_start (pd.Timestamp): date to download data from, default 1/1/1950
+            data_start (pd.Timestamp): date to download data from, default is
+                the entire period of record
             exclude_incomplete_years (bool): only show complete years
 
         Returns:
@@ -134,13 +273,70 @@ class RainfallStationData:
         Note that this will download the data afresh from water.data.sa.gov.au
 
         """
-        if data_start is None:
-            data_start = pd.Timestamp("1950-01-01")
-        self = cls(station_id, **kwargs)
+        self = cls(station_id, source="aquarius", **kwargs)
         self.df = download_aquarius_rainfall(station_id, data_start)
         self.df["month"] = self.df.date.dt.month
         return self
 
+    @classmethod
+    @instrumented
+    def from_archive(cls, station_id, start=None, end=None, archive_dir=None, **kwargs):
+        """Create from the local Parquet archive.
+
+        Args:
+            station_id (str): BoM Station ID
+            start (pd.Timestamp): first date to load (optional)
+            end (pd.Timestamp): last date to load (optional)
+            archive_dir (str): root directory of the archive, see
+                :func:`ausweather.write_archive`
+            exclude_incomplete_years (bool): only show complete years
+
+        Returns:
+            :class:`ausweather.RainfallStationData`
+
+        Only the partitions overlapping *start* to *end* are opened.
+
+        """
+        self = cls(station_id, source="archive", **kwargs)
+        df = read_archive(
+            station_id,
+            start=start,
+            end=end,
+            columns=["rainfall", "interpolated_code", "quality"],
+            archive_dir=archive_dir,
+        )
+        if not "quality" in df.columns:
+            df["quality"] = 1
+        df["year"] = df["date"].dt.year
+        df["dayofyear"] = df["date"].dt.dayofyear
+        df["finyear"] = dates_to_finyear(df["date"]).values
+        self.df = df
+        self.df["month"] = self.df.date.dt.month
+        return self
+
+    @classmethod
+    @instrumented
+    def from_aquarius_bulk(cls, station_ids, data_start=None, data_end=None, **kwargs):
+        """Create for many stations from one Aquarius TS export (SA only).
+
+        Args:
+            station_ids (sequence of str): AQTS LocationIdentifiers
+            data_start (pd.Timestamp): date to download data from (optional)
+            data_end (pd.Timestamp): date to download data to (optional)
+            exclude_incomplete_years (bool): only show complete years
+
+        Returns:
+            dict: maps each station ID to a :class:`ausweather.RainfallStationData`
+
+        See :func:`ausweather.download_aquarius_rainfall_bulk`.
+
+        """
+        dfs = download_aquarius_rainfall_bulk(station_ids, data_start, data_end)
+        return {
+            station_id: cls.from_data(station_id, df, source="aquarius", **kwargs)
+            for station_id, df in dfs.items()
+        }
+
     @classmethod
     def from_data(cls, station_id, df, **kwargs):
         """Create from daily data.
@@ -151,12 +347,72 @@ class RainfallStationData:
 
         """
         self = cls(station_id, **kwargs)
-        logger.debug(f"creating from_data df=\n{df}")
+        # Lazy formatting: the repr of a long DataFrame is slow to build.
+        logger.debug("creating from_data df=\n%s", df)
         self.df = df
         self.df["month"] = self.df.date.dt.month
         return self
 
+    @classmethod
+    @instrumented
+    def from_file(cls, filename, memory_map=True):
+        """Load from a file written by :meth:`to_file`.
+
+        Args:
+            filename (str): path to the file
+            memory_map (bool): memory-map the file, so that the rainfall and
+                code arrays are read-only views of it rather than copies.
+                Use False if you want to modify ``rf.df`` in place.
+
+        Returns:
+            :class:`ausweather.RainfallStationData`: with the station_id,
+            source and exclude_incomplete_years it was saved with.
+
+        Requires the optional dependency ``pyarrow``.
+
+        """
+        df, meta = read_station_file(
+            filename, memory_map, feature="RainfallStationData.from_file"
+        )
+        df["year"] = df["date"].dt.year
+        df["dayofyear"] = df["date"].dt.dayofyear
+        df["finyear"] = dates_to_finyear(df["date"]).values
+        return cls.from_data(
+            meta["station_id"],
+            df,
+            exclude_incomplete_years=meta["exclude_incomplete_years"],
+            source=meta["source"],
+        )
+
+    @instrumented
+    def to_file(self, filename):
+        """Save the daily data to a binary (Arrow IPC) file.
+
+        Args:
+            filename (str): path to the file
+
+        The date, rainfall, interpolated_code and quality columns are
+        stored uncompressed, along with the station_id, source and
+        exclude_incomplete_years settings. Load it again with
+        :meth:`from_file`.
+
+        Requires the optional dependency ``pyarrow``.
+
+        """
+        meta = {
+            "station_id": self.station_id,
+            "source": self.source,
+            "exclude_incomplete_years": self.exclude_incomplete_years,
+        }
+        write_station_file(
+            filename,
+            self.df[RAINFALL_FILE_COLUMNS],
+            meta,
+            feature="RainfallStationData.to_file",
+        )
+
     @property
+    @instrumented
     def daily(self):
         """Daily rainfall data.
 
@@ -183,31 +439,56 @@ class RainfallStationData:
         # cols = ["year", "finyear", "month", "date", "dayofyear", "rainfall", "interpolated_code", "quality", "station_id"]
         return df
 
+    def get_daily(self, backend="pandas"):
+        """Daily rainfall data, as a pandas, Arrow or Polars table.
+
+        Args:
+            backend (str): "pandas", "arrow" or "polars"
+
+        Returns:
+            the columns of :attr:`daily`, as a pandas DataFrame, a
+            pyarrow.Table or a polars.DataFrame - see
+            :func:`ausweather.to_backend`.
+
+        """
+        return to_backend(self.daily, backend)
+
     @property
+    @instrumented
     def calendar(self):
         df = self.groupby("year").assign(station_id=self.station_id)
         df.insert(1, "start_date", [pd.Timestamp(f"{y}-01-01") for y in df.year])
         if self.exclude_incomplete_years:
             missing = find_missing_days(
-                self.daily, dt_col="date", year_type="calendar", value_col="rainfall"
+                self.daily,
+                dt_col="date",
+                year_type="calendar",
+                value_col="rainfall",
+                backend=self.backend,
             )
             complete = missing[missing == 0]
             df = df[df.year.isin(complete.index.values)]
         return df.reset_index()
 
     @property
+    @instrumented
     def financial(self):
         df = self.groupby("finyear").assign(station_id=self.station_id)
         df.insert(1, "start_date", [pd.Timestamp(f"{y[:4]}-07-01") for y in df.finyear])
         if self.exclude_incomplete_years:
             missing = find_missing_days(
-                self.daily, dt_col="date", year_type="financial", value_col="rainfall"
+                self.daily,
+                dt_col="date",
+                year_type="financial",
+                value_col="rainfall",
+                backend=self.backend,
             )
             complete = missing[missing == 0]
             df = df[df.finyear.isin(complete.index.values)]
         return df.reset_index()
 
     @property
+    @instrumented
     def month(self):
         df = self.groupby(["year", "month"]).assign(station_id=self.station_id)
         df.insert(
@@ -221,11 +502,13 @@ class RainfallStationData:
         df.insert(2, "year_month", df.start_date.dt.strftime("%Y-%m"))
         return df.reset_index()
 
-    def groupby(self, grouping_column):
+    @instrumented
+    def groupby(self, grouping_column, backend=None):
         """Group daily rainfall by either calendar or financial year.
 
         Args:
             grouping_column (str): either 'year' or 'finyear'
+            backend (str): "pandas" or "polars", default :attr:`backend`
 
         Returns:
             :class:`pandas.DataFrame`: dataframe with these columns:
@@ -237,6 +520,10 @@ class RainfallStationData:
             - quality_count (int): number of days with non-null quality code.
 
         """
+        if backend is None:
+            backend = self.backend
+        if check_backend(backend, ("pandas", "polars")) == "polars":
+            return polars_rainfall_groupby(self.df, grouping_column)
         return self.df.groupby(grouping_column, as_index=False).agg(
             rainfall=("rainfall", "sum"),
             rainfall_count=("rainfall", "count"),
@@ -251,6 +538,7 @@ class RainfallStationData:
         )
 
 
+@instrumented
 def annual_stats(
     df, avg_pd_start=None, avg_pd_end=None, dt_col="year", value_col="rainfall"
 ):
@@ -306,6 +594,7 @@ def annual_stats(
     return avg_values
 
 
+@instrumented
 def monthly_stats(
     df,
     avg_pd_start=None,
@@ -379,6 +668,7 @@ def monthly_stats(
     return avg_df
 
 
+@instrumented
 def calculate_deviations(df, stdict, est_col="mean", value_col="rainfall"):
     """Calculate deviations from average statistic.
 
@@ -405,6 +695,7 @@ def calculate_deviations(df, stdict, est_col="mean", value_col="rainfall"):
     return pdf
 
 
+@instrumented
 def download_bom_rainfall(
     station_id, email, data_start=None, clip_ends=True, data_end=None
 ):
@@ -464,54 +755,123 @@ def download_bom_rainfall(
     return df[cols]
 
 
-def fetch_bom_station_from_silo(
-    bom_station, email, query_from=None, query_to=None, only_use_complete_years=False
-):
-    bom_station = int(bom_station)
+def silo_query_range(bom_station, query_from=None, query_to=None, span=None):
+    """Work out the date range to query SILO for a BoM station.
+
+    Args:
+        bom_station (int): BoM station number
+        query_from (pd.Timestamp): start date, default is the first month of
+            the station's record in the BoM station directory
+        query_to (pd.Timestamp): end date, default is the end of the
+            station's record (or five days ago, for open stations)
+        span (tuple): (start, end) of the station's record, if already
+            known (e.g. from :class:`ausweather.StationCatalogue`). Default
+            is to look it up in :func:`ausweather.get_bom_station_directory`.
+
+    Returns:
+        tuple: (start as int YYYYMMDD, finish as a str YYYYMMDD or None)
+
+    """
     if query_from is None or query_to is None:
-        rows = SA_BOM_RAINFALL_LIST.loc[
-            SA_BOM_RAINFALL_LIST.station_id == bom_station, ["start", "end"]
-        ]
-        if len(rows) == 0:
+        if span is None:
+            span = get_bom_station_directory().span(bom_station)
+        if span is None:
             query_from = query_from
             query_to = query_to
         else:
-            row = rows.iloc[0]
+            start, end = span
             if query_from is None:
-                query_from = row.start
+                query_from = start
             if query_to is None:
-                if row.end.month == 12:
-                    query_to = f"{row.end.year + 1}-01-01"
+                if end.month == 12:
+                    query_to = f"{end.year + 1}-01-01"
                 else:
-                    query_to = f"{row.end.year}-{row.end.month + 1}-01"
+                    query_to = f"{end.year}-{end.month + 1}-01"
                 query_to = pd.Timestamp(query_to)
                 if query_to > datetime.now():
                     query_to = datetime.now() - pd.Timedelta(days=5)
                 query_to = query_to.strftime("%Y%m%d")
 
+    if query_from is None:
+        query_from = "1889-01-01"
     query_from = pd.Timestamp(query_from)
     if query_from < pd.Timestamp("1889-01-01"):
         query_from = pd.Timestamp("1889-01-01")
+    return int(query_from.strftime("%Y%m%d")), query_to
 
-    rf_data = silo_alldata(
-        bom_station,
-        email,
-        start=int(query_from.strftime("%Y%m%d")),
-        finish=query_to,
-        return_comments=True,
-    )
-    df = rf_data["df"]
-    rex = re.compile(r"\W+")
 
+def silo_station_title(comments, bom_station):
+    """Get the station title and name from SILO response comments.
+
+    Returns:
+        tuple: (title, name)
+
+    """
     title = ""
     name = ""
-    for line in rf_data["comments"].splitlines():
+    for line in comments.splitlines():
         if "Patched Point data for station" in line:
             colon_parts = line.split(":")
             title = colon_parts[1].replace("Lat", "").strip()
             name = title.replace(str(bom_station), "").strip()
             break
     title += f" (fetched from SILO on {datetime.now()})"
+    return title, name
+
+
+@instrumented
+def summarise_bom_station_from_silo(
+    bom_station, email, query_from=None, query_to=None, only_use_complete_years=False
+):
+    """Annual and monthly rainfall summaries for a station, streamed from SILO.
+
+    Args: see :func:`fetch_bom_station_from_silo`.
+
+    Returns:
+        dict: with the same "station_no", "station_name", "title", "annual"
+        and "srn" keys as :func:`fetch_bom_station_from_silo`, plus
+        "monthly" (see :meth:`ausweather.silo.SiloAlldataSummary.result`).
+
+    The daily DataFrame is never built, so this uses far less memory when
+    summarising many stations.
+
+    """
+    bom_station = int(bom_station)
+    start, finish = silo_query_range(bom_station, query_from, query_to)
+    summary = summarise_silo_alldata(
+        bom_station,
+        email,
+        start=start,
+        finish=finish,
+        only_use_complete_years=only_use_complete_years,
+    )
+    title, name = silo_station_title(summary["comments"], bom_station)
+    return {
+        "station_no": bom_station,
+        "station_name": name,
+        "title": title,
+        "annual": summary["annual"],
+        "srn": summary["srn"],
+        "monthly": summary["monthly"],
+    }
+
+
+@instrumented
+def fetch_bom_station_from_silo(
+    bom_station, email, query_from=None, query_to=None, only_use_complete_years=False
+):
+    bom_station = int(bom_station)
+    query_from, query_to = silo_query_range(bom_station, query_from, query_to)
+
+    rf_data = silo_alldata(
+        bom_station,
+        email,
+        start=query_from,
+        finish=query_to,
+        return_comments=True,
+    )
+    df = rf_data["df"]
+    title, name = silo_station_title(rf_data["comments"], bom_station)
 
     if only_use_complete_years:
         df = df.groupby([df.Date.dt.year]).filter(lambda x: len(x) >= 365)
@@ -536,44 +896,132 @@ def fetch_bom_station_from_silo(
     }
 
 
-def download_aquarius_rainfall(station_id, data_start=None):
-    """Download rainfall data from DEW's Aquarius Web Portal website.
+# Base URL of Aquarius Web Portal. Set $AUSWEATHER_AQUARIUS_URL (or this
+# variable) to use a local stand-in server.
+AQUARIUS_BASE_URL = os.environ.get(
+    "AUSWEATHER_AQUARIUS_URL", "https://water.data.sa.gov.au"
+)
+
+
+def aquarius_export_url():
+    """URL of the Aquarius bulk export."""
+    return f"{AQUARIUS_BASE_URL}/Export/BulkExport"
+
+
+def aquarius_export_params(station_ids, data_start=None, data_end=None):
+    """Build query parameters for a time-aligned Aquarius daily rainfall export.
 
     Args:
-        station_id (int or str): Aquarius location ID
-        data_start (pd.Timestamp): date to download data from (optional)
+        station_ids (sequence of str): Aquarius location IDs
+        data_start (pd.Timestamp): first day to export (optional)
+        data_end (pd.Timestamp): last day to export (optional)
 
     Returns:
-        dict:  with four keys: 'df', 'annual', 'srn', and 'wateruse_year'
+        dict: for :func:`aquarius_export_url`. If neither *data_start* nor
+        *data_end* is given, the entire period of record is requested.
 
     """
-    if data_start is None:
-        data_start = pd.Timestamp("1800-01-01")
+    params = {
+        "TimeZone": "9.5",
+        "Calendar": "CALENDARYEAR",
+        "Interval": "Daily",
+        "Step": "1",
+        "ExportFormat": "csv",
+        "TimeAligned": "True",
+        "RoundData": "True",
+        "IncludeGradeCodes": "True",
+        "IncludeApprovalLevels": "False",
+        "IncludeQualifiers": "False",
+        "IncludeInterpolationTypes": "False",
+    }
+    if data_start is None and data_end is None:
+        params["DateRange"] = "EntirePeriodOfRecord"
+    else:
+        params["DateRange"] = "Custom"
+        if data_start is None:
+            data_start = pd.Timestamp("1800-01-01")
+        if data_end is None:
+            data_end = pd.Timestamp(datetime.now())
+        params["StartTime"] = pd.Timestamp(data_start).strftime("%Y-%m-%d 00:00")
+        params["EndTime"] = pd.Timestamp(data_end).strftime("%Y-%m-%d 23:59")
+    for i, station_id in enumerate(station_ids):
+        params[f"Datasets[{i}].DatasetName"] = (
+            f"Rainfall.Best Available--Continuous@{station_id}"
+        )
+        params[f"Datasets[{i}].Calculation"] = "Aggregate"
+        params[f"Datasets[{i}].UnitId"] = "89"
+    return params
 
-    logger.debug(f"Downloading {station_id} from {data_start} from Aquarius")
 
-    url = f"https://water.data.sa.gov.au/Export/BulkExport?DateRange=EntirePeriodOfRecord&TimeZone=9.5&Calendar=CALENDARYEAR&Interval=Daily&Step=1&ExportFormat=csv&TimeAligned=True&RoundData=True&IncludeGradeCodes=True&IncludeApprovalLevels=False&IncludeQualifiers=False&IncludeInterpolationTypes=False&Datasets[0].DatasetName=Rainfall.Best%20Available--Continuous%40{station_id}&Datasets[0].Calculation=Aggregate&Datasets[0].UnitId=89"
-    resp = requests.get(url, verify=False)
+@instrumented
+def parse_aquarius_export(lines, station_ids, clip_ends=True):
+    """Parse a time-aligned Aquarius export into one table per station.
 
-    buffer = io.StringIO()
-    buffer.write(resp.text)
-    buffer.seek(0)
-    i = 0
-    for line in buffer:
-        if i == 2:
-            station_name = line.strip("\n").strip(",").strip()
-        break
+    Args:
+        lines (iterable of str): lines of the CSV export - this is consumed
+            one line at a time, so it can be a streamed response.
+        station_ids (sequence of str): the location IDs, in the order they
+            were requested
+        clip_ends (bool): clip each station's table to its first and last
+            non-missing value, since a time-aligned export covers the
+            combined period of all the stations
 
-    df = pd.read_csv(
-        buffer, skiprows=5, names=["Date", "end_timestamp", "Rain", "Grade"]
-    )
+    Returns:
+        dict: maps each station ID to a pandas DataFrame with the same
+        columns as :func:`download_aquarius_rainfall`.
+
+    The export has five header lines (the location names are on the third)
+    followed by rows of start timestamp, end timestamp, then a value and
+    grade column per dataset.
 
-    df = df.rename(columns={"Date": "date", "Rain": "rainfall", "Grade": "quality"})
+    """
+    n = len(station_ids)
+    lines = iter(lines)
+    header = [next(lines, "") for i in range(5)]
+    names = [name.strip() for name in header[2].strip("\n").split(",")[1:]]
+    logger.debug(f"Aquarius export location names: {names}")
+
+    dates = []
+    values = [array("d") for i in range(n)]
+    grades = [array("d") for i in range(n)]
+    nan = float("nan")
+    for row in csv.reader(lines):
+        if not row:
+            continue
+        dates.append(row[0])
+        for i in range(n):
+            value = row[2 + 2 * i] if len(row) > 2 + 2 * i else ""
+            grade = row[3 + 2 * i] if len(row) > 3 + 2 * i else ""
+            values[i].append(float(value) if value else nan)
+            grades[i].append(float(grade) if grade else nan)
+
+    dates = pd.to_datetime(pd.Series(dates, dtype=str))
+    result = {}
+    for i, station_id in enumerate(station_ids):
+        rainfall = np.frombuffer(values[i], dtype="float64")
+        observed = np.flatnonzero(~np.isnan(rainfall))
+        if not clip_ends:
+            rows = slice(0, len(rainfall))
+        elif len(observed):
+            rows = slice(observed[0], observed[-1] + 1)
+        else:
+            rows = slice(0, 0)
+        df = pd.DataFrame(
+            {
+                "date": dates.values[rows],
+                "rainfall": rainfall[rows],
+                "quality": np.frombuffer(grades[i], dtype="float64")[rows],
+            }
+        )
+        result[station_id] = _add_aquarius_columns(df)
+    return result
+
+
+def _add_aquarius_columns(df):
     df["interpolated_code"] = 0
-    df["date"] = pd.to_datetime(df["date"])
     df["year"] = df["date"].dt.year
     df["dayofyear"] = df["date"].dt.dayofyear
-    df["finyear"] = [date_to_finyear(d) for d in df["date"]]
+    df["finyear"] = dates_to_finyear(df["date"]).values
     df["interpolated_desc"] = df.interpolated_code.map(INTERPOLATION_CODES)
 
     cols = [
@@ -589,6 +1037,65 @@ def download_aquarius_rainfall(station_id, data_start=None):
     return df[cols]
 
 
+@instrumented
+def download_aquarius_rainfall_bulk(
+    station_ids, data_start=None, data_end=None, clip_ends=True
+):
+    """Download rainfall data for many stations from DEW's Aquarius Web Portal.
+
+    Args:
+        station_ids (sequence of int or str): Aquarius location IDs
+        data_start (pd.Timestamp): date to download data from (optional)
+        data_end (pd.Timestamp): date to download data to (optional)
+        clip_ends (bool): clip each station to its first and last
+            non-missing value (see :func:`parse_aquarius_export`)
+
+    Returns:
+        dict: maps each station ID (str) to a pandas DataFrame, see
+        :func:`download_aquarius_rainfall`.
+
+    All stations are requested in a single time-aligned export, which is
+    parsed line by line as it streams in.
+
+    """
+    station_ids = [str(s) for s in station_ids]
+    logger.debug(
+        f"Downloading {len(station_ids)} stations from {data_start} to {data_end} "
+        "from Aquarius"
+    )
+    params = aquarius_export_params(station_ids, data_start, data_end)
+    with get_scheduler().get(
+        aquarius_export_url(), params=params, verify=False, stream=True
+    ) as resp:
+        resp.raise_for_status()
+        if resp.encoding is None:
+            resp.encoding = "utf-8"
+        return parse_aquarius_export(
+            resp.iter_lines(decode_unicode=True), station_ids, clip_ends=clip_ends
+        )
+
+
+def download_aquarius_rainfall(station_id, data_start=None):
+    """Download rainfall data from DEW's Aquarius Web Portal website.
+
+    Args:
+        station_id (int or str): Aquarius location ID
+        data_start (pd.Timestamp): date to download data from, default is the
+            entire period of record
+
+    Returns:
+        pandas DataFrame with columns date, rainfall, interpolated_code,
+        interpolated_desc, quality, year, dayofyear and finyear, for every
+        day of the export (days without data are not clipped off the ends).
+
+    """
+    logger.debug(f"Downloading {station_id} from {data_start} from Aquarius")
+    return download_aquarius_rainfall_bulk(
+        [station_id], data_start=data_start, clip_ends=False
+    )[str(station_id)]
+
+
+@instrumented
 def get_spanning_dates(
     date_series: pd.Series, year_type: str = "calendar"
 ) -> pd.DatetimeIndex:
@@ -658,11 +1165,13 @@ def get_spanning_dates(
     return pd.date_range(start_day, finish_day)
 
 
+@instrumented
 def find_missing_days(
     df: pd.DataFrame,
     dt_col: str = "timestamp",
     year_type: str = "financial",
     value_col: str = "value",
+    backend: str = "pandas",
 ) -> pd.Series:
     """Find the number of missing days in a year from a daily dataset.
 
@@ -672,6 +1181,7 @@ def find_missing_days(
         year_type (str): what does "year" mean? either "financial" or
             "calendar"
         value_col (str): name of column in *df* which contains the data itself
+        backend (str): calculate with "pandas" or "polars"
 
     See :func:`ausweather.get_spanning_dates` for more information on
     the keyword argument *year_type*.
@@ -682,6 +1192,8 @@ def find_missing_days(
 
     """
     all_days = get_spanning_dates(df[dt_col], year_type=year_type)
+    if check_backend(backend, ("pandas", "polars")) == "polars":
+        return polars_find_missing_days(df, all_days, dt_col, year_type, value_col)
     day_is_missing = (
         df.set_index(dt_col).reindex(all_days)[value_col].isnull().reset_index()
     )
@@ -716,8 +1228,28 @@ def date_to_finyear(d):
 date_to_wateruseyear = date_to_finyear
 
 
+@instrumented
+def dates_to_finyear(dates):
+    """Vectorised version of :func:`date_to_finyear`.
+
+    Args:
+        dates (sequence of datetimes): dates
+
+    Returns:
+        pd.Series: financial/water-use years as strings e.g. "2019-20"
+
+    """
+    dates = pd.Series(pd.to_datetime(dates, cache=False))
+    year = (dates.dt.year - (dates.dt.month < 7).astype(int)).values
+    # Format each distinct year once rather than every day.
+    years, inverse = np.unique(year, return_inverse=True)
+    labels = np.array([f"{y}-{str(y + 1)[2:]}" for y in years], dtype=object)
+    return pd.Series(labels[inverse], index=dates.index)
+
+
+@instrumented
 def reduce_daily_to_monthly(
-    daily_df, dt_col="Date", year_col="wu_year", value_col="Rain"
+    daily_df, dt_col="Date", year_col="wu_year", value_col="Rain", backend="pandas"
 ):
     """Reduce daily rainfall totals into monthly totals per year.
 
@@ -728,11 +1260,14 @@ def reduce_daily_to_monthly(
             years. It could be the year itself i.e.
             `daily_df[dt_col].dt.year` or it could be the financial year
         value_col (str): column with the rainfall total
+        backend (str): calculate with "pandas" or "polars"
 
     Returns:
         pd.DataFrame: a dataframe with columns *year_col*, "month", and *value_col*.
 
     """
+    if check_backend(backend, ("pandas", "polars")) == "polars":
+        return polars_reduce_daily_to_monthly(daily_df, dt_col, year_col, value_col)
     grouper = daily_df.groupby([daily_df[year_col], daily_df[dt_col].dt.month])
     sums = grouper[value_col].sum()
     return sums.reset_index().rename(columns={dt_col: "month"})
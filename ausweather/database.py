@@ -1,13 +1,33 @@
+from datetime import datetime
 import logging
+import os
+from pathlib import Path
 import sqlite3
+import threading
 
 import pandas as pd
 
 from . import bom
-
+from .metrics import record
 
 logger = logging.getLogger(__name__)
-__all__ = ["Database"]
+__all__ = ["Database", "get_database", "user_cache_dir"]
+
+
+def user_cache_dir():
+    """Directory for ausweather's caches, created if necessary.
+
+    This is $AUSWEATHER_CACHE_DIR if set, otherwise "ausweather" in
+    $XDG_CACHE_HOME (default ~/.cache).
+
+    """
+    path = os.environ.get("AUSWEATHER_CACHE_DIR")
+    if not path:
+        root = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        path = Path(root) / "ausweather"
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
 
 
 class Database:
@@ -27,42 +47,203 @@ class Database:
         self.conn = sqlite3.connect(filename)
         self.filename = filename
 
-    def fetch_bom_station_lists(self, ncc_obs_codes="auto"):
+    def fetch_bom_station_lists(self, ncc_obs_codes="auto", refresh=False):
         """Fetch (if necessary) and return BoM station codes for ncc obs. codes.
 
         Args:
             ncc_obs_codes (sequence of ints or 'auto'): obs codes to return
-                stations for
+                stations for. 'auto' means all of :data:`ausweather.bom.NCC_OBS_CODES`.
+            refresh (bool): if True, check lists already in the database for
+                changes (using conditional GETs, so unchanged lists are not
+                downloaded again). If False, only missing lists are fetched.
 
         Returns:
             pandas DataFrame.
 
+        The lists are fetched in parallel.
+
         """
         if ncc_obs_codes == "auto":
+            ncc_obs_codes = [var["ncc_obs_code"] for var in bom.NCC_OBS_CODES]
+        validators = self._bom_station_list_validators()
+        if not refresh:
+            ncc_obs_codes = [oc for oc in ncc_obs_codes if not oc in validators]
+        logger.info(f"Fetching BoM station lists for: {ncc_obs_codes}")
+        if len(ncc_obs_codes):
+            results = bom.fetch_bom_station_lists(ncc_obs_codes, validators=validators)
+            for oc, result in results.items():
+                if result["df"] is None:
+                    continue
+                self._replace_bom_station_list(result)
+        return pd.read_sql("select * from bom_stations", self.conn)
+
+    def bom_station_index(self, ncc_obs_codes="auto", refresh=False):
+        """National index of BoM stations keyed by (station, obs code).
+
+        Args:
+            ncc_obs_codes (sequence of ints or 'auto'): see
+                :meth:`fetch_bom_station_lists`
+            refresh (bool): see :meth:`fetch_bom_station_lists`
+
+        Returns:
+            pandas DataFrame with a ("Site", "ncc_obs_code") MultiIndex.
+
+        """
+        df = self.fetch_bom_station_lists(ncc_obs_codes, refresh=refresh)
+        return df.set_index(["Site", "ncc_obs_code"]).sort_index()
+
+    def _bom_station_list_validators(self):
+        self.conn.execute(
+            "create table if not exists bom_station_lists "
+            "(ncc_obs_code integer primary key, etag text, last_modified text, "
+            "fetched text)"
+        )
+        cursor = self.conn.execute(
+            "select ncc_obs_code, etag, last_modified from bom_station_lists"
+        )
+        return {
+            oc: {"etag": etag, "last_modified": last_modified}
+            for oc, etag, last_modified in cursor.fetchall()
+        }
+
+    def _replace_bom_station_list(self, result):
+        oc = result["ncc_obs_code"]
+        df = result["df"]
+        with self.conn:
             try:
-                existing_oc = pd.read_sql(
-                    "select distinct ncc_obs_code from bom_stations", self.conn
-                ).ncc_obs_code.values
-            except:
-                existing_oc = ()
-            ncc_obs_codes = [
-                oc for oc in bom.ncc_obs_codes.keys() if not oc in existing_oc
-            ]
-            logger.info(f'ncc_obs_codes="auto" -> still missing: {ncc_obs_codes}')
-        dfs = [bom.fetch_bom_station_list(oc) for oc in ncc_obs_codes]
-        if len(dfs):
-            df = pd.concat(dfs)
-            try:
-                existing_df = pd.read_sql("select * from bom_stations", self.conn)
-            except:
-                repl_df = df
-            else:
-                repl_df = pd.concat([existing_df, df]).drop_duplicates()
-            repl_df.to_sql("bom_stations", self.conn, if_exists="replace", index=False)
-            return repl_df
-        else:
-            return pd.read_sql("select * from bom_stations", self.conn)
+                self.conn.execute(
+                    "delete from bom_stations where ncc_obs_code = ?", (oc,)
+                )
+            except sqlite3.OperationalError:
+                pass
+            df.to_sql("bom_stations", self.conn, if_exists="append", index=False)
+            self.conn.execute(
+                "create unique index if not exists bom_stations_site_oc "
+                "on bom_stations (Site, ncc_obs_code)"
+            )
+            self.conn.execute(
+                "insert or replace into bom_station_lists values (?, ?, ?, ?)",
+                (oc, result["etag"], result["last_modified"], str(datetime.now())),
+            )
+
+    def resolve_bom_p_c(self, ncc_obs_code, station, radius_km=0):
+        """Return the ``p_c`` value for a station, using the cache if possible.
+
+        Args:
+            ncc_obs_code (int or str): the nccObsCode or an alias e.g. "daily_rain"
+            station (int or str): BoM station number
+            radius_km (float): on a cache miss, query this radius around the
+                station and cache every station returned, not just this one.
+
+        Returns:
+            int
+
+        """
+        oc = bom.resolve_ncc_obs_code(ncc_obs_code)["ncc_obs_code"]
+        cached = self._cached_bom_p_c(oc, [station])
+        hit = int(int(station) in cached)
+        record("database.p_c_cache", hits=hit, misses=1 - hit)
+        if hit:
+            return cached[int(station)]
+        mapping = self._fetch_bom_p_c(oc, station, radius_km)
+        return mapping[int(station)]
+
+    def resolve_bom_p_c_bulk(self, ncc_obs_code, stations, radius_km=50):
+        """Return ``p_c`` values for many stations with few listing requests.
+
+        Args:
+            ncc_obs_code (int or str): the nccObsCode or an alias e.g. "daily_rain"
+            stations (sequence of ints): BoM station numbers
+            radius_km (float): radius of each listing request, see
+                :func:`ausweather.bom.plan_bom_c_value_queries`
+
+        Returns:
+            dict: maps station number to ``p_c``. Stations the BoM does not
+            list for this obs code are omitted.
+
+        """
+        oc = bom.resolve_ncc_obs_code(ncc_obs_code)["ncc_obs_code"]
+        stations = [int(s) for s in stations]
+        result = self._cached_bom_p_c(oc, stations)
+        missing = [s for s in stations if not s in result]
+        record(
+            "database.p_c_cache",
+            hits=len(stations) - len(missing),
+            misses=len(missing),
+        )
+        plan = bom.plan_bom_c_value_queries(missing, radius_km=radius_km)
+        logger.info(f"{len(missing)} p_c values missing, {len(plan)} queries planned")
+        for centre, expected in plan:
+            if all(s in result for s in expected):
+                continue
+            result.update(self._fetch_bom_p_c(oc, centre, radius_km))
+        for station in missing:
+            if not station in result:
+                try:
+                    result.update(self._fetch_bom_p_c(oc, station, 0))
+                except (ValueError, KeyError, IndexError):
+                    logger.warning(f"No p_c for station {station} obsCode {oc}")
+        return {s: result[s] for s in stations if s in result}
+
+    def fetch_bom_weather_data(self, ncc_obs_code, station):
+        """Fetch BoM data using a cached ``p_c`` value.
+
+        See :func:`ausweather.bom.fetch_bom_weather_data`.
+
+        """
+        p_c = self.resolve_bom_p_c(ncc_obs_code, station)
+        return bom.fetch_bom_weather_data(ncc_obs_code, station, p_c=p_c)
+
+    def _create_bom_p_c_table(self):
+        self.conn.execute(
+            "create table if not exists bom_p_c "
+            "(station integer, ncc_obs_code integer, p_c integer, fetched text, "
+            "primary key (station, ncc_obs_code))"
+        )
+
+    def _cached_bom_p_c(self, oc, stations):
+        self._create_bom_p_c_table()
+        stations = [int(s) for s in stations]
+        result = {}
+        # Keep well under SQLite's limit on the number of query parameters.
+        for i in range(0, len(stations), 500):
+            chunk = stations[i : i + 500]
+            cursor = self.conn.execute(
+                f"select station, p_c from bom_p_c where ncc_obs_code = ? "
+                f"and station in ({','.join('?' * len(chunk))})",
+                [oc] + chunk,
+            )
+            result.update(dict(cursor.fetchall()))
+        return result
+
+    def _fetch_bom_p_c(self, oc, station, radius_km):
+        c_table = bom.fetch_bom_c_values(oc, station, radius_km=radius_km)
+        mapping = bom.bom_c_values_mapping(c_table)
+        self._create_bom_p_c_table()
+        fetched = str(datetime.now())
+        with self.conn:
+            self.conn.executemany(
+                "insert or replace into bom_p_c values (?, ?, ?, ?)",
+                [(s, oc, p_c, fetched) for s, p_c in mapping.items()],
+            )
+        logger.debug(f"Cached {len(mapping)} p_c values around station {station}")
+        return mapping
 
     def close(self):
         """Close SQLite3 database connection."""
         return self.conn.close()
+
+
+_databases = threading.local()
+
+
+def get_database():
+    """Get the default cache :class:`Database`.
+
+    It is "ausweather.sqlite" in :func:`user_cache_dir`, with one connection
+    per thread (SQLite connections can't be shared between threads).
+
+    """
+    if getattr(_databases, "database", None) is None:
+        _databases.database = Database(str(user_cache_dir() / "ausweather.sqlite"))
+    return _databases.database
@@ -0,0 +1,390 @@
+"""Fill gaps in station records from neighbouring stations.
+
+Each station's missing days are estimated from its *k* best neighbours -
+the nearest stations (or, without locations, the most correlated ones)
+whose daily records correlate with it by at least *min_corr* - scaling
+each neighbour's value by either:
+
+- "ratio": the ratio of the two stations' totals over the days both have
+  data, or
+- "regression": a least-squares line fitted over those days (negative
+  estimates are set to zero).
+
+The estimates from the neighbours with data on a day are averaged,
+weighted by the square of their correlation. Filled days are given the
+interpolation code :data:`INFILL_CODE`, and days that could not be filled
+:data:`MISSING_CODE`.
+
+Everything is calculated on a station x day array: the pairwise statistics
+as a few matrix products and the fill as one pass per neighbour rank, in
+chunks of days to limit memory use.
+
+.. code-block::
+
+    >>> dfs = ausweather.download_aquarius_rainfall_bulk(station_ids)
+    >>> filled = ausweather.infill_stations(dfs, k=5, method="ratio")
+
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from ausweather.core import INTERPOLATION_CODES, dates_to_finyear
+from ausweather.metrics import instrumented
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "INFILL_CODE",
+    "MISSING_CODE",
+    "infill_stations",
+    "infill_array",
+    "station_day_array",
+]
+
+# Interpolation code of values filled from neighbouring stations.
+INFILL_CODE = 91
+
+# Interpolation code of days left missing (NaN) because no neighbour had data.
+MISSING_CODE = 99
+
+INFILL_METHODS = ("ratio", "regression")
+
+# Days per chunk: bounds the memory used to (stations x CHUNK_DAYS) arrays.
+CHUNK_DAYS = 4096
+
+
+def station_day_array(stations, value_col="rainfall", dt_col="date"):
+    """Align daily station data into one array.
+
+    Args:
+        stations (dict): maps station ID to a daily DataFrame (e.g. from
+            :func:`ausweather.download_aquarius_rainfall_bulk`) or a
+            :class:`ausweather.RainfallStationData`
+        value_col (str): column with the values
+        dt_col (str): column with the dates
+
+    Returns:
+        dict: with keys "station_ids" (list), "dates" (pd.DatetimeIndex of
+        every day from the first date to the last) and "values" (array of
+        shape (stations, days), NaN where there is no value).
+
+    """
+    frames = {
+        str(s): (df.df if hasattr(df, "df") else df) for s, df in stations.items()
+    }
+    station_ids = list(frames)
+    all_dates = [pd.to_datetime(df[dt_col]) for df in frames.values() if len(df)]
+    if not all_dates:
+        return {
+            "station_ids": station_ids,
+            "dates": pd.DatetimeIndex([]),
+            "values": np.empty((len(station_ids), 0)),
+        }
+    first = min(d.min() for d in all_dates)
+    last = max(d.max() for d in all_dates)
+    dates = pd.date_range(first.normalize(), last.normalize(), freq="D")
+    values = np.full((len(station_ids), len(dates)), np.nan)
+    for i, df in enumerate(frames.values()):
+        if not len(df):
+            continue
+        days = (pd.to_datetime(df[dt_col]).values - dates.values[0]) // np.timedelta64(
+            1, "D"
+        )
+        values[i, days.astype(int)] = df[value_col].values
+    return {"station_ids": station_ids, "dates": dates, "values": values}
+
+
+def _pairwise_sums(values, chunk_days=CHUNK_DAYS):
+    """Sums over the days on which both of each pair of stations have data.
+
+    Returns a dict of (stations x stations) arrays: "n" (number of days),
+    "sx" (sum of the row station's values), "sxx" (sum of its squares) and
+    "sxy" (sum of products). The column station's sums are the transposes.
+
+    """
+    n_stations = values.shape[0]
+    sums = {k: np.zeros((n_stations, n_stations)) for k in ("n", "sx", "sxx", "sxy")}
+    for start in range(0, values.shape[1], chunk_days):
+        chunk = values[:, start : start + chunk_days]
+        present = (~np.isnan(chunk)).astype(float)
+        x = np.nan_to_num(chunk)
+        sums["n"] += present @ present.T
+        sums["sx"] += x @ present.T
+        sums["sxx"] += (x * x) @ present.T
+        sums["sxy"] += x @ x.T
+    return sums
+
+
+def neighbour_stats(values, chunk_days=CHUNK_DAYS):
+    """Pairwise statistics of the stations in a station x day array.
+
+    Args:
+        values (array): shape (stations, days), NaN where missing
+
+    Returns:
+        dict: of (stations x stations) arrays, where element [i, j] relates
+        station i (the target) to station j (the neighbour) over the days both
+        have data: "n" (number of days), "corr" (correlation), "ratio" (total
+        of i / total of j), "slope" and "intercept" (of i regressed on j).
+
+    """
+    s = _pairwise_sums(values, chunk_days)
+    n, sx, sxx, sxy = s["n"], s["sx"], s["sxx"], s["sxy"]
+    sy, syy = sx.T, sxx.T
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = n * sxy - sx * sy
+        var_x = n * sxx - sx * sx
+        var_y = n * syy - sy * sy
+        corr = cov / np.sqrt(var_x * var_y)
+        ratio = sx / sy
+        slope = cov / var_y
+        intercept = (sx - slope * sy) / n
+    np.fill_diagonal(corr, np.nan)
+    return {
+        "n": n,
+        "corr": corr,
+        "ratio": ratio,
+        "slope": slope,
+        "intercept": intercept,
+    }
+
+
+def haversine_km(lat, lon):
+    """Matrix of great-circle distances (km) between points."""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = (
+        np.sin(dlat / 2) ** 2
+        + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+    )
+    return 6371.0 * 2 * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def select_neighbours(
+    stats, k=5, min_overlap=365, min_corr=0.5, distances=None, max_distance_km=None
+):
+    """Choose each station's neighbours.
+
+    Args:
+        stats (dict): from :func:`neighbour_stats`
+        k (int): neighbours per station
+        min_overlap (int): minimum days of data in common
+        min_corr (float): minimum correlation
+        distances (array): (stations x stations) distances in km. If given,
+            the nearest eligible stations are chosen, otherwise the most
+            correlated.
+        max_distance_km (float): ignore stations further away than this
+
+    Returns:
+        array: of shape (stations, k), the indices of each station's
+        neighbours in order of preference, -1 where there are fewer than k.
+
+    """
+    corr = stats["corr"]
+    eligible = (stats["n"] >= min_overlap) & (corr >= min_corr)
+    np.fill_diagonal(eligible, False)
+    if distances is not None and max_distance_km is not None:
+        eligible &= distances <= max_distance_km
+    if distances is not None:
+        score = np.where(eligible, distances, np.inf)
+    else:
+        score = np.where(eligible, -corr, np.inf)
+    k = min(k, corr.shape[0])
+    order = np.argsort(score, axis=1, kind="stable")[:, :k]
+    ok = np.take_along_axis(eligible, order, axis=1)
+    return np.where(ok, order, -1)
+
+
+@instrumented
+def infill_array(
+    values,
+    k=5,
+    method="ratio",
+    min_overlap=365,
+    min_corr=0.5,
+    distances=None,
+    max_distance_km=None,
+    fill_mask=None,
+    chunk_days=CHUNK_DAYS,
+):
+    """Fill missing values in a station x day array from neighbouring stations.
+
+    Args:
+        values (array): shape (stations, days), NaN where missing
+        k (int): maximum neighbours per station
+        method (str): "ratio" or "regression" scaling
+        min_overlap, min_corr, distances, max_distance_km: see
+            :func:`select_neighbours`
+        fill_mask (array of bool): which missing values to fill, default
+            all of them
+        chunk_days (int): days processed at a time
+
+    Returns:
+        dict: with keys "values" (the filled array), "filled" (bool array of
+        the values that were filled), "neighbours" (see
+        :func:`select_neighbours`) and "stats" (see :func:`neighbour_stats`).
+
+    """
+    if not method in INFILL_METHODS:
+        raise KeyError(f"method must be one of {INFILL_METHODS}, not {method!r}")
+    values = np.asarray(values, dtype=float)
+    stats = neighbour_stats(values, chunk_days)
+    neighbours = select_neighbours(
+        stats, k, min_overlap, min_corr, distances, max_distance_km
+    )
+    rows = np.arange(values.shape[0])[:, None]
+    nb = np.where(neighbours >= 0, neighbours, 0)
+    valid = neighbours >= 0
+    weight = np.where(valid, stats["corr"][rows, nb] ** 2, 0)
+    if method == "ratio":
+        scale = np.where(valid, stats["ratio"][rows, nb], 0)
+        offset = np.zeros_like(scale)
+    else:
+        scale = np.where(valid, stats["slope"][rows, nb], 0)
+        offset = np.where(valid, stats["intercept"][rows, nb], 0)
+    weight[~np.isfinite(scale) | ~np.isfinite(offset)] = 0
+    scale = np.nan_to_num(scale, posinf=0, neginf=0)
+    offset = np.nan_to_num(offset, posinf=0, neginf=0)
+
+    result = values.copy()
+    filled = np.zeros(values.shape, dtype=bool)
+    for start in range(0, values.shape[1], chunk_days):
+        days = slice(start, start + chunk_days)
+        chunk = values[:, days]
+        total = np.zeros(chunk.shape)
+        weights = np.zeros(chunk.shape)
+        for r in range(neighbours.shape[1]):
+            other = chunk[nb[:, r]]
+            present = ~np.isnan(other) & (weight[:, r, None] > 0)
+            estimate = np.maximum(scale[:, r, None] * other + offset[:, r, None], 0)
+            total += np.where(present, estimate * weight[:, r, None], 0)
+            weights += np.where(present, weight[:, r, None], 0)
+        todo = np.isnan(chunk) & (weights > 0)
+        if fill_mask is not None:
+            todo &= fill_mask[:, days]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            result[:, days] = np.where(todo, total / weights, chunk)
+        filled[:, days] = todo
+    logger.debug(
+        f"Filled {filled.sum()} of {np.isnan(values).sum()} missing values "
+        f"for {values.shape[0]} stations"
+    )
+    return {
+        "values": result,
+        "filled": filled,
+        "neighbours": neighbours,
+        "stats": stats,
+    }
+
+
+@instrumented
+def infill_stations(
+    stations,
+    k=5,
+    method="ratio",
+    locations=None,
+    max_distance_km=None,
+    min_overlap=365,
+    min_corr=0.5,
+    value_col="rainfall",
+):
+    """Fill the gaps in a collection of daily station records.
+
+    Args:
+        stations (dict): maps station ID to a daily DataFrame with columns
+            date, rainfall, interpolated_code and quality (e.g. from
+            :func:`ausweather.download_aquarius_rainfall_bulk`) or a
+            :class:`ausweather.RainfallStationData`
+        k (int): maximum neighbours used for each station
+        method (str): "ratio" or "regression", see :mod:`ausweather.infill`
+        locations (pd.DataFrame): optional, with columns station_id, lat and
+            lon. If given, the nearest correlated stations are used.
+        max_distance_km (float): only use neighbours this close (requires
+            *locations*)
+        min_overlap (int): days of data a neighbour must have in common
+        min_corr (float): minimum correlation of daily values
+        value_col (str): column to fill
+
+    Returns:
+        dict: maps station ID to a copy of its DataFrame with a row for every
+        day between its first and last, the gaps filled where possible, and
+        interpolated_code :data:`INFILL_CODE` on filled days and
+        :data:`MISSING_CODE` on days still missing.
+
+    Only days within each station's own record are filled.
+
+    """
+    data = station_day_array(stations, value_col=value_col)
+    station_ids, dates, values = data["station_ids"], data["dates"], data["values"]
+    distances = None
+    if locations is not None:
+        loc = locations.assign(station_id=locations.station_id.astype(str))
+        loc = loc.set_index("station_id").reindex(station_ids)
+        distances = haversine_km(loc.lat.values, loc.lon.values)
+        distances[np.isnan(distances)] = np.inf
+    elif max_distance_km is not None:
+        raise ValueError("max_distance_km requires locations")
+
+    # Only fill between each station's first and last value.
+    present = ~np.isnan(values)
+    day = np.arange(values.shape[1])
+    first = np.where(present.any(axis=1), present.argmax(axis=1), values.shape[1])
+    last = values.shape[1] - 1 - present[:, ::-1].argmax(axis=1)
+    in_record = (day >= first[:, None]) & (day <= last[:, None])
+
+    result = infill_array(
+        values,
+        k=k,
+        method=method,
+        min_overlap=min_overlap,
+        min_corr=min_corr,
+        distances=distances,
+        max_distance_km=max_distance_km,
+        fill_mask=in_record,
+    )
+    out = {}
+    for i, (station_id, df) in enumerate(zip(station_ids, stations.values())):
+        df = df.df if hasattr(df, "df") else df
+        if first[i] >= values.shape[1]:
+            out[station_id] = df.copy()
+            continue
+        span = slice(first[i], last[i] + 1)
+        out[station_id] = _infilled_frame(
+            df,
+            dates[span],
+            result["values"][i, span],
+            result["filled"][i, span],
+            value_col,
+        )
+    return out
+
+
+def _infilled_frame(df, dates, values, filled, value_col):
+    df = df.assign(date=pd.to_datetime(df["date"]))
+    df = df.drop_duplicates("date").set_index("date").reindex(dates)
+    df.index.name = "date"
+    df[value_col] = values
+    codes = df["interpolated_code"] if "interpolated_code" in df.columns else 0
+    codes = np.where(filled, INFILL_CODE, codes)
+    codes = np.where(np.isnan(values), MISSING_CODE, codes)
+    # Days with a value but no code (e.g. from sources without codes) are
+    # observations.
+    df["interpolated_code"] = pd.Series(codes, index=df.index).fillna(0).astype(int)
+    if "interpolated_desc" in df.columns:
+        df["interpolated_desc"] = df.interpolated_code.map(INTERPOLATION_CODES)
+    df = df.reset_index()
+    for col, func in (
+        ("year", lambda d: d.dt.year),
+        ("dayofyear", lambda d: d.dt.dayofyear),
+        ("finyear", lambda d: dates_to_finyear(d).values),
+    ):
+        if col in df.columns:
+            df[col] = func(df["date"])
+    if "month" in df.columns:
+        df["month"] = df["date"].dt.month
+    return df
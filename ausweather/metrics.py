@@ -0,0 +1,374 @@
+"""Timing and metrics for the fetchers and transforms.
+
+The functions that download, parse and transform data report each stage
+they run - e.g. "http.get", "silo.parse_silo_alldata" or
+"core.RainfallStationData.calendar" - with its duration and, where known,
+the bytes downloaded, the rows produced and cache hits and misses.
+
+Nothing is recorded unless a sink is registered with :func:`add_sink`, so
+the overhead is negligible otherwise. A sink is any callable that takes a
+:class:`StageEvent`:
+
+.. code-block::
+
+    >>> from ausweather.metrics import MetricsCollector
+    >>> with MetricsCollector() as metrics:
+    ...     rf = ausweather.RainfallStationData.from_bom_via_silo(23090, email)
+    ...     rf.calendar
+    >>> metrics.summary()
+
+:class:`LoggingSink` logs each event, and :class:`PrometheusSink` exports
+them with ``prometheus_client``. Other systems (e.g. OpenTelemetry) can be
+fed with a small callable of your own.
+
+"""
+
+import functools
+import logging
+import threading
+import time
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+__all__ = [
+    "MetricsCollector",
+    "LoggingSink",
+    "PrometheusSink",
+    "add_sink",
+    "remove_sink",
+]
+
+COUNTS = ("bytes", "rows", "hits", "misses")
+
+_sinks = ()
+_sinks_lock = threading.Lock()
+
+
+def add_sink(sink):
+    """Register a callable to receive every :class:`StageEvent`."""
+    global _sinks
+    with _sinks_lock:
+        _sinks = _sinks + (sink,)
+    return sink
+
+
+def remove_sink(sink):
+    """Unregister a sink added with :func:`add_sink`."""
+    global _sinks
+    with _sinks_lock:
+        _sinks = tuple(s for s in _sinks if s is not sink)
+
+
+def enabled():
+    """True if any sink is registered."""
+    return bool(_sinks)
+
+
+class StageEvent:
+    """One stage that ran, or one count recorded with :func:`record`.
+
+    Attributes:
+        name (str): stage name, e.g. "http.get"
+        seconds (float): duration, or None for a plain count
+        bytes (int): bytes downloaded, or None
+        rows (int): rows produced, or None
+        hits (int): cache hits
+        misses (int): cache misses
+        error (str): name of the exception raised by the stage, or None
+        tags (dict): details such as the host or station
+
+    """
+
+    def __init__(
+        self,
+        name,
+        seconds=None,
+        bytes=None,
+        rows=None,
+        hits=0,
+        misses=0,
+        error=None,
+        tags=None,
+    ):
+        self.name = name
+        self.seconds = seconds
+        self.bytes = bytes
+        self.rows = rows
+        self.hits = hits
+        self.misses = misses
+        self.error = error
+        self.tags = tags or {}
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "seconds": self.seconds,
+            "bytes": self.bytes,
+            "rows": self.rows,
+            "hits": self.hits,
+            "misses": self.misses,
+            "error": self.error,
+            **self.tags,
+        }
+
+    def __repr__(self):
+        return f"StageEvent({self.as_dict()!r})"
+
+
+def _emit(event):
+    for sink in _sinks:
+        try:
+            sink(event)
+        except Exception:
+            logger.warning(f"Metrics sink {sink!r} failed", exc_info=True)
+
+
+class Stage:
+    """Times a block of code and emits a :class:`StageEvent` when it ends.
+
+    Use :func:`stage` to create one.
+
+    """
+
+    def __init__(self, name, tags):
+        self.name = name
+        self.tags = tags
+        self.counts = {}
+
+    def add(self, **counts):
+        """Add to the bytes, rows, hits or misses of this stage."""
+        for key, value in counts.items():
+            if value is not None:
+                self.counts[key] = self.counts.get(key, 0) + value
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.started
+        _emit(
+            StageEvent(
+                self.name,
+                seconds,
+                error=exc_type.__name__ if exc_type else None,
+                tags=self.tags,
+                **self.counts,
+            )
+        )
+        return False
+
+
+class _NullStage:
+    """Stand-in for :class:`Stage` when no sink is registered."""
+
+    def add(self, **counts):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, **tags):
+    """Context manager timing a stage.
+
+    .. code-block::
+
+        with stage("silo.download", station=station) as s:
+            r = get_scheduler().get(url)
+            s.add(bytes=len(r.content))
+
+    """
+    if not _sinks:
+        return _NULL_STAGE
+    return Stage(name, tags)
+
+
+def record(name, **counts_and_tags):
+    """Emit a count (e.g. cache hits) that is not tied to a timed stage."""
+    if not _sinks:
+        return
+    counts = {k: counts_and_tags.pop(k) for k in COUNTS if k in counts_and_tags}
+    _emit(StageEvent(name, tags=counts_and_tags, **counts))
+
+
+def count_rows(result):
+    """The number of rows in a DataFrame/Table, or a dict of them, or None."""
+    if hasattr(result, "shape"):
+        return result.shape[0]
+    if isinstance(result, dict):
+        if "df" in result:
+            return count_rows(result["df"])
+        if result and all(hasattr(v, "shape") for v in result.values()):
+            return sum(v.shape[0] for v in result.values())
+    return None
+
+
+def instrumented(func):
+    """Decorator timing each call of *func* as a stage.
+
+    The stage is named after the module and qualified name of the function,
+    e.g. "silo.parse_silo_alldata", and counts the rows of the result.
+
+    """
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _sinks:
+            return func(*args, **kwargs)
+        with Stage(name, {}) as s:
+            result = func(*args, **kwargs)
+            s.add(rows=count_rows(result))
+        return result
+
+    return wrapper
+
+
+class MetricsCollector:
+    """Sink that keeps every event in memory.
+
+    Use it as a context manager to register it for a block of code, or
+    register it with :func:`add_sink`.
+
+    """
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def __call__(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def __enter__(self):
+        return add_sink(self)
+
+    def __exit__(self, *exc_info):
+        remove_sink(self)
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+
+    def to_frame(self):
+        """All events as a DataFrame, one row per event."""
+        return pd.DataFrame(
+            [e.as_dict() for e in self.events],
+            columns=["name", "seconds"] + list(COUNTS) + ["error"],
+        )
+
+    def summary(self):
+        """Totals per stage.
+
+        Returns:
+            pandas DataFrame indexed by stage name, with columns calls,
+            seconds (total), mean_seconds, max_seconds, bytes, rows, hits,
+            misses and errors, sorted by total time.
+
+        """
+        df = self.to_frame()
+        grouped = df.groupby("name")
+        summary = pd.DataFrame(
+            {
+                "calls": grouped.size(),
+                "seconds": grouped.seconds.sum(),
+                "mean_seconds": grouped.seconds.mean(),
+                "max_seconds": grouped.seconds.max(),
+                "bytes": grouped.bytes.sum(),
+                "rows": grouped.rows.sum(),
+                "hits": grouped.hits.sum(),
+                "misses": grouped.misses.sum(),
+                "errors": grouped.error.count(),
+            }
+        )
+        return summary.sort_values("seconds", ascending=False)
+
+
+class LoggingSink:
+    """Sink that logs each event.
+
+    Args:
+        logger (logging.Logger): default is this module's logger
+        level (int): logging level
+
+    """
+
+    def __init__(self, logger=None, level=logging.DEBUG):
+        self.logger = logging.getLogger(__name__) if logger is None else logger
+        self.level = level
+
+    def __call__(self, event):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        parts = [event.name]
+        if event.seconds is not None:
+            parts.append(f"{event.seconds * 1000:.1f} ms")
+        for key in COUNTS:
+            value = getattr(event, key)
+            if value:
+                parts.append(f"{key}={value}")
+        if event.error:
+            parts.append(f"error={event.error}")
+        parts += [f"{k}={v}" for k, v in event.tags.items()]
+        self.logger.log(self.level, " ".join(parts))
+
+
+def _prometheus_client():
+    try:
+        import prometheus_client
+    except ImportError:
+        raise ImportError("PrometheusSink requires prometheus_client to be installed")
+    return prometheus_client
+
+
+class PrometheusSink:
+    """Sink that exports events as Prometheus metrics.
+
+    Args:
+        namespace (str): prefix of the metric names
+        registry (prometheus_client.CollectorRegistry): default is the
+            global registry
+
+    Creates a ``<namespace>_stage_seconds`` histogram and
+    ``<namespace>_stage_{bytes,rows,cache_hits,cache_misses,errors}_total``
+    counters, all labelled by stage name only (tags such as station IDs
+    would give too many series).
+
+    Requires the optional dependency ``prometheus_client``.
+
+    """
+
+    def __init__(self, namespace="ausweather", registry=None):
+        prom = _prometheus_client()
+        if registry is None:
+            registry = prom.REGISTRY
+        kws = dict(namespace=namespace, labelnames=["stage"], registry=registry)
+        self.seconds = prom.Histogram(
+            "stage_seconds", "Time spent in each stage", **kws
+        )
+        self.counters = {
+            "bytes": prom.Counter("stage_bytes", "Bytes downloaded", **kws),
+            "rows": prom.Counter("stage_rows", "Rows produced", **kws),
+            "hits": prom.Counter("stage_cache_hits", "Cache hits", **kws),
+            "misses": prom.Counter("stage_cache_misses", "Cache misses", **kws),
+        }
+        self.errors = prom.Counter("stage_errors", "Stages that raised", **kws)
+
+    def __call__(self, event):
+        if event.seconds is not None:
+            self.seconds.labels(event.name).observe(event.seconds)
+        for key, counter in self.counters.items():
+            value = getattr(event, key)
+            if value:
+                counter.labels(event.name).inc(value)
+        if event.error:
+            self.errors.labels(event.name).inc()
@@ -0,0 +1,287 @@
+"""Run the annual and monthly analyses for many stations on a process pool.
+
+The daily arrays of every station are packed into shared memory once, and
+each worker process attaches to them by name, so no DataFrames are
+pickled on the way in. Only the (small) summary tables come back.
+
+.. code-block::
+
+    >>> stations = {s: RainfallStationData.from_archive(s) for s in station_ids}
+    >>> results = analyse_stations(stations, processes=32)
+    >>> results["calendar"].head()
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import logging
+from multiprocessing import shared_memory
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from ausweather.core import (
+    RainfallStationData,
+    annual_stats,
+    monthly_stats,
+    calculate_deviations,
+    dates_to_finyear,
+)
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["analyse_stations"]
+
+# Daily columns shared with the workers, and their dtypes. interpolated_code
+# is shared as float so that missing codes (NaN) survive the round trip.
+SHARED_COLUMNS = {
+    "date": "int64",
+    "rainfall": "float64",
+    "interpolated_code": "float64",
+    "quality": "float64",
+}
+
+
+class SharedDailyArrays:
+    """The daily arrays of many stations, concatenated in shared memory.
+
+    Args:
+        stations (sequence of RainfallStationData): stations to share
+
+    Attributes:
+        offsets (list): (start, stop) row positions of each station, in the
+            order of *stations* (which may include a station more than once)
+        names (dict): maps column name to shared memory block name
+
+    Call :meth:`close` to free the shared memory when finished.
+
+    """
+
+    def __init__(self, stations):
+        self.offsets = []
+        lengths = [len(rf.df) for rf in stations]
+        total = max(sum(lengths), 1)
+        self.blocks = {}
+        self.names = {}
+        try:
+            for col, dtype in SHARED_COLUMNS.items():
+                block = shared_memory.SharedMemory(
+                    create=True, size=total * np.dtype(dtype).itemsize
+                )
+                self.blocks[col] = block
+                self.names[col] = block.name
+            start = 0
+            for rf, n in zip(stations, lengths):
+                self.offsets.append((start, start + n))
+                for col, dtype in SHARED_COLUMNS.items():
+                    values = rf.df[col]
+                    if col == "date":
+                        values = values.values.astype("datetime64[ns]").view("int64")
+                    array = np.ndarray(
+                        (total,), dtype=dtype, buffer=self.blocks[col].buf
+                    )
+                    array[start : start + n] = np.asarray(values, dtype=dtype)
+                    del array
+                start += n
+        except BaseException:
+            self.close()
+            raise
+        self.total = total
+
+    def close(self):
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+
+
+def _attach(names, total):
+    blocks = {col: shared_memory.SharedMemory(name=name) for col, name in names.items()}
+    arrays = {
+        col: np.ndarray((total,), dtype=SHARED_COLUMNS[col], buffer=blocks[col].buf)
+        for col in names
+    }
+    return blocks, arrays
+
+
+def _station_from_arrays(station_id, arrays, start, stop, exclude_incomplete_years):
+    dates = pd.to_datetime(arrays["date"][start:stop].astype("datetime64[ns]"))
+    codes = arrays["interpolated_code"][start:stop]
+    if not np.isnan(codes).any():
+        codes = codes.astype(int)
+    df = pd.DataFrame(
+        {
+            "date": dates,
+            "rainfall": arrays["rainfall"][start:stop],
+            "interpolated_code": codes,
+            "quality": arrays["quality"][start:stop],
+            "year": dates.year,
+            "dayofyear": dates.dayofyear,
+            "finyear": dates_to_finyear(dates).values,
+        }
+    )
+    return RainfallStationData.from_data(
+        station_id, df, exclude_incomplete_years=exclude_incomplete_years
+    )
+
+
+def _analyse_station(rf, avg_pd_start=None, avg_pd_end=None):
+    """Analyse one station, returning only picklable tables."""
+    results = {}
+    for year_type, dt_col in (("calendar", "year"), ("financial", "finyear")):
+        table = getattr(rf, year_type)
+        if len(table):
+            stats = annual_stats(table, avg_pd_start, avg_pd_end, dt_col=dt_col)
+            table = calculate_deviations(table, stats)
+            stats = {k: v for k, v in stats.items() if k != "percentile"}
+        else:
+            stats = {}
+        results[year_type] = table
+        results[f"{year_type}_stats"] = pd.DataFrame(
+            [dict(stats, station_id=rf.station_id)]
+        )
+    month = rf.month
+    if len(month):
+        mstats = monthly_stats(month).drop(columns=["percentile"])
+        results["monthly_stats"] = mstats.reset_index().assign(station_id=rf.station_id)
+    else:
+        results["monthly_stats"] = pd.DataFrame()
+    return results
+
+
+def _picklable(error):
+    """*error*, or a RuntimeError with its message if it can't be pickled."""
+    try:
+        pickle.dumps(error)
+        return error
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+
+
+def _analyse_shard(names, total, shard, kwargs):
+    """Analyse a shard of stations.
+
+    Returns:
+        tuple: (results, failures) where *failures* is a list of
+        (station_id, exception) for the stations whose analysis raised.
+
+    """
+    blocks, arrays = _attach(names, total)
+    try:
+        results = []
+        failures = []
+        for station_id, start, stop, exclude_incomplete_years in shard:
+            try:
+                rf = _station_from_arrays(
+                    station_id, arrays, start, stop, exclude_incomplete_years
+                )
+                results.append(_analyse_station(rf, **kwargs))
+            except Exception as e:
+                failures.append((station_id, _picklable(e)))
+        return results, failures
+    finally:
+        del arrays
+        for block in blocks.values():
+            block.close()
+
+
+def _shards(stations, offsets, n_shards):
+    """Split stations into shards of roughly equal total length."""
+    shards = [[] for i in range(n_shards)]
+    sizes = np.zeros(n_shards)
+    order = sorted(range(len(stations)), key=lambda j: -len(stations[j].df))
+    for j in order:
+        rf = stations[j]
+        i = int(np.argmin(sizes))
+        start, stop = offsets[j]
+        shards[i].append((rf.station_id, start, stop, rf.exclude_incomplete_years))
+        sizes[i] += stop - start
+    return [shard for shard in shards if shard]
+
+
+def analyse_stations(
+    stations,
+    processes=None,
+    avg_pd_start=None,
+    avg_pd_end=None,
+    chunks_per_process=4,
+    errors="raise",
+):
+    """Calculate annual and monthly statistics for many stations in parallel.
+
+    Args:
+        stations (dict or sequence): :class:`ausweather.RainfallStationData`
+            objects (the values, if a dict)
+        processes (int): size of the process pool, default the number of CPUs
+        avg_pd_start: first year for :func:`ausweather.annual_stats`
+        avg_pd_end: last year for :func:`ausweather.annual_stats`
+        chunks_per_process (int): stations are split into this many shards
+            per process, to balance the load
+        errors (str): if the analysis of a station raises an exception,
+            "raise" re-raises it (after every station has been tried) and
+            "warn" logs a warning and leaves the station out
+
+    Returns:
+        dict: of pandas DataFrames, each combining all stations (with a
+        station_id column):
+
+        - "calendar" and "financial": the yearly tables with the columns of
+          :func:`ausweather.calculate_deviations`
+        - "calendar_stats" and "financial_stats": one row of
+          :func:`ausweather.annual_stats` per station
+        - "monthly_stats": :func:`ausweather.monthly_stats` per station
+
+    """
+    if isinstance(stations, dict):
+        stations = list(stations.values())
+    stations = list(stations)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if not errors in ("raise", "warn"):
+        raise KeyError(f"errors must be 'raise' or 'warn', not {errors!r}")
+    kwargs = {"avg_pd_start": avg_pd_start, "avg_pd_end": avg_pd_end}
+
+    shared = SharedDailyArrays(stations)
+    try:
+        shards = _shards(stations, shared.offsets, processes * chunks_per_process)
+        logger.info(
+            f"Analysing {len(stations)} stations in {len(shards)} shards "
+            f"on {processes} processes"
+        )
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [
+                executor.submit(
+                    _analyse_shard, shared.names, shared.total, shard, kwargs
+                )
+                for shard in shards
+            ]
+            results = []
+            failures = []
+            for future in futures:
+                shard_results, shard_failures = future.result()
+                results += shard_results
+                failures += shard_failures
+    finally:
+        shared.close()
+
+    for station_id, error in failures:
+        logger.warning(f"Analysis failed for station {station_id}: {error}")
+    if failures and errors == "raise":
+        station_id, error = failures[0]
+        raise error
+
+    keys = [
+        "calendar",
+        "financial",
+        "calendar_stats",
+        "financial_stats",
+        "monthly_stats",
+    ]
+    combined = {}
+    for key in keys:
+        tables = [r[key] for r in results if len(r[key])]
+        if tables:
+            combined[key] = pd.concat(tables, ignore_index=True)
+        else:
+            combined[key] = pd.DataFrame()
+    return combined
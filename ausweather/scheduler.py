@@ -0,0 +1,450 @@
+"""Rate-limited HTTP request scheduling shared by all the data fetchers.
+
+SILO and the BoM throttle aggressive clients, so every request made by
+ausweather goes through a :class:`RequestScheduler`, which per host:
+
+- limits the request rate with a token bucket,
+- retries 429 and 5xx responses, timeouts and connection errors with
+  exponential backoff and full jitter (honouring ``Retry-After``),
+- adapts the number of concurrent requests AIMD-style: each success adds
+  ``1 / limit`` to the concurrency limit and each throttle halves it, so it
+  settles around the most the server will tolerate, and
+- counts requests, retries, throttles and errors (see :meth:`RequestScheduler.stats`).
+
+:class:`SingleFlight` coalesces concurrent requests for the same data.
+
+The default scheduler is returned by :func:`get_scheduler` and can be
+replaced with :func:`set_scheduler`.
+
+"""
+
+import asyncio
+from email.utils import parsedate_to_datetime
+import logging
+import math
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import pandas as pd
+import requests
+
+from ausweather import metrics
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["RequestScheduler", "SingleFlight", "get_scheduler", "set_scheduler"]
+
+
+class TokenBucket:
+    """Token bucket rate limiter.
+
+    Args:
+        rate (float): tokens added per second
+        burst (float): maximum number of tokens
+
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token, returning how many seconds to wait before using it."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(
+                self.burst, self.tokens + (now - self.updated) * self.rate
+            )
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0
+            return -self.tokens / self.rate
+
+
+class HostState:
+    """Rate limit, adaptive concurrency limit and counters for one host.
+
+    Args:
+        rate (float): requests per second
+        burst (int): token bucket size
+        initial_concurrency (int): starting concurrency limit
+        max_concurrency (int): the concurrency limit never grows beyond this
+
+    """
+
+    def __init__(self, rate, burst, initial_concurrency, max_concurrency):
+        self.bucket = TokenBucket(rate, burst)
+        self.limit = float(initial_concurrency)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.condition = threading.Condition()
+        self.counters = {
+            "requests": 0,
+            "retries": 0,
+            "throttles": 0,
+            "timeouts": 0,
+            "errors": 0,
+        }
+
+    def _try_acquire(self):
+        with self.condition:
+            if self.in_flight < max(1, math.floor(self.limit)):
+                self.in_flight += 1
+                self.counters["requests"] += 1
+                return True
+            return False
+
+    def acquire(self):
+        """Wait for a free concurrency slot and a rate-limit token.
+
+        If the wait for the token is interrupted, the slot is released.
+
+        """
+        with self.condition:
+            while self.in_flight >= max(1, math.floor(self.limit)):
+                self.condition.wait()
+            self.in_flight += 1
+            self.counters["requests"] += 1
+        delay = self.bucket.reserve()
+        if delay:
+            try:
+                time.sleep(delay)
+            except BaseException:
+                self.release("cancelled")
+                raise
+
+    async def acquire_async(self, poll_interval=0.01):
+        """Asyncio version of :meth:`acquire`."""
+        while not self._try_acquire():
+            await asyncio.sleep(poll_interval)
+        delay = self.bucket.reserve()
+        if delay:
+            try:
+                await asyncio.sleep(delay)
+            except BaseException:
+                self.release("cancelled")
+                raise
+
+    def release(self, outcome="ok"):
+        """Release a slot, adjusting the concurrency limit.
+
+        Args:
+            outcome (str): "ok", "throttle", "timeout", "error" or
+                "cancelled"
+
+        """
+        with self.condition:
+            self.in_flight -= 1
+            if outcome == "ok":
+                self.limit = min(self.max_concurrency, self.limit + 1 / self.limit)
+            elif outcome in ("throttle", "timeout"):
+                self.limit = max(1.0, self.limit / 2)
+            if outcome == "throttle":
+                self.counters["throttles"] += 1
+            elif outcome == "timeout":
+                self.counters["timeouts"] += 1
+            elif outcome == "error":
+                self.counters["errors"] += 1
+            self.condition.notify_all()
+
+
+def retry_after(headers):
+    """Parse a Retry-After header into seconds, or None."""
+    value = headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttled(status_code):
+    """True if an HTTP status means "slow down and try again"."""
+    return status_code == 429 or status_code >= 500
+
+
+def release_on_close(response, state):
+    """Hold a streamed response's slot until the response is closed.
+
+    The slot is released as "ok" if the whole body was read, otherwise as
+    "cancelled" (which leaves the concurrency limit alone).
+
+    """
+    close = response.close
+    released = False
+
+    def close_and_release():
+        nonlocal released
+        try:
+            close()
+        finally:
+            if not released:
+                released = True
+                state.release("ok" if response._content_consumed else "cancelled")
+
+    response.close = close_and_release
+
+
+class RequestScheduler:
+    """Schedules HTTP requests with per-host rate limits, retries and
+    adaptive concurrency.
+
+    Args:
+        rate (float): default requests per second for each host
+        burst (int): default token bucket size for each host
+        max_retries (int): retries after the first attempt
+        backoff_base (float): backoff before the first retry, in seconds.
+            It doubles with each retry.
+        backoff_max (float): maximum backoff, in seconds
+        timeout (float): timeout for each request, in seconds
+        initial_concurrency (int): starting concurrency limit per host
+        max_concurrency (int): maximum concurrency limit per host
+        session (requests.Session): session for the blocking API
+
+    """
+
+    def __init__(
+        self,
+        rate=5.0,
+        burst=5,
+        max_retries=5,
+        backoff_base=1.0,
+        backoff_max=60.0,
+        timeout=120,
+        initial_concurrency=2,
+        max_concurrency=16,
+        session=None,
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        if session is None:
+            session = requests.Session()
+        self.session = session
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+    def host(self, host):
+        """Get the :class:`HostState` for a host (e.g. "www.bom.gov.au")."""
+        with self._hosts_lock:
+            if not host in self._hosts:
+                self._hosts[host] = HostState(
+                    self.rate,
+                    self.burst,
+                    self.initial_concurrency,
+                    self.max_concurrency,
+                )
+            return self._hosts[host]
+
+    def configure_host(self, host, rate=None, burst=None, max_concurrency=None):
+        """Override the rate limit or maximum concurrency for one host."""
+        state = self.host(host)
+        if rate is not None:
+            state.bucket.rate = rate
+        if burst is not None:
+            state.bucket.burst = burst
+        if max_concurrency is not None:
+            state.max_concurrency = max_concurrency
+            state.limit = min(state.limit, max_concurrency)
+
+    def backoff(self, attempt, retry_after=None):
+        """Seconds to wait before retry number *attempt* (from 0)."""
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        return delay
+
+    def get(self, url, **kwargs):
+        """GET a URL, waiting for the host's rate limit and retrying as needed.
+
+        Args:
+            url (str): URL
+            kwargs: passed to :meth:`requests.Session.get`
+
+        Returns:
+            requests.Response
+
+        Raises requests.HTTPError if the response is still 429 or 5xx after
+        all retries, or the last timeout/connection error.
+
+        With ``stream=True`` the request keeps its concurrency slot until the
+        response is closed, so use it as a context manager.
+
+        Each call is an "http.get" stage for :mod:`ausweather.metrics`.
+
+        """
+        with metrics.stage("http.get", host=urlsplit(url).netloc) as s:
+            r = self._get(url, **kwargs)
+            if not kwargs.get("stream"):
+                s.add(bytes=len(r.content))
+            elif "Content-Length" in r.headers:
+                s.add(bytes=int(r.headers["Content-Length"]))
+        return r
+
+    def _get(self, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        state = self.host(urlsplit(url).netloc)
+        for attempt in range(self.max_retries + 1):
+            state.acquire()
+            try:
+                r = self.session.get(url, **kwargs)
+            except (requests.Timeout, requests.ConnectionError) as e:
+                state.release("timeout")
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt)
+                logger.debug(f"{type(e).__name__} for {urlsplit(url).netloc}")
+            except BaseException:
+                # Any other error (or KeyboardInterrupt) must still free the
+                # slot, or later requests to the host wait for it forever.
+                state.release("error")
+                raise
+            else:
+                if not is_throttled(r.status_code):
+                    if kwargs.get("stream"):
+                        release_on_close(r, state)
+                    else:
+                        state.release("ok")
+                    return r
+                state.release("throttle")
+                if attempt == self.max_retries:
+                    r.raise_for_status()
+                delay = self.backoff(attempt, retry_after(r.headers))
+                logger.debug(f"HTTP {r.status_code} from {urlsplit(url).netloc}")
+                r.close()
+            with state.condition:
+                state.counters["retries"] += 1
+            logger.info(f"Retrying {urlsplit(url).netloc} in {delay:.1f} s")
+            time.sleep(delay)
+
+    def stats(self):
+        """Per-host request counters.
+
+        Returns:
+            pandas DataFrame indexed by host, with columns requests, retries,
+            throttles, timeouts, errors, in_flight and concurrency_limit.
+
+        """
+        records = {}
+        for host, state in list(self._hosts.items()):
+            records[host] = dict(
+                state.counters,
+                in_flight=state.in_flight,
+                concurrency_limit=state.limit,
+            )
+        return pd.DataFrame.from_dict(records, orient="index")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that would download the same data.
+
+    Calls are grouped by a key, e.g. (source, station). A call whose
+    [start, finish] range is covered by a call already in flight for the
+    same key waits for that call instead of making its own request, and is
+    given ``narrow(result, start, finish)``.
+
+    When other calls have shared a result, every caller (including the one
+    that made the request) receives a narrowed copy, so callers may modify
+    what they get back.
+
+    Shared calls are counted as hits, and calls that make their own request
+    as misses, of the "singleflight" stage in :mod:`ausweather.metrics`.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, start, finish, func, narrow=None):
+        """Call *func*, or share the result of an in-flight call.
+
+        Args:
+            key (hashable): identifies the data source, e.g. ("silo", "23090")
+            start: start of the requested range (comparable)
+            finish: end of the requested range (comparable)
+            func (callable): makes the request, taking no arguments
+            narrow (callable): ``narrow(result, start, finish)`` returns the
+                part of a shared result for the requested range. Default is
+                to return the shared result itself.
+
+        Returns:
+            the result of *func*, or of the in-flight call.
+
+        """
+        if narrow is None:
+            narrow = lambda result, start, finish: result
+        with self._lock:
+            for call in self._calls.get(key, []):
+                if call["start"] <= start and call["finish"] >= finish:
+                    call["waiters"] += 1
+                    leader = False
+                    break
+            else:
+                call = {
+                    "start": start,
+                    "finish": finish,
+                    "event": threading.Event(),
+                    "waiters": 0,
+                    "result": None,
+                    "error": None,
+                }
+                self._calls.setdefault(key, []).append(call)
+                leader = True
+        metrics.record(
+            "singleflight", hits=int(not leader), misses=int(leader), key=str(key)
+        )
+        if leader:
+            try:
+                call["result"] = func()
+            except BaseException as e:
+                call["error"] = e
+                raise
+            finally:
+                with self._lock:
+                    self._calls[key].remove(call)
+                    if not self._calls[key]:
+                        del self._calls[key]
+                    shared = call["waiters"] > 0
+                call["event"].set()
+            if shared:
+                return narrow(call["result"], start, finish)
+            return call["result"]
+        logger.debug(f"Sharing in-flight request for {key}")
+        call["event"].wait()
+        if call["error"] is not None:
+            raise call["error"]
+        return narrow(call["result"], start, finish)
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    """Get the default :class:`RequestScheduler` used by all fetchers."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RequestScheduler()
+    return _scheduler
+
+
+def set_scheduler(scheduler):
+    """Replace the default :class:`RequestScheduler`."""
+    global _scheduler
+    _scheduler = scheduler
@@ -5,15 +5,26 @@ https://www.longpaddock.qld.gov.au/cgi-bin/silo/PatchedPointDataset.php?start=19
 
 from datetime import datetime
 import io
+import os
 
 import pandas as pd
-import requests
 from pathlib import Path
 import logging
 
+from ausweather.scheduler import get_scheduler, SingleFlight
+from ausweather.backends import check_backend, to_backend
+from ausweather.metrics import instrumented
+
 logger = logging.getLogger(__name__)
 
+# Base URL of the SILO API. Set $AUSWEATHER_SILO_URL (or this variable) to use
+# a local stand-in server.
+SILO_BASE_URL = os.environ.get(
+    "AUSWEATHER_SILO_URL", "https://www.longpaddock.qld.gov.au/cgi-bin/silo"
+)
+
 
+@instrumented
 def get_silo_station_list(filename=None):
     """Load a list of SILO Patched Point Data stations.
 
@@ -31,25 +42,14 @@ def get_silo_station_list(filename=None):
     return df
 
 
-def silo_alldata(station_code, email, start=None, finish=None, return_comments=False):
-    """Retrieve alldata result from SILO (daily timeseries with temperature,
-    rainfall etc).
+def silo_date_range(start=None, finish=None):
+    """Convert start and finish dates to SILO's YYYYMMDD format.
 
-    Args:
-        station_code (int or str): BoM station number
-        email (str): used for querying SILO - no need for an account, but you
-            need to supply a valid email address.
-        start ('auto', datetime, pd.Timestamp, str in YYYYMMDD or int): start of
-            time period to retrieve data for
-        finish ('auto', datetime, pd.Timestamp, str in YYYYMMDD or int): end of
-            time period to retrieve data for
-        return_comments (bool): if True, return a dictionary. if False, return
-            a pandas DataFrame.
+    Args: see :func:`silo_alldata`.
 
     Returns:
-        pandas DataFrame, if return_comments is False. Otherwise, return a
-        dictionary {"df": pandas DataFrame, "comments": comments from SILO
-        call}.
+        tuple: (start, finish) as strings. The defaults are 1 Jan 1889 and
+        today.
 
     """
     if start is None:
@@ -74,25 +74,113 @@ def silo_alldata(station_code, email, start=None, finish=None, return_comments=F
             finish = finish.datetime.strftime("%Y%m%d")
         except:
             pass
+    return str(start), str(finish)
+
 
-    url = (
-        f"https://www.longpaddock.qld.gov.au/cgi-bin/silo"
-        f"/PatchedPointDataset.php?start={start}&finish={finish}"
+def silo_alldata_url(station_code, email, start=None, finish=None):
+    """Build the SILO Patched Point Dataset URL for an alldata query.
+
+    Args: see :func:`silo_alldata`.
+
+    Returns:
+        str
+
+    """
+    start, finish = silo_date_range(start, finish)
+    return (
+        f"{SILO_BASE_URL}/PatchedPointDataset.php?start={start}&finish={finish}"
         f"&station={station_code}&format=alldata&username={email}"
     )
-    print(f"SILO url: {url}")
-    r = requests.get(url)
-    if len(r.text) > 300:
-        snippet = r.text[:300]
-    else:
-        snippet = r.text
-    buffer = io.StringIO(r.text)
-    if len(r.text) > 300:
-        snippet = r.text[:300]
+
+
+silo_flights = SingleFlight()
+
+
+@instrumented
+def silo_alldata(
+    station_code,
+    email,
+    start=None,
+    finish=None,
+    return_comments=False,
+    backend="pandas",
+):
+    """Retrieve alldata result from SILO (daily timeseries with temperature,
+    rainfall etc).
+
+    Args:
+        station_code (int or str): BoM station number
+        email (str): used for querying SILO - no need for an account, but you
+            need to supply a valid email address.
+        start ('auto', datetime, pd.Timestamp, str in YYYYMMDD or int): start of
+            time period to retrieve data for
+        finish ('auto', datetime, pd.Timestamp, str in YYYYMMDD or int): end of
+            time period to retrieve data for
+        return_comments (bool): if True, return a dictionary. if False, return
+            a pandas DataFrame.
+        backend (str): "pandas", "arrow" or "polars" - see
+            :func:`ausweather.to_backend`
+
+    Returns:
+        pandas DataFrame, if return_comments is False. Otherwise, return a
+        dictionary {"df": pandas DataFrame, "comments": comments from SILO
+        call}. With *backend*, the DataFrame is a pyarrow.Table or a
+        polars.DataFrame instead.
+
+    Concurrent calls for the same station share one download if the
+    in-flight request's date range covers theirs (see
+    :class:`ausweather.scheduler.SingleFlight`).
+
+    """
+    check_backend(backend)
+    start, finish = silo_date_range(start, finish)
+    data = silo_flights.do(
+        ("silo", str(int(station_code))),
+        int(start),
+        int(finish),
+        lambda: _download_silo_alldata(station_code, email, start, finish),
+        narrow=narrow_silo_alldata,
+    )
+    df = to_backend(data["df"], backend)
+    if return_comments:
+        return dict(data, df=df)
     else:
-        snippet = r.text
-    print(f"SILO response first 300 chars:\n{snippet}")
+        return df
+
+
+def _download_silo_alldata(station_code, email, start, finish):
+    # The URL is not logged, as it contains the user's email address.
+    logger.debug(
+        f"Downloading SILO alldata for {station_code} from {start} to {finish}"
+    )
+    r = get_scheduler().get(silo_alldata_url(station_code, email, start, finish))
+    r.raise_for_status()
+    return parse_silo_alldata(r.text, return_comments=True)
+
 
+def narrow_silo_alldata(data, start, finish):
+    """Copy the rows of a silo_alldata result between two YYYYMMDD ints."""
+    df = data["df"]
+    dates = df["Date"].dt.strftime("%Y%m%d").astype(int)
+    return {
+        "df": df[(dates >= start) & (dates <= finish)].copy(),
+        "comments": data["comments"],
+    }
+
+
+@instrumented
+def parse_silo_alldata(text, return_comments=False):
+    """Parse the response to a SILO alldata query.
+
+    Args:
+        text (str): the response
+        return_comments (bool): see :func:`silo_alldata`
+
+    Returns:
+        see :func:`silo_alldata`
+
+    """
+    buffer = io.StringIO(text)
     df = pd.read_csv(buffer, sep=r"\s+", comment='"', low_memory=False).iloc[1:]
     df["Date"] = pd.to_datetime(df["Date"], format="%Y%m%d")
     for col in ("Day", "Smx", "Smn", "Srn", "Ssl", "Svp", "Ssp", "Ses", "Sp"):
@@ -118,9 +206,145 @@ def silo_alldata(station_code, email, start=None, finish=None, return_comments=F
         df[col] = df[col].astype(float)
     if return_comments:
         comments = []
-        for line in r.text.splitlines():
+        for line in text.splitlines():
             if line.strip().startswith('"'):
                 comments.append(line)
         return {"df": df, "comments": "\n".join(comments)}
     else:
         return df
+
+
+class SiloAlldataSummary:
+    """Accumulate annual and monthly rainfall summaries from SILO alldata lines.
+
+    Feed it the lines of an alldata response one at a time with
+    :meth:`feed` (or all at once with :meth:`feed_lines`), then call
+    :meth:`result`. Only running totals per month are kept, so memory use
+    does not grow with the number of days.
+
+    """
+
+    def __init__(self):
+        self.comments = []
+        self.columns = None
+        self._skip_units = False
+        # (year, month) -> [rain total, days, n interpolated, n deaccumulated]
+        self.months = {}
+
+    def feed(self, line):
+        """Process one line of the response."""
+        stripped = line.strip()
+        if not stripped:
+            return
+        if stripped.startswith('"'):
+            self.comments.append(line.rstrip("\r\n"))
+            return
+        if self.columns is None:
+            self.columns = stripped.split()
+            self._date = self.columns.index("Date")
+            self._rain = self.columns.index("Rain")
+            self._srn = self.columns.index("Srn")
+            self._skip_units = True
+            return
+        if self._skip_units:
+            self._skip_units = False
+            return
+        parts = stripped.split()
+        date = parts[self._date]
+        key = (int(date[:4]), int(date[4:6]))
+        month = self.months.get(key)
+        if month is None:
+            month = self.months[key] = [0.0, 0, 0, 0]
+        month[0] += float(parts[self._rain])
+        month[1] += 1
+        srn = int(parts[self._srn])
+        if srn in (25, 35, 75):
+            month[2] += 1
+        elif srn == 15:
+            month[3] += 1
+
+    def feed_lines(self, lines):
+        """Process an iterable of lines."""
+        for line in lines:
+            self.feed(line)
+
+    def result(self, only_use_complete_years=False):
+        """Summarise the lines fed so far.
+
+        Args:
+            only_use_complete_years (bool): drop years with fewer than 365 days
+
+        Returns:
+            dict: with keys
+
+            - "monthly": DataFrame with columns year, month, rainfall, days,
+              interpolated and deaccumulated (counts of days)
+            - "annual": Series of annual rainfall totals indexed by year
+            - "srn": DataFrame indexed by year with columns "Interpolated" and
+              "Deaccumulated" (% of year), as in
+              :func:`ausweather.fetch_bom_station_from_silo`
+            - "comments": comment lines from the response
+
+        """
+        monthly = pd.DataFrame(
+            [(y, m, *values) for (y, m), values in sorted(self.months.items())],
+            columns=[
+                "year",
+                "month",
+                "rainfall",
+                "days",
+                "interpolated",
+                "deaccumulated",
+            ],
+        )
+        yearly = monthly.groupby("year")[
+            ["rainfall", "days", "interpolated", "deaccumulated"]
+        ].sum()
+        if only_use_complete_years:
+            yearly = yearly[yearly.days >= 365]
+            monthly = monthly[monthly.year.isin(yearly.index)]
+        annual = yearly.rainfall.rename("Rain")
+        annual.index.name = "Date"
+        srn = pd.DataFrame(
+            {
+                "Interpolated": yearly.interpolated / 365.25 * 100,
+                "Deaccumulated": yearly.deaccumulated / 365.25 * 100,
+            }
+        )
+        srn.index.name = "Date"
+        return {
+            "monthly": monthly.reset_index(drop=True),
+            "annual": annual,
+            "srn": srn,
+            "comments": "\n".join(self.comments),
+        }
+
+
+@instrumented
+def summarise_silo_alldata(
+    station_code, email, start=None, finish=None, only_use_complete_years=False
+):
+    """Stream a SILO alldata response into annual and monthly summaries.
+
+    Args:
+        station_code (int or str): BoM station number
+        email (str): see :func:`silo_alldata`
+        start: see :func:`silo_alldata`
+        finish: see :func:`silo_alldata`
+        only_use_complete_years (bool): drop years with fewer than 365 days
+
+    Returns:
+        dict: see :meth:`SiloAlldataSummary.result`
+
+    Unlike :func:`silo_alldata`, the daily DataFrame is never built - the
+    response is summarised line by line as it downloads.
+
+    """
+    url = silo_alldata_url(station_code, email, start, finish)
+    summary = SiloAlldataSummary()
+    with get_scheduler().get(url, stream=True) as r:
+        r.raise_for_status()
+        if r.encoding is None:
+            r.encoding = "latin-1"
+        summary.feed_lines(r.iter_lines(decode_unicode=True))
+    return summary.result(only_use_complete_years=only_use_complete_years)
@@ -0,0 +1,432 @@
+"""Point and area extraction from local copies of SILO's gridded data.
+
+SILO publishes its interpolated surfaces as one NetCDF file per variable and
+year, e.g.
+
+https://s3-ap-southeast-2.amazonaws.com/silo-open-data/Official/annual/daily_rain/2020.daily_rain.nc
+
+This module reads a local mirror of those files, laid out either as
+``<directory>/<variable>/<year>.<variable>.nc`` (as on the server) or with
+all the files in ``<directory>``:
+
+.. code-block::
+
+    >>> points = {"Clare": (-33.83, 138.61), "Kadina": (-33.96, 137.72)}
+    >>> stations = silo_grid_rainfall("/data/silo", points=points)
+    >>> stations["Clare"].calendar
+
+Each file is opened once and only the HDF5 chunks that contain a requested
+grid cell are read and decompressed, whatever the number of points. Files
+that are stored uncompressed are memory-mapped instead. The files are
+read in parallel by a pool of processes.
+
+Requires the optional dependency ``h5py`` (NetCDF4 files are HDF5 files).
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os
+from pathlib import Path
+import re
+
+import numpy as np
+import pandas as pd
+
+from ausweather.climate import ClimateStationData
+from ausweather.core import RainfallStationData, dates_to_finyear
+from ausweather.metrics import instrumented
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["read_silo_grid", "silo_grid_rainfall", "silo_grid_climate"]
+
+SILO_GRID_VARIABLES = (
+    "daily_rain",
+    "monthly_rain",
+    "max_temp",
+    "min_temp",
+    "vp",
+    "vp_deficit",
+    "evap_pan",
+    "evap_syn",
+    "evap_comb",
+    "evap_morton_lake",
+    "radiation",
+    "rh_tmax",
+    "rh_tmin",
+    "et_short_crop",
+    "et_tall_crop",
+    "et_morton_actual",
+    "et_morton_potential",
+    "et_morton_wet",
+    "mslp",
+)
+
+# Gridded variable -> ClimateStationData variable, where they differ.
+GRID_RENAMES = {"daily_rain": "rainfall"}
+
+# Gridded values are interpolated surfaces, so they get SILO's code for
+# "interpolated" (see ausweather.INTERPOLATION_CODES).
+GRID_INTERPOLATION_CODE = 25
+
+
+def _h5py():
+    try:
+        import h5py
+    except ImportError:
+        raise ImportError("Reading SILO gridded data requires h5py to be installed")
+    return h5py
+
+
+def silo_grid_files(directory, variable="daily_rain", start=None, end=None):
+    """Find the local yearly files for a gridded variable.
+
+    Args:
+        directory (str): root of the local mirror
+        variable (str): SILO gridded variable e.g. "daily_rain"
+        start (pd.Timestamp or str): skip files before this year (optional)
+        end (pd.Timestamp or str): skip files after this year (optional)
+
+    Returns:
+        dict: maps year to the path of its file, sorted by year.
+
+    """
+    if not variable in SILO_GRID_VARIABLES:
+        raise KeyError(
+            f"variable must be one of {SILO_GRID_VARIABLES}, not {variable!r}"
+        )
+    first = None if start is None else pd.Timestamp(start).year
+    last = None if end is None else pd.Timestamp(end).year
+    pattern = re.compile(rf"^(\d{{4}})\.{variable}\.nc$")
+    files = {}
+    for path in (Path(directory) / variable, Path(directory)):
+        if not path.is_dir():
+            continue
+        for filename in path.iterdir():
+            match = pattern.match(filename.name)
+            if not match:
+                continue
+            year = int(match.group(1))
+            if (first is not None and year < first) or (
+                last is not None and year > last
+            ):
+                continue
+            files.setdefault(year, filename)
+    return dict(sorted(files.items()))
+
+
+def _nearest_index(coords, values, name):
+    """Index of the grid coordinate nearest each value."""
+    step = abs(coords[1] - coords[0])
+    order = np.argsort(coords)
+    ordered = coords[order]
+    i = np.clip(np.searchsorted(ordered, values), 1, len(ordered) - 1)
+    i -= values - ordered[i - 1] < ordered[i] - values
+    outside = np.abs(ordered[i] - values) > step
+    if outside.any():
+        raise ValueError(f"{name} {values[outside]} outside the SILO grid")
+    return order[i]
+
+
+def _point_locations(points):
+    """IDs, latitudes and longitudes from a dict or DataFrame of points."""
+    if points is None:
+        return [], np.array([]), np.array([])
+    if isinstance(points, pd.DataFrame):
+        ids = points["station_id"] if "station_id" in points.columns else points.index
+        return list(ids), points["lat"].values, points["lon"].values
+    ids = list(points)
+    lats, lons = zip(*points.values()) if ids else ((), ())
+    return ids, np.asarray(lats, dtype=float), np.asarray(lons, dtype=float)
+
+
+def _polygon_cells(vertices, lat, lon):
+    """Grid cells with centres inside a polygon, and their area weights."""
+    from matplotlib.path import Path as MplPath
+
+    vertices = np.asarray(vertices, dtype=float)
+    polygon = MplPath(vertices)
+    (x0, y0), (x1, y1) = vertices.min(axis=0), vertices.max(axis=0)
+    iy = np.flatnonzero((lat >= y0) & (lat <= y1))
+    ix = np.flatnonzero((lon >= x0) & (lon <= x1))
+    yy, xx = np.meshgrid(iy, ix, indexing="ij")
+    yy, xx = yy.ravel(), xx.ravel()
+    inside = polygon.contains_points(np.column_stack([lon[xx], lat[yy]]))
+    yy, xx = yy[inside], xx[inside]
+    if not len(yy):
+        # Smaller than a grid cell: use the cell nearest its centre.
+        x, y = vertices.mean(axis=0)
+        yy = _nearest_index(lat, np.array([y]), "Latitude")
+        xx = _nearest_index(lon, np.array([x]), "Longitude")
+    # Cell area is proportional to the cosine of the latitude.
+    return yy, xx, np.cos(np.radians(lat[yy]))
+
+
+def _read_coords(path):
+    h5py = _h5py()
+    with h5py.File(path, "r") as f:
+        return f["lat"][:].astype(float), f["lon"][:].astype(float)
+
+
+def _file_dates(f, year):
+    """Dates of the time steps of an open file."""
+    time = f["time"]
+    units = time.attrs.get("units", b"")
+    if isinstance(units, bytes):
+        units = units.decode()
+    match = re.match(r"\s*(\w+)\s+since\s+(.+)", units)
+    if match:
+        unit, base = match.groups()
+        offsets = pd.to_timedelta(time[:], unit=unit.rstrip("s")[0].lower())
+        return (pd.Timestamp(base.strip()) + offsets).values.astype("datetime64[ns]")
+    return pd.date_range(f"{year}-01-01", periods=len(time)).values
+
+
+def _decode(values, attrs):
+    """Apply the NetCDF fill value and scale factor to raw values."""
+    values = values.astype("float32")
+    for key in ("_FillValue", "missing_value"):
+        if key in attrs:
+            values[values == np.asarray(attrs[key]).ravel()[0]] = np.nan
+    if "scale_factor" in attrs:
+        values *= np.asarray(attrs["scale_factor"]).ravel()[0]
+    if "add_offset" in attrs:
+        values += np.asarray(attrs["add_offset"]).ravel()[0]
+    return values
+
+
+def _read_cells(path, variable, year, cells_y, cells_x):
+    """Read the daily values of some grid cells from one yearly file.
+
+    Returns:
+        tuple: (dates, values) where values has a row per day and a column
+        per cell.
+
+    """
+    h5py = _h5py()
+    with h5py.File(path, "r") as f:
+        ds = f[variable]
+        dates = _file_dates(f, year)
+        nt = ds.shape[0]
+        offset = ds.id.get_offset() if ds.chunks is None else None
+        if offset is not None:
+            # Contiguous (so uncompressed): memory-map and let the OS read
+            # only the pages holding the cells.
+            data = np.memmap(
+                path, dtype=ds.dtype, mode="r", offset=offset, shape=ds.shape
+            )
+            raw = data[:, cells_y, cells_x]
+        else:
+            # Read each chunk holding a requested cell exactly once.
+            ct, cy, cx = ds.chunks or ds.shape
+            raw = np.empty((nt, len(cells_y)), dtype=ds.dtype)
+            tiles = cells_y // cy * ((ds.shape[2] - 1) // cx + 1) + cells_x // cx
+            for tile in np.unique(tiles):
+                idx = np.flatnonzero(tiles == tile)
+                y0, x0 = cells_y[idx[0]] // cy * cy, cells_x[idx[0]] // cx * cx
+                for t0 in range(0, nt, ct):
+                    block = ds[t0 : t0 + ct, y0 : y0 + cy, x0 : x0 + cx]
+                    raw[t0 : t0 + ct, idx] = block[
+                        :, cells_y[idx] - y0, cells_x[idx] - x0
+                    ]
+        return dates, _decode(raw, ds.attrs)
+
+
+@instrumented
+def read_silo_grid(
+    directory,
+    variable="daily_rain",
+    points=None,
+    polygons=None,
+    start=None,
+    end=None,
+    processes=None,
+):
+    """Extract daily series for points and areas from SILO gridded files.
+
+    Args:
+        directory (str): root of the local mirror, see :func:`silo_grid_files`
+        variable (str): SILO gridded variable e.g. "daily_rain", "max_temp"
+        points (dict or pd.DataFrame): maps an ID to (lat, lon), or a table
+            with lat and lon columns and a station_id column (or index), e.g.
+            the output of :func:`ausweather.get_silo_station_list`. Each
+            point takes the value of the nearest grid cell.
+        polygons (dict): maps an ID to a sequence of (lon, lat) vertices.
+            Each polygon takes the area-weighted mean of the grid cells with
+            centres inside it (or the cell at its centre, if none are).
+        start (pd.Timestamp or str): first date (optional)
+        end (pd.Timestamp or str): last date (optional)
+        processes (int): size of the process pool, default the number of
+            CPUs. With 1, the files are read in this process.
+
+    Returns:
+        pd.DataFrame: a date column, then a float32 column per point and
+        polygon ID. Values missing from the grid (e.g. over the sea) are NaN.
+
+    """
+    files = silo_grid_files(directory, variable, start, end)
+    if not files:
+        raise KeyError(f"No SILO {variable} files found in {directory}")
+    lat, lon = _read_coords(next(iter(files.values())))
+
+    ids, point_lats, point_lons = _point_locations(points)
+    targets = [
+        (
+            _nearest_index(lat, point_lats, "Latitude"),
+            _nearest_index(lon, point_lons, "Longitude"),
+            None,
+        )
+    ]
+    polygons = polygons or {}
+    for vertices in polygons.values():
+        targets.append(_polygon_cells(vertices, lat, lon))
+    ids += list(polygons)
+
+    # Each grid cell is read once, however many points and polygons use it.
+    cells = np.unique(
+        np.concatenate(
+            [np.column_stack([yy, xx]) for yy, xx, w in targets] + [np.zeros((0, 2))]
+        ).astype(int),
+        axis=0,
+    )
+    keys = cells[:, 0] * len(lon) + cells[:, 1]
+    positions = [np.searchsorted(keys, yy * len(lon) + xx) for yy, xx, w in targets]
+    logger.debug(
+        f"Reading {len(cells)} cells of {variable} from {len(files)} files "
+        f"for {len(ids)} points/polygons"
+    )
+
+    jobs = [
+        (path, variable, year, cells[:, 0], cells[:, 1]) for year, path in files.items()
+    ]
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if processes == 1 or len(jobs) == 1:
+        results = [_read_cells(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_read_cells, *zip(*jobs)))
+    dates = np.concatenate([d for d, v in results])
+    values = np.concatenate([v for d, v in results])
+
+    columns = {"date": dates}
+    point_values = values[:, positions[0]]
+    for i, point_id in enumerate(ids[: len(point_lats)]):
+        columns[point_id] = point_values[:, i]
+    for polygon_id, (yy, xx, weights), pos in zip(polygons, targets[1:], positions[1:]):
+        cell_values = values[:, pos]
+        valid = ~np.isnan(cell_values)
+        total = np.where(valid, cell_values, 0) @ weights
+        with np.errstate(invalid="ignore", divide="ignore"):
+            columns[polygon_id] = (total / (valid @ weights)).astype("float32")
+    df = pd.DataFrame(columns)
+    if start is not None:
+        df = df[df.date >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df.date <= pd.Timestamp(end)]
+    return df.reset_index(drop=True)
+
+
+@instrumented
+def silo_grid_rainfall(
+    directory,
+    points=None,
+    polygons=None,
+    start=None,
+    end=None,
+    processes=None,
+    **kwargs,
+):
+    """Daily rainfall for points and areas from SILO gridded files.
+
+    Args: see :func:`read_silo_grid`. Other keyword arguments are passed to
+    :class:`ausweather.RainfallStationData`.
+
+    Returns:
+        dict: maps each point and polygon ID to a
+        :class:`ausweather.RainfallStationData`, with source "silo_grid" and
+        an interpolated_code of 25 ("interpolated") on every day.
+
+    """
+    df = read_silo_grid(
+        directory, "daily_rain", points, polygons, start, end, processes
+    )
+    dates = pd.to_datetime(df["date"])
+    common = {
+        "date": dates.values,
+        "interpolated_code": GRID_INTERPOLATION_CODE,
+        "quality": 1,
+        "year": dates.dt.year.values,
+        "dayofyear": dates.dt.dayofyear.values,
+        "finyear": dates_to_finyear(dates).values,
+    }
+    kwargs.setdefault("source", "silo_grid")
+    stations = {}
+    for station_id in df.columns[1:]:
+        data = pd.DataFrame(common)
+        data.insert(1, "rainfall", df[station_id].values.astype(float).round(1))
+        stations[station_id] = RainfallStationData.from_data(station_id, data, **kwargs)
+    return stations
+
+
+def _grid_reducer(name):
+    """Rainfall, evaporation and evapotranspiration are summed, others averaged."""
+    if name.endswith("rain") or name.startswith(("evap", "et_")):
+        return "sum"
+    return "mean"
+
+
+@instrumented
+def silo_grid_climate(
+    directory,
+    variables=("daily_rain", "max_temp", "min_temp"),
+    points=None,
+    polygons=None,
+    start=None,
+    end=None,
+    processes=None,
+    **kwargs,
+):
+    """Several daily variables for points and areas from SILO gridded files.
+
+    Args:
+        variables (sequence of str): SILO gridded variables
+        others: see :func:`read_silo_grid`. Other keyword arguments are
+            passed to :class:`ausweather.ClimateStationData`.
+
+    Returns:
+        dict: maps each point and polygon ID to a
+        :class:`ausweather.ClimateStationData` with source "silo_grid". The
+        rainfall variable is named "rainfall" rather than "daily_rain", and
+        it has a source flag (Srn) of 25 so that
+        :meth:`~ausweather.ClimateStationData.to_rainfall` works.
+
+    """
+    frames = {
+        variable: read_silo_grid(
+            directory, variable, points, polygons, start, end, processes
+        )
+        for variable in variables
+    }
+    # Variables may cover different years; keep the days they all have.
+    dates = None
+    for df in frames.values():
+        dates = df.date if dates is None else dates[dates.isin(df.date)]
+    kwargs.setdefault("source", "silo_grid")
+    stations = {}
+    first = next(iter(frames.values()))
+    for station_id in first.columns[1:]:
+        data = {"date": dates.values.astype("datetime64[ns]")}
+        for variable, df in frames.items():
+            values = df[station_id].values[df.date.isin(dates).values]
+            data[GRID_RENAMES.get(variable, variable)] = values.astype("float32")
+        if "rainfall" in data:
+            data["Srn"] = np.full(len(dates), GRID_INTERPOLATION_CODE, dtype="int8")
+        self = ClimateStationData(station_id, **kwargs)
+        for variable in variables:
+            name = GRID_RENAMES.get(variable, variable)
+            self.reducers.setdefault(name, _grid_reducer(name))
+        self.df = pd.DataFrame(data)
+        stations[station_id] = self
+    return stations
@@ -0,0 +1,330 @@
+"""Mann-Kendall trend tests and Sen's slopes for many stations at once.
+
+The annual totals of all the stations are arranged as a station x year
+matrix, with NaN for missing years, and the statistics are calculated for
+every row together with numpy:
+
+.. code-block::
+
+    >>> stations = {s: RainfallStationData.from_archive(s) for s in station_ids}
+    >>> trends = station_trends(stations, serial_correction="hamed_rao")
+    >>> trends[trends.p < 0.05]
+
+The tables from :func:`ausweather.analyse_stations` can be used in place of
+the stations.
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import logging
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from ausweather.metrics import instrumented
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["station_trends", "mann_kendall", "sens_slope", "annual_matrix"]
+
+SERIAL_CORRECTIONS = (None, "hamed_rao", "yue_wang")
+
+# Maximum number of pairwise slopes held in memory at once by sens_slope.
+MAX_PAIRWISE_VALUES = 2**24
+
+
+def annual_matrix(table, value_col="rainfall"):
+    """Arrange annual values of many stations as a station x year matrix.
+
+    Args:
+        table (pd.DataFrame): one row per station and year, with station_id
+            and start_date columns, e.g. :attr:`ausweather.RainfallStationData.calendar`
+            of several stations concatenated
+        value_col (str): column to use
+
+    Returns:
+        tuple: (station_ids, years, values) where years are consecutive
+        (the year of each start_date), and values is a 2D float array with
+        a row per station and NaN for missing years.
+
+    """
+    years = pd.to_datetime(table["start_date"]).dt.year.values
+    station_ids, rows = np.unique(table["station_id"].astype(str), return_inverse=True)
+    if not len(years):
+        return list(station_ids), np.array([], dtype=int), np.empty((0, 0))
+    first = years.min()
+    all_years = np.arange(first, years.max() + 1)
+    values = np.full((len(station_ids), len(all_years)), np.nan)
+    values[rows, years - first] = table[value_col].values
+    return list(station_ids), all_years, values
+
+
+def _check_serial_correction(serial_correction):
+    if not serial_correction in SERIAL_CORRECTIONS:
+        raise KeyError(
+            f"serial_correction must be one of {SERIAL_CORRECTIONS}, "
+            f"not {serial_correction!r}"
+        )
+
+
+def _tie_correction(values):
+    """Sum of t(t - 1)(2t + 5) over each row's groups of t tied values."""
+    ordered = np.sort(values, axis=1)
+    n_rows, n = ordered.shape
+    if not n:
+        return np.zeros(n_rows)
+    # Label runs of equal values within each row; NaNs are never equal.
+    starts = np.ones_like(ordered, dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    run = np.cumsum(starts, axis=1) - 1 + np.arange(n_rows)[:, None] * n
+    t = np.bincount(run.ravel(), minlength=n_rows * n).reshape(n_rows, n)
+    t[np.isnan(ordered)] = 0
+    return (t * (t - 1) * (2 * t + 5)).sum(axis=1)
+
+
+def _autocorrelation(values):
+    """Autocorrelation of each row at lags 1 to n - 1, ignoring NaNs."""
+    anomaly = values - np.nanmean(values, axis=1, keepdims=True)
+    anomaly = np.where(np.isnan(anomaly), 0, anomaly)
+    denominator = (anomaly**2).sum(axis=1)
+    n = values.shape[1]
+    acf = np.zeros((values.shape[0], max(n - 1, 0)))
+    for lag in range(1, n):
+        acf[:, lag - 1] = (anomaly[:, lag:] * anomaly[:, :-lag]).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return acf / denominator[:, None]
+
+
+def _variance_factor(values, years, method, alpha, sens):
+    """Ratio n/n* of the Hamed & Rao (1998) or Yue & Wang (2004) correction."""
+    slope, intercept = sens
+    detrended = values - (slope[:, None] * years[None, :] + intercept[:, None])
+    n_valid = (~np.isnan(values)).sum(axis=1)
+    n = values.shape[1]
+    lags = np.arange(1, n)
+    if method == "yue_wang":
+        acf = _autocorrelation(detrended)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            weights = np.clip(1 - lags[None, :] / n_valid[:, None], 0, None)
+            factor = 1 + 2 * (weights * acf).sum(axis=1)
+    else:
+        ranks = stats.rankdata(detrended, axis=1, nan_policy="omit")
+        acf = _autocorrelation(ranks)
+        # Only the significant autocorrelations are used.
+        bound = stats.norm.ppf(1 - alpha / 2) / np.sqrt(n_valid)
+        acf = np.where(np.abs(acf) > bound[:, None], acf, 0)
+        m = n_valid[:, None] - lags[None, :]
+        weights = np.clip(m * (m - 1) * (m - 2), 0, None)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            factor = 1 + 2 * (acf * weights).sum(axis=1) / (
+                n_valid * (n_valid - 1) * (n_valid - 2)
+            )
+    return np.where(np.isfinite(factor) & (factor > 0), factor, 1)
+
+
+def mann_kendall(values, years=None, serial_correction=None, alpha=0.05):
+    """Mann-Kendall trend test of each row of a matrix.
+
+    Args:
+        values (2D array): a row per station and a column per (consecutive)
+            year, with NaN for missing years
+        years (1D array): the year of each column, needed for
+            ``serial_correction``, default 0, 1, 2...
+        serial_correction (str): None, "hamed_rao" (Hamed & Rao 1998, using
+            the significant autocorrelations of the ranks of the detrended
+            series) or "yue_wang" (Yue & Wang 2004, using all the
+            autocorrelations of the detrended series)
+        alpha (float): significance level for the trend column and for
+            Hamed & Rao's autocorrelations
+
+    Returns:
+        dict of arrays with an element per row: n (years with data), s,
+        var_s, z, p (two-sided), tau (Kendall's tau-a) and trend
+        ("increasing", "decreasing" or "no trend"). With a
+        serial correction, also variance_factor (n/n*, by which var_s was
+        multiplied).
+
+    """
+    _check_serial_correction(serial_correction)
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    if years is None:
+        years = np.arange(values.shape[1])
+    years = np.asarray(years, dtype=float)
+    sens = None if serial_correction is None else sens_slope(values, years)
+    return _mann_kendall(values, years, serial_correction, alpha, sens)
+
+
+def _mann_kendall(values, years, serial_correction, alpha, sens):
+    n_cols = values.shape[1]
+    n = (~np.isnan(values)).sum(axis=1)
+    s = np.zeros(len(values))
+    for lag in range(1, n_cols):
+        # NaN differences have a sign of NaN, which nansum ignores.
+        s += np.nansum(np.sign(values[:, lag:] - values[:, :-lag]), axis=1)
+    var_s = (n * (n - 1) * (2 * n + 5) - _tie_correction(values)) / 18
+    result = {"n": n}
+    if serial_correction is not None:
+        factor = _variance_factor(values, years, serial_correction, alpha, sens)
+        var_s = var_s * factor
+        result["variance_factor"] = factor
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(s == 0, 0, (s - np.sign(s)) / np.sqrt(var_s))
+        tau = s / (n * (n - 1) / 2)
+    z = np.where(var_s > 0, z, np.nan)
+    p = 2 * stats.norm.sf(np.abs(z))
+    trend = np.where(p < alpha, np.where(z > 0, "increasing", "decreasing"), "no trend")
+    result.update({"s": s, "var_s": var_s, "z": z, "p": p, "tau": tau})
+    result["trend"] = trend
+    return result
+
+
+def sens_slope(values, years=None):
+    """Sen's slope (the median of the pairwise slopes) of each row of a matrix.
+
+    Args:
+        values (2D array): a row per station and a column per (consecutive)
+            year, with NaN for missing years
+        years (1D array): the year of each column, default 0, 1, 2...
+
+    Returns:
+        tuple: (slope, intercept) arrays, in units per year. The intercept
+        is Conover's, median(values) - slope * median(years), using the
+        years with data, so that ``slope * year + intercept`` is the trend
+        line.
+
+    """
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    n_rows, n_cols = values.shape
+    if years is None:
+        years = np.arange(n_cols)
+    years = np.asarray(years, dtype=float)
+    i, j = np.triu_indices(n_cols, k=1)
+    steps = years[j] - years[i]
+    slope = np.empty(n_rows)
+    # Rows are done in blocks to bound the memory used by the pairs.
+    block = max(1, MAX_PAIRWISE_VALUES // max(len(i), 1))
+    for start in range(0, n_rows, block):
+        rows = values[start : start + block]
+        slope[start : start + block] = _nanmedian_rows(
+            (rows[:, j] - rows[:, i]) / steps
+        )
+    masked_years = np.where(np.isnan(values), np.nan, years[None, :])
+    intercept = _nanmedian_rows(values) - slope * _nanmedian_rows(masked_years)
+    return slope, intercept
+
+
+def _nanmedian_rows(values):
+    """Median of each row ignoring NaNs (NaN if there are none).
+
+    Sorting puts the NaNs last, and is faster than np.nanmedian here.
+
+    """
+    ordered = np.sort(values, axis=1)
+    count = (~np.isnan(ordered)).sum(axis=1)
+    rows = np.arange(len(ordered))
+    if not ordered.shape[1]:
+        return np.full(len(ordered), np.nan)
+    lower = ordered[rows, np.maximum(count - 1, 0) // 2]
+    upper = ordered[rows, count // 2 - (count == 0)]
+    return np.where(count > 0, (lower + upper) / 2, np.nan)
+
+
+def _trend_block(values, years, serial_correction, alpha):
+    sens = sens_slope(values, years)
+    result = _mann_kendall(values, years, serial_correction, alpha, sens)
+    result["slope"], result["intercept"] = sens
+    return result
+
+
+def _annual_tables(stations, year_type):
+    if isinstance(stations, pd.DataFrame):
+        return stations
+    if isinstance(stations, dict):
+        stations = stations.values()
+    tables = [getattr(rf, year_type) for rf in stations]
+    tables = [t for t in tables if len(t)]
+    if not tables:
+        return pd.DataFrame(columns=["station_id", "start_date"])
+    return pd.concat(tables, ignore_index=True)
+
+
+@instrumented
+def station_trends(
+    stations,
+    year_types=("calendar", "financial"),
+    value_col="rainfall",
+    serial_correction=None,
+    alpha=0.05,
+    min_years=10,
+    processes=1,
+    stations_per_block=1000,
+):
+    """Mann-Kendall tests and Sen's slopes of the annual totals of many stations.
+
+    Args:
+        stations (dict, sequence or pd.DataFrame):
+            :class:`ausweather.RainfallStationData` or
+            :class:`ausweather.ClimateStationData` objects (the values, if a
+            dict), or a table of annual values with station_id and
+            start_date columns, e.g. ``analyse_stations(...)["calendar"]``
+        year_types (str or sequence): "calendar" and/or "financial" (ignored
+            if ``stations`` is a table)
+        value_col (str): the annual value to test
+        serial_correction (str): see :func:`mann_kendall`
+        alpha (float): significance level
+        min_years (int): stations with fewer years of data are left out
+        processes (int): size of the process pool. With 1 (the default),
+            the calculation is done in this process, which is usually
+            fastest unless there are many thousands of stations.
+        stations_per_block (int): stations sent to a worker at a time
+
+    Returns:
+        pd.DataFrame: one row per station and year type, with columns
+        station_id, year_type, first_year, last_year, n (years with data),
+        s, var_s, z, p, tau, trend, slope (per year), intercept and, with a
+        serial correction, variance_factor.
+
+    """
+    _check_serial_correction(serial_correction)
+    if isinstance(year_types, str) or isinstance(stations, pd.DataFrame):
+        year_types = [year_types if isinstance(year_types, str) else "annual"]
+    results = []
+    for year_type in year_types:
+        table = _annual_tables(stations, year_type)
+        station_ids, years, values = annual_matrix(table, value_col)
+        blocks = [
+            values[i : i + stations_per_block]
+            for i in range(0, len(values), stations_per_block)
+        ]
+        args = (years, serial_correction, alpha)
+        if processes == 1 or len(blocks) < 2:
+            parts = [_trend_block(block, *args) for block in blocks]
+        else:
+            n = len(blocks)
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                parts = list(
+                    executor.map(
+                        _trend_block,
+                        blocks,
+                        [years] * n,
+                        [serial_correction] * n,
+                        [alpha] * n,
+                    )
+                )
+        has_data = ~np.isnan(values)
+        any_data = has_data.any(axis=1)
+        first = years[has_data.argmax(axis=1)] if len(years) else []
+        last = years[-1 - has_data[:, ::-1].argmax(axis=1)] if len(years) else []
+        df = pd.DataFrame(
+            {
+                "station_id": station_ids,
+                "year_type": year_type,
+                "first_year": np.where(any_data, first, np.nan),
+                "last_year": np.where(any_data, last, np.nan),
+            }
+        )
+        for key in parts[0] if parts else ():
+            df[key] = np.concatenate([part[key] for part in parts])
+        results.append(df[df.n >= min_years] if "n" in df.columns else df)
+    return pd.concat(results, ignore_index=True)
@@ -0,0 +1,198 @@
+"""Fixtures for the benchmarks: responses from SILO, the BoM and Aquarius.
+
+Running this module writes them to ``benchmarks/fixtures/``:
+
+- ``silo_alldata.txt``: a 130-year SILO alldata response (1889 to 2018)
+- ``alphaAUS_136.txt``, ``alphaAUS_139.txt`` and ``alphaAUS_122.txt``: the
+  national BoM station lists
+- ``aquarius_export.csv``: an Aquarius bulk export of daily rainfall for
+  several stations
+
+By default they are generated, deterministically, in the same formats as the
+real services, so the benchmarks need no network access. To use real
+responses instead, record them once with::
+
+    $ python benchmarks/fixtures.py --record your@email.com --aquarius-ids A1 A2
+
+"""
+
+import argparse
+from pathlib import Path
+import sys
+
+import numpy as np
+import pandas as pd
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+SILO_STATION = 23005
+SILO_START = "18890101"
+SILO_FINISH = "20181231"
+
+STATION_LIST_CODES = (136, 139, 122)
+
+AQUARIUS_IDS = ["A5030502", "A5040512", "A5050517", "A5100529", "A5130501"]
+AQUARIUS_START = "1960-01-01"
+AQUARIUS_END = "2019-12-31"
+
+SILO_HEADER = """\
+"Patched Point data for station: {station} ADELAIDE (GLEN OSMOND)                    Lat: -34.9464 Long: 138.6519"
+"Patched point data are based on data from the Bureau of Meteorology and interpolated data where necessary"
+"Elevation: 125m"
+"Data quality codes are given in the columns after each variable:"
+"0  Official observation as supplied by the Bureau of Meteorology"
+"15 Deaccumulated rainfall (original observation was recorded over a period exceeding the standard 24 hour observation period)"
+"25 Interpolated from daily observations for that date"
+"26 Synthetic Class A pan evaporation, calculated from temperatures, radiation and vapour pressure"
+"35 Interpolated from daily observations using an anomaly interpolation method"
+"75 Interpolated from the long term averages of daily observations for that day of year"
+Date       Day Date2      T.Max Smx T.Min Smn Rain   Srn  Evap Sev Radn   Ssl VP    Svp RHmaxT RHminT FAO56 Mlake Mpot  Mact  Mwet Span Ssp EvSp Ses MSLPres Sp
+(yyyymmdd)  () (dd-mm-yyyy)  (oC) ()   (oC) ()   (mm)   () (mm) () (MJ/m2) () (hPa) ()   (%)    (%)    (mm)  (mm)  (mm)  (mm)  (mm)  (mm)  () (mm) ()  (hPa)  ()
+"""
+
+
+def make_silo_alldata(station=SILO_STATION, start=SILO_START, finish=SILO_FINISH):
+    """Generate a SILO alldata response."""
+    rng = np.random.default_rng(station)
+    dates = pd.date_range(start, finish)
+    n = len(dates)
+    season = np.cos(2 * np.pi * (dates.dayofyear.values - 15) / 365.25)
+    tmax = 22 + 7 * season + rng.normal(0, 3, n)
+    tmin = 11 + 5 * season + rng.normal(0, 2, n)
+    wet = rng.random(n) < 0.3 + 0.1 * -season
+    rain = np.where(wet, rng.gamma(0.7, 8, n), 0)
+    # Older records have more interpolated and deaccumulated days.
+    p_obs = np.clip((dates.year.values - 1870) / 150, 0.3, 0.97)
+    srn = np.where(
+        rng.random(n) < p_obs,
+        0,
+        rng.choice([15, 25, 35, 75], n, p=[0.2, 0.5, 0.2, 0.1]),
+    )
+    radn = 19 + 9 * season + rng.normal(0, 2, n)
+    vp = 12 + 3 * season + rng.normal(0, 1, n)
+    evap = np.clip(5 + 4 * season + rng.normal(0, 1, n), 0, None)
+    mslp = 1015 - 4 * season + rng.normal(0, 5, n)
+    lines = [SILO_HEADER.format(station=station)]
+    for i, t in enumerate(dates):
+        lines.append(
+            f"{t:%Y%m%d} {t.dayofyear:4d} {t:%d-%m-%Y} {tmax[i]:5.1f}  25 "
+            f"{tmin[i]:5.1f}  25 {rain[i]:6.1f} {srn[i]:3d} {evap[i]:5.1f} 75 "
+            f"{radn[i]:5.1f}  42 {vp[i]:5.1f}  25 {min(vp[i] * 6, 100):6.1f} "
+            f"{min(vp[i] * 2.5, 100):6.1f} {evap[i] * 0.9:5.1f} {evap[i]:5.1f} "
+            f"{evap[i] * 1.1:5.1f} {evap[i] * 0.6:5.1f} {evap[i] * 1.2:5.1f} "
+            f"{evap[i]:5.1f} 75 {evap[i]:5.1f} 75 {mslp[i]:7.1f}  25\n"
+        )
+    return "".join(lines)
+
+
+def make_station_list(ncc_obs_code):
+    """Generate a national (alphaAUS) station list from the bundled SA list.
+
+    The SA stations are repeated for each state with their numbers moved into
+    that state's districts, giving a list of national size in the same layout.
+
+    """
+    from ausweather.bom import STATE_DISTRICTS
+
+    src = Path(__file__).parent.parent / "ausweather" / "alphaSA_136.txt"
+    lines = src.read_text().splitlines()
+    rows = [line for line in lines if line[:8].strip().isdigit()]
+    footer = lines[lines.index(rows[-1]) + 1 :]
+    names = {136: "rainfall", 139: "rainfall", 122: "maximum temperature"}
+    out = [lines[0], f"Australian stations measuring {names[ncc_obs_code]}"]
+    out += lines[2:4]
+    step = 4 if ncc_obs_code == 122 else 1
+    n = 0
+    for state, lo, hi in STATE_DISTRICTS:
+        for k, row in enumerate(rows[::step]):
+            number = int(row[:8]) % 1000 + 1000 * (lo + k % (hi - lo + 1))
+            out.append(f"{number:7d}{row[7:]}")
+            n += 1
+    out += [line.replace("1639 stations", f"{n} stations") for line in footer]
+    return "\n".join(out) + "\n"
+
+
+def make_aquarius_export(
+    station_ids=AQUARIUS_IDS, data_start=AQUARIUS_START, data_end=AQUARIUS_END
+):
+    """Generate a time-aligned Aquarius daily rainfall export."""
+    rng = np.random.default_rng(len(station_ids))
+    dates = pd.date_range(data_start, data_end)
+    n = len(dates)
+    columns = []
+    for k, station_id in enumerate(station_ids):
+        rain = np.where(rng.random(n) < 0.3, rng.gamma(0.7, 8, n), 0).round(1)
+        # Each station starts at a different date.
+        first = k * 2000
+        columns.append(
+            [
+                "" if i < first or rng.random() < 0.002 else f"{rain[i]:.1f}"
+                for i in range(n)
+            ]
+        )
+    header = [
+        "Time-aligned export",
+        "," + ",".join(f"Rainfall.Total@{s},," for s in station_ids),
+        "," + ",".join(f"{s},," for s in station_ids),
+        "Start of Interval,End of Interval,"
+        + ",".join("Value (mm),Grade" for s in station_ids),
+        "",
+    ]
+    lines = [h + "\n" for h in header]
+    for i, t in enumerate(dates):
+        end = t + pd.Timedelta(days=1)
+        values = ",".join(f"{col[i]},{'1' if col[i] else ''}" for col in columns)
+        lines.append(f"{t:%Y-%m-%d %H:%M:%S},{end:%Y-%m-%d %H:%M:%S},{values}\n")
+    return "".join(lines)
+
+
+def fixture_path(name):
+    return FIXTURES_DIR / name
+
+
+def ensure_fixtures(force=False):
+    """Generate any fixtures that do not exist yet, returning the directory."""
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    makers = {
+        "silo_alldata.txt": make_silo_alldata,
+        "aquarius_export.csv": make_aquarius_export,
+    }
+    for code in STATION_LIST_CODES:
+        makers[f"alphaAUS_{code}.txt"] = lambda code=code: make_station_list(code)
+    for name, make in makers.items():
+        path = fixture_path(name)
+        if force or not path.is_file():
+            print(f"Generating {path}", file=sys.stderr)
+            path.write_text(make())
+    return FIXTURES_DIR
+
+
+def record_fixtures(email, aquarius_ids=None):
+    """Download real responses into the fixtures directory."""
+    from ausweather import bom, core, silo
+    from ausweather.scheduler import get_scheduler
+
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    scheduler = get_scheduler()
+    url = silo.silo_alldata_url(SILO_STATION, email, SILO_START, SILO_FINISH)
+    fixture_path("silo_alldata.txt").write_text(scheduler.get(url).text)
+    for code in STATION_LIST_CODES:
+        r = scheduler.get(bom.bom_station_list_url(code))
+        fixture_path(f"alphaAUS_{code}.txt").write_text(r.text)
+    if aquarius_ids:
+        params = core.aquarius_export_params(aquarius_ids, AQUARIUS_START, AQUARIUS_END)
+        r = scheduler.get(core.aquarius_export_url(), params=params, verify=False)
+        fixture_path("aquarius_export.csv").write_text(r.text)
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(Path(__file__).parent.parent))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="regenerate fixtures")
+    parser.add_argument("--record", metavar="EMAIL", help="download real responses")
+    parser.add_argument("--aquarius-ids", nargs="+", help="stations to record")
+    args = parser.parse_args()
+    if args.record:
+        record_fixtures(args.record, args.aquarius_ids)
+    else:
+        ensure_fixtures(force=args.force)
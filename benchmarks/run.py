@@ -0,0 +1,453 @@
+"""Benchmarks for ausweather.
+
+Runs offline: the download functions are benchmarked end to end against a
+local server (see ``server.py``) that replays the recorded SILO, BoM and
+Aquarius responses in ``fixtures/`` (see ``fixtures.py``).
+
+.. code-block::
+
+    $ python benchmarks/run.py                  # run everything
+    $ python benchmarks/run.py -k silo          # only benchmarks matching "silo"
+    $ python benchmarks/run.py --threshold 0.1  # fail on a 10% slowdown
+
+Each benchmark is timed over several repeats (the median is reported) and
+run once more under :mod:`tracemalloc` for its peak memory. Results are
+appended, with the commit and a timestamp, to ``results/history.jsonl``.
+Each result is compared with the median of the last few runs on the same
+machine and Python, and the exit status is 1 if any benchmark got slower,
+or used more memory, by more than the threshold.
+
+"""
+
+import argparse
+from datetime import datetime
+import fnmatch
+import gc
+import json
+import os
+from pathlib import Path
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+HERE = Path(__file__).parent
+sys.path.insert(0, str(HERE.parent))
+
+from fixtures import SILO_FINISH, SILO_START, SILO_STATION, AQUARIUS_IDS
+from fixtures import ensure_fixtures, fixture_path
+from server import FixtureServer
+
+DEFAULT_HISTORY = HERE / "results" / "history.jsonl"
+
+# Differences smaller than this are noise, whatever the threshold.
+MIN_TIME_CHANGE = 0.002
+MIN_PEAK_CHANGE = 1e6
+
+EMAIL = "benchmarks@example.com"
+
+BENCHMARKS = {}
+
+
+def benchmark(func):
+    """Register a benchmark.
+
+    The function takes the :class:`Context` and does any setup, then returns
+    the callable to be timed. If that callable returns a :class:`Measured`,
+    its values are used instead of the harness's own measurements.
+
+    """
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+class Measured:
+    def __init__(self, seconds=None, peak=None):
+        self.seconds = seconds
+        self.peak = peak
+
+
+class Context:
+    """Shared state for the benchmarks: the fixture server and parsed data."""
+
+    def __init__(self, server):
+        self.server = server
+        self._cache = {}
+
+    def text(self, name):
+        return fixture_path(name).read_text()
+
+    def cached(self, key, func):
+        if not key in self._cache:
+            self._cache[key] = func()
+        return self._cache[key]
+
+    def rainfall(self, **kwargs):
+        """A RainfallStationData for the 130-year SILO fixture."""
+        import ausweather
+
+        df = self.cached(
+            "rainfall_df",
+            lambda: ausweather.download_bom_rainfall(
+                SILO_STATION, EMAIL, data_start=SILO_START, data_end=SILO_FINISH
+            ),
+        )
+        return ausweather.RainfallStationData.from_data(
+            SILO_STATION, df.copy(), **kwargs
+        )
+
+
+def point_at(server):
+    """Point ausweather at the fixture server, with no rate limiting."""
+    from ausweather import bom, core, silo
+    from ausweather.scheduler import RequestScheduler, set_scheduler
+
+    silo.SILO_BASE_URL = server.silo_url
+    bom.BOM_BASE_URL = server.bom_url
+    core.AQUARIUS_BASE_URL = server.aquarius_url
+    set_scheduler(RequestScheduler(rate=1e9, burst=1e9))
+
+
+# Benchmarks --------------------------------------------------------------
+
+
+def _import_child(trace):
+    code = (
+        "import json, time, tracemalloc\n"
+        f"if {trace}: tracemalloc.start()\n"
+        "t = time.perf_counter()\n"
+        "import ausweather\n"
+        "t = time.perf_counter() - t\n"
+        f"peak = tracemalloc.get_traced_memory()[1] if {trace} else None\n"
+        "print(json.dumps([t, peak]))\n"
+    )
+    env = dict(os.environ, PYTHONPATH=str(HERE.parent))
+    out = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, check=True
+    )
+    return json.loads(out.stdout)
+
+
+@benchmark
+def import_ausweather(ctx):
+    def run():
+        seconds, _ = _import_child(False)
+        _, peak = _import_child(True)
+        return Measured(seconds, peak)
+
+    return run
+
+
+@benchmark
+def get_silo_station_list(ctx):
+    from ausweather import get_silo_station_list
+
+    return get_silo_station_list
+
+
+@benchmark
+def parse_bom_rainfall_station_list(ctx):
+    from ausweather import parse_bom_rainfall_station_list
+
+    return parse_bom_rainfall_station_list
+
+
+@benchmark
+def parse_bom_station_list(ctx):
+    from ausweather.bom import parse_bom_station_list
+
+    text = ctx.text("alphaAUS_136.txt")
+    return lambda: parse_bom_station_list(text, 136)
+
+
+@benchmark
+def parse_bom_station_directory(ctx):
+    from ausweather.bom import parse_bom_station_directory
+
+    path = fixture_path("alphaAUS_136.txt")
+    return lambda: parse_bom_station_directory(path, ncc_obs_code=136)
+
+
+@benchmark
+def fetch_bom_station_list(ctx):
+    from ausweather.bom import fetch_bom_station_list
+
+    return lambda: fetch_bom_station_list(136)
+
+
+@benchmark
+def fetch_bom_station_lists(ctx):
+    from ausweather.bom import fetch_bom_station_lists
+
+    return lambda: fetch_bom_station_lists([136, 139, 122])
+
+
+@benchmark
+def parse_silo_alldata(ctx):
+    from ausweather.silo import parse_silo_alldata
+
+    text = ctx.text("silo_alldata.txt")
+    return lambda: parse_silo_alldata(text)
+
+
+@benchmark
+def silo_alldata(ctx):
+    from ausweather import silo_alldata
+
+    return lambda: silo_alldata(SILO_STATION, EMAIL, SILO_START, SILO_FINISH)
+
+
+@benchmark
+def summarise_silo_alldata(ctx):
+    from ausweather.silo import summarise_silo_alldata
+
+    return lambda: summarise_silo_alldata(
+        SILO_STATION, EMAIL, start=SILO_START, finish=SILO_FINISH
+    )
+
+
+@benchmark
+def download_bom_rainfall(ctx):
+    from ausweather import download_bom_rainfall
+
+    return lambda: download_bom_rainfall(
+        SILO_STATION, EMAIL, data_start=SILO_START, data_end=SILO_FINISH
+    )
+
+
+@benchmark
+def download_aquarius_rainfall_bulk(ctx):
+    from ausweather import download_aquarius_rainfall_bulk
+
+    return lambda: download_aquarius_rainfall_bulk(AQUARIUS_IDS)
+
+
+@benchmark
+def rainfall_daily(ctx):
+    rf = ctx.rainfall()
+    return lambda: rf.daily
+
+
+@benchmark
+def rainfall_calendar(ctx):
+    rf = ctx.rainfall(exclude_incomplete_years=True)
+    return lambda: rf.calendar
+
+
+@benchmark
+def rainfall_financial(ctx):
+    rf = ctx.rainfall(exclude_incomplete_years=True)
+    return lambda: rf.financial
+
+
+@benchmark
+def rainfall_month(ctx):
+    rf = ctx.rainfall()
+    return lambda: rf.month
+
+
+@benchmark
+def annual_stats(ctx):
+    from ausweather import annual_stats
+
+    calendar = ctx.rainfall().calendar
+    return lambda: annual_stats(calendar)
+
+
+@benchmark
+def monthly_stats(ctx):
+    from ausweather import monthly_stats
+
+    month = ctx.rainfall().month
+    return lambda: monthly_stats(month)
+
+
+@benchmark
+def calculate_deviations(ctx):
+    from ausweather import annual_stats, calculate_deviations
+
+    calendar = ctx.rainfall().calendar
+    stats = annual_stats(calendar)
+    return lambda: calculate_deviations(calendar, stats)
+
+
+@benchmark
+def find_missing_days(ctx):
+    from ausweather import find_missing_days
+
+    daily = ctx.rainfall().daily
+    return lambda: find_missing_days(
+        daily, dt_col="date", year_type="financial", value_col="rainfall"
+    )
+
+
+# Harness -----------------------------------------------------------------
+
+
+def measure(func, repeat):
+    """Time *func* *repeat* times, then measure its peak memory once."""
+    times = []
+    for i in range(repeat):
+        gc.collect()
+        t = time.perf_counter()
+        result = func()
+        t = time.perf_counter() - t
+        if isinstance(result, Measured) and result.seconds is not None:
+            t = result.seconds
+        times.append(t)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    if isinstance(result, Measured) and result.peak is not None:
+        peak = result.peak
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "repeat": repeat,
+        "peak": peak,
+    }
+
+
+def machine():
+    return f"{platform.node()} {platform.machine()} Python {platform.python_version()}"
+
+
+def git_commit():
+    def git(*args):
+        return subprocess.run(
+            ["git", *args], cwd=HERE.parent, capture_output=True, text=True
+        ).stdout.strip()
+
+    commit = git("rev-parse", "--short", "HEAD")
+    if commit and git("status", "--porcelain", "--untracked-files=no", "ausweather"):
+        commit += "-dirty"
+    return commit or None
+
+
+def read_history(path):
+    runs = []
+    if Path(path).is_file():
+        with open(path, "r") as f:
+            for line in f:
+                if line.strip():
+                    runs.append(json.loads(line))
+    return runs
+
+
+def baselines(history, machine_id, n_runs):
+    """Median time and peak memory of each benchmark over the last *n_runs*."""
+    runs = [r for r in history if r["machine"] == machine_id][-n_runs:]
+    values = {}
+    for run in runs:
+        for name, result in run["results"].items():
+            values.setdefault(name, []).append(result)
+    return {
+        name: {
+            "median": statistics.median(r["median"] for r in results),
+            "peak": statistics.median(r["peak"] for r in results),
+        }
+        for name, results in values.items()
+    }
+
+
+def compare(result, baseline, threshold):
+    """Return (time change, peak change, list of regressions) vs a baseline."""
+    regressions = []
+    dt = result["median"] / baseline["median"] - 1 if baseline["median"] else 0
+    dp = result["peak"] / baseline["peak"] - 1 if baseline["peak"] else 0
+    if dt > threshold and result["median"] - baseline["median"] > MIN_TIME_CHANGE:
+        regressions.append(f"time +{dt:.0%}")
+    if dp > threshold and result["peak"] - baseline["peak"] > MIN_PEAK_CHANGE:
+        regressions.append(f"peak memory +{dp:.0%}")
+    return dt, dp, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the ausweather benchmarks.")
+    parser.add_argument(
+        "-k", dest="pattern", help="only run benchmarks matching this glob/substring"
+    )
+    parser.add_argument("--list", action="store_true", help="list the benchmarks")
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="fractional slowdown counted as a regression (default 0.2)",
+    )
+    parser.add_argument(
+        "--baseline-runs",
+        type=int,
+        default=5,
+        help="compare with the median of this many previous runs (default 5)",
+    )
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument(
+        "--no-save", action="store_true", help="do not add this run to the history"
+    )
+    args = parser.parse_args(argv)
+
+    names = list(BENCHMARKS)
+    if args.pattern:
+        names = [
+            n for n in names if args.pattern in n or fnmatch.fnmatch(n, args.pattern)
+        ]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    history = read_history(args.history)
+    machine_id = machine()
+    base = baselines(history, machine_id, args.baseline_runs)
+
+    ensure_fixtures()
+    results = {}
+    failures = {}
+    print(f"{'benchmark':<34} {'median':>10} {'min':>10} {'peak':>10}  change")
+    with FixtureServer() as server:
+        point_at(server)
+        ctx = Context(server)
+        for name in names:
+            func = BENCHMARKS[name](ctx)
+            result = measure(func, args.repeat)
+            results[name] = result
+            line = (
+                f"{name:<34} {result['median'] * 1e3:8.1f}ms "
+                f"{result['min'] * 1e3:8.1f}ms {result['peak'] / 1e6:8.1f}MB"
+            )
+            if name in base:
+                dt, dp, regressions = compare(result, base[name], args.threshold)
+                line += f"  {dt:+.0%} time {dp:+.0%} peak"
+                if regressions:
+                    failures[name] = regressions
+                    line += "  REGRESSION"
+            print(line, flush=True)
+
+    if not args.no_save:
+        Path(args.history).parent.mkdir(parents=True, exist_ok=True)
+        run = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "machine": machine_id,
+            "results": results,
+        }
+        with open(args.history, "a") as f:
+            f.write(json.dumps(run) + "\n")
+
+    if failures:
+        print(f"\n{len(failures)} regressions (threshold {args.threshold:.0%}):")
+        for name, regressions in failures.items():
+            print(f"  {name}: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""Local stand-in for the SILO, BoM and Aquarius web services.
+
+:class:`FixtureServer` serves the recorded responses in
+``benchmarks/fixtures/`` over HTTP on localhost, so the download functions
+can be benchmarked end to end (request, transfer and parsing) without the
+network. Point ausweather at it with the ``AUSWEATHER_*_URL`` environment
+variables, or by setting the ``*_BASE_URL`` module attributes::
+
+    with FixtureServer() as server:
+        silo.SILO_BASE_URL = server.silo_url
+        ...
+
+"""
+
+import bisect
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import re
+import threading
+from urllib.parse import parse_qs, urlparse
+
+from fixtures import ensure_fixtures
+
+STATION_LIST_PATH = re.compile(r"/climate/data/lists_by_element/alphaAUS_(\d+)\.txt$")
+
+
+class SiloFixture:
+    """A SILO alldata response that can be cut to the requested dates."""
+
+    def __init__(self, text):
+        lines = text.splitlines(keepends=True)
+        first = next(i for i, line in enumerate(lines) if line[:8].isdigit())
+        self.header = "".join(lines[:first])
+        self.rows = lines[first:]
+        self.dates = [line[:8] for line in self.rows]
+
+    def response(self, start, finish):
+        i = bisect.bisect_left(self.dates, start)
+        j = bisect.bisect_right(self.dates, finish)
+        return self.header + "".join(self.rows[i:j])
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        fixtures = self.server.fixtures
+        if url.path.endswith("/PatchedPointDataset.php"):
+            body = fixtures["silo"].response(
+                query.get("start", "00000000"), query.get("finish", "99999999")
+            )
+        elif STATION_LIST_PATH.search(url.path):
+            code = STATION_LIST_PATH.search(url.path).group(1)
+            body = fixtures.get(f"alphaAUS_{code}.txt")
+        elif url.path.endswith("/Export/BulkExport"):
+            body = fixtures["aquarius_export.csv"]
+        else:
+            body = None
+        if body is None:
+            self.send_error(404)
+            return
+        data = body.encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """Serve the fixtures on localhost, in a background thread.
+
+    Args:
+        fixtures_dir (Path): default: generate or reuse ``benchmarks/fixtures``
+
+    """
+
+    def __init__(self, fixtures_dir=None):
+        if fixtures_dir is None:
+            fixtures_dir = ensure_fixtures()
+        fixtures = {p.name: p.read_text() for p in fixtures_dir.iterdir()}
+        fixtures["silo"] = SiloFixture(fixtures.pop("silo_alldata.txt"))
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fixtures = fixtures
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def silo_url(self):
+        return f"{self.url}/silo"
+
+    @property
+    def bom_url(self):
+        return f"{self.url}/bom"
+
+    @property
+    def aquarius_url(self):
+        return f"{self.url}/aquarius"
+
+    def environ(self):
+        """Environment variables pointing ausweather at this server."""
+        return {
+            "AUSWEATHER_SILO_URL": self.silo_url,
+            "AUSWEATHER_BOM_URL": self.bom_url,
+            "AUSWEATHER_AQUARIUS_URL": self.aquarius_url,
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
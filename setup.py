@@ -18,5 +18,12 @@ setup(
     ),
     keywords="rainfall australia bom silo python data-access",
     install_requires=("pandas", "requests", "matplotlib"),
+    extras_require={
+        "archive": ["pyarrow"],
+        "async": ["aiohttp"],
+        "gridded": ["h5py"],
+        "polars": ["pyarrow", "polars"],
+    },
+    entry_points={"console_scripts": ["ausweather = ausweather.cli:main"]},
     include_package_data=True,
 )